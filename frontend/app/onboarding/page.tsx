@@ -36,6 +36,10 @@ export default function OnboardingPage() {
   const audioQueueRef = useRef<Float32Array[]>([]);
   const isPlayingRef = useRef(false);
   const nextPlayTimeRef = useRef(0);
+  // Playback format the backend settled on at 'ready' (null: 16kHz Int16 as sent by Eleven Labs)
+  const playbackFormatRef = useRef<{ sample_rate: number; encoding: string; frame_ms?: number } | null>(null);
+  const opusDecoderRef = useRef<AudioDecoder | null>(null);
+  const lastSequenceRef = useRef<number | null>(null);
   
   const router = useRouter();
   const supabase = createClient();
@@ -88,6 +92,10 @@ export default function OnboardingPage() {
       captureContextRef.current.close();
       captureContextRef.current = null;
     }
+    if (opusDecoderRef.current && opusDecoderRef.current.state !== 'closed') {
+      opusDecoderRef.current.close();
+      opusDecoderRef.current = null;
+    }
     if (audioContextRef.current && audioContextRef.current.state !== 'closed') {
       audioContextRef.current.close();
       audioContextRef.current = null;
@@ -146,8 +154,17 @@ export default function OnboardingPage() {
       const { session_id, websocket_url } = await response.json();
       console.log('Session started:', session_id);
 
-      // Connect to WebSocket
-      const ws = new WebSocket(`ws://localhost:8000${websocket_url}`);
+      // Connect to WebSocket, asking for Opus playback where WebCodecs can decode it
+      // (about a tenth of the bandwidth) and Float32 at our own rates otherwise
+      const formats = new URLSearchParams();
+      if (typeof AudioDecoder !== 'undefined') {
+        formats.set('encoding', 'opus');
+      } else {
+        formats.set('sample_rate', String(audioContextRef.current.sampleRate));
+        formats.set('encoding', 'f32le');
+      }
+      playbackFormatRef.current = null;
+      const ws = new WebSocket(`ws://localhost:8000${websocket_url}?${formats}`);
       wsRef.current = ws;
 
       ws.onopen = () => {
@@ -256,61 +273,115 @@ export default function OnboardingPage() {
     
     try {
       const arrayBuffer = await blob.arrayBuffer();
+      const format = playbackFormatRef.current;
       
-      // Eleven Labs sends PCM 16-bit 16kHz mono audio
-      const pcmData = new Int16Array(arrayBuffer);
-      const floatData = new Float32Array(pcmData.length);
-      
-      // Convert Int16 to Float32 (-1.0 to 1.0)
-      for (let i = 0; i < pcmData.length; i++) {
-        floatData[i] = pcmData[i] / 32768.0;
-      }
-      
-      // Schedule this chunk to play after previous ones
-      const ctx = audioContextRef.current;
-      const audioBuffer = ctx.createBuffer(1, floatData.length, 16000);
-      audioBuffer.getChannelData(0).set(floatData);
-      
-      const source = ctx.createBufferSource();
-      source.buffer = audioBuffer;
-      source.connect(ctx.destination);
-      
-      // Calculate when to start this chunk
-      const now = ctx.currentTime;
-      const startTime = Math.max(now, nextPlayTimeRef.current);
-      const duration = audioBuffer.duration;
-      
-      // Update next play time
-      nextPlayTimeRef.current = startTime + duration;
-      
-      // Schedule playback
-      source.start(startTime);
-      
-      // Track speaking state
-      if (!isPlayingRef.current) {
-        isPlayingRef.current = true;
-        setIsAgentSpeaking(true);
+      if (format?.encoding === 'opus') {
+        decodeOpusPacket(arrayBuffer, format.frame_ms ?? 20);
+        return;
       }
       
-      source.onended = () => {
-        // Check if this was the last scheduled chunk
-        if (ctx.currentTime >= nextPlayTimeRef.current - 0.1) {
-          isPlayingRef.current = false;
-          setIsAgentSpeaking(false);
+      let floatData: Float32Array;
+      if (format?.encoding === 'f32le') {
+        // Already converted by the backend, at our playback rate
+        floatData = new Float32Array(arrayBuffer);
+      } else {
+        // PCM 16-bit mono as sent by Eleven Labs: convert Int16 to Float32 (-1.0 to 1.0)
+        const pcmData = new Int16Array(arrayBuffer);
+        floatData = new Float32Array(pcmData.length);
+        for (let i = 0; i < pcmData.length; i++) {
+          floatData[i] = pcmData[i] / 32768.0;
         }
-      };
+      }
       
+      schedulePlayback(floatData, format?.sample_rate ?? 16000);
     } catch (err) {
       console.error('Error playing audio:', err);
       setIsAgentSpeaking(false);
     }
   };
 
+  // Opus mode: each message is a 4-byte big-endian sequence number and one packet
+  const decodeOpusPacket = (arrayBuffer: ArrayBuffer, frameMs: number) => {
+    const decoder = opusDecoderRef.current;
+    if (!decoder || decoder.state !== 'configured') return;
+    
+    const sequence = new DataView(arrayBuffer).getUint32(0);
+    const last = lastSequenceRef.current;
+    if (last !== null && sequence !== ((last + 1) >>> 0)) {
+      console.log(`⚠️ Opus packets ${last + 1}-${sequence - 1} missing`);
+    }
+    lastSequenceRef.current = sequence;
+    
+    decoder.decode(new EncodedAudioChunk({
+      type: 'key',
+      timestamp: sequence * frameMs * 1000,
+      data: new Uint8Array(arrayBuffer, 4),
+    }));
+  };
+
+  const createOpusDecoder = (sampleRate: number) => {
+    const decoder = new AudioDecoder({
+      output: (data) => {
+        const floatData = new Float32Array(data.numberOfFrames);
+        data.copyTo(floatData, { planeIndex: 0, format: 'f32-planar' });
+        schedulePlayback(floatData, data.sampleRate);
+        data.close();
+      },
+      error: (err) => console.error('Opus decoder error:', err),
+    });
+    decoder.configure({ codec: 'opus', sampleRate, numberOfChannels: 1 });
+    lastSequenceRef.current = null;
+    return decoder;
+  };
+
+  const schedulePlayback = (floatData: Float32Array, sampleRate: number) => {
+    const ctx = audioContextRef.current;
+    if (!ctx || floatData.length === 0) return;
+    
+    // Schedule this chunk to play after previous ones
+    const audioBuffer = ctx.createBuffer(1, floatData.length, sampleRate);
+    audioBuffer.getChannelData(0).set(floatData);
+    
+    const source = ctx.createBufferSource();
+    source.buffer = audioBuffer;
+    source.connect(ctx.destination);
+    
+    // Calculate when to start this chunk
+    const now = ctx.currentTime;
+    const startTime = Math.max(now, nextPlayTimeRef.current);
+    const duration = audioBuffer.duration;
+    
+    // Update next play time
+    nextPlayTimeRef.current = startTime + duration;
+    
+    // Schedule playback
+    source.start(startTime);
+    
+    // Track speaking state
+    if (!isPlayingRef.current) {
+      isPlayingRef.current = true;
+      setIsAgentSpeaking(true);
+    }
+    
+    source.onended = () => {
+      // Check if this was the last scheduled chunk
+      if (ctx.currentTime >= nextPlayTimeRef.current - 0.1) {
+        isPlayingRef.current = false;
+        setIsAgentSpeaking(false);
+      }
+    };
+  };
+
+
   const handleMessage = (msg: any) => {
     console.log('Received message:', msg.type);
     
     switch (msg.type) {
       case 'ready':
+        playbackFormatRef.current = msg.audio_format?.output ?? null;
+        if (playbackFormatRef.current?.encoding === 'opus') {
+          opusDecoderRef.current = createOpusDecoder(playbackFormatRef.current.sample_rate);
+        }
         setStatus('active');
         console.log('Conversation is now active');
         break;
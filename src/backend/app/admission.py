@@ -0,0 +1,94 @@
+"""
+Admission control for WebSocket bridges
+Caps concurrent bridges per worker, with a short wait queue in front
+"""
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+from app.config import MAX_BRIDGES_PER_WORKER, ADMISSION_QUEUE_SIZE, ADMISSION_QUEUE_TIMEOUT
+from app.metrics import ADMISSION_QUEUED
+
+
+class AdmissionController:
+    """
+    Hands out bridge slots on this worker.
+
+    When every slot is taken, up to `queue_size` callers wait in FIFO order
+    and a freed slot passes straight to the first waiter. Anyone beyond the
+    queue, or still waiting after `queue_timeout` seconds, is rejected.
+    """
+
+    def __init__(
+        self,
+        max_bridges: int = MAX_BRIDGES_PER_WORKER,
+        queue_size: int = ADMISSION_QUEUE_SIZE,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT,
+    ):
+        self.max_bridges = max_bridges
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.rejected = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    async def admit(self, on_queued: Optional[Callable[[int], Awaitable]] = None) -> bool:
+        """
+        Take a slot, waiting in the queue if needed.
+
+        `on_queued` is awaited with the caller's 1-based queue position when
+        it has to wait. Returns False if the caller was rejected.
+        """
+        if self.active < self.max_bridges and not self.queued:
+            self.active += 1
+            return True
+
+        if self.queued >= self.queue_size:
+            self.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+
+        try:
+            if on_queued:
+                await on_queued(self.queued)
+            # release() hands its slot over by resolving the future
+            await asyncio.wait_for(waiter, self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+        except BaseException:
+            # Handed a slot just as we failed; pass it on
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self):
+        """Give a slot back, or pass it to the next waiter"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self.active -= 1
+
+    def stats(self) -> dict:
+        return {
+            "active_bridges": self.active,
+            "max_bridges": self.max_bridges,
+            "queued": self.queued,
+            "rejected": self.rejected,
+        }
+
+
+admission = AdmissionController()
+ADMISSION_QUEUED.set_function(lambda: admission.queued)
@@ -0,0 +1,432 @@
+"""
+Compressed archive for finished recordings
+WAVs are re-encoded to OGG/Opus or FLAC in a process pool, with a seek index next to each file
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import struct
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, Iterator, NamedTuple, Optional
+
+import aiofiles
+import numpy as np
+
+# soundfile (libsndfile) is optional; without it recordings stay WAV
+try:
+    import soundfile
+except ImportError:
+    soundfile = None
+
+from app.config import (
+    RECORDINGS_DIR,
+    AUDIO_ARCHIVE_FORMAT,
+    AUDIO_ARCHIVE_WORKERS,
+    AUDIO_ARCHIVE_KEEP_WAV,
+    AUDIO_SEEK_INTERVAL,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AudioFormat(NamedTuple):
+    suffix: str
+    media_type: str
+    sf_format: Optional[str]
+    sf_subtype: Optional[str]
+
+
+FORMATS = {
+    "opus": AudioFormat(".opus", "audio/ogg", "OGG", "OPUS"),
+    "flac": AudioFormat(".flac", "audio/flac", "FLAC", "PCM_16"),
+    "wav": AudioFormat(".wav", "audio/wav", None, None),
+}
+
+_BLOCK_FRAMES = 16384
+_READ_CHUNK = 64 * 1024
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def recording_path(session_id: str, fmt: str) -> Path:
+    return RECORDINGS_DIR / f"{session_id}{FORMATS[fmt].suffix}"
+
+
+def index_path(session_id: str) -> Path:
+    return RECORDINGS_DIR / f"{session_id}.idx.json"
+
+
+def find_recordings(session_id: str) -> dict[str, Path]:
+    """Stored copies of a recording by format, archives first"""
+    found = {}
+    for fmt in FORMATS:
+        path = recording_path(session_id, fmt)
+        if path.exists():
+            found[fmt] = path
+    return found
+
+
+def read_recording(session_id: str) -> Optional[tuple[np.ndarray, int]]:
+    """int16 samples and sample rate of a recording, decoding an archive if that's all there is"""
+    recordings = find_recordings(session_id)
+    if "wav" in recordings:
+        with wave.open(str(recordings["wav"]), "rb") as f:
+            return np.frombuffer(f.readframes(f.getnframes()), dtype="<i2"), f.getframerate()
+    if recordings and soundfile is not None:
+        samples, rate = soundfile.read(str(next(iter(recordings.values()))), dtype="int16")
+        return samples, rate
+    return None
+
+
+# --- Seek index -------------------------------------------------------------
+
+def _crc8(data: bytes) -> int:
+    crc = 0
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+
+def _flac_frame_header(data: bytes, pos: int) -> Optional[int]:
+    """Frame/sample number of a valid FLAC frame header at `pos`, else None"""
+    if len(data) < pos + 6:
+        return None
+    blocksize_code = data[pos + 2] >> 4
+    rate_code = data[pos + 2] & 0x0F
+    if blocksize_code == 0 or rate_code == 0x0F or data[pos + 3] & 0x01:
+        return None
+
+    # UTF-8 style variable-length frame (or sample) number
+    first = data[pos + 4]
+    length = 1
+    if first >= 0x80:
+        length = 8 - (first ^ 0xFF).bit_length()
+        if not 2 <= length <= 7:
+            return None
+    number = first & (0x7F >> length if length > 1 else 0x7F)
+    end = pos + 4 + length
+    for byte in data[pos + 5:end]:
+        if byte & 0xC0 != 0x80:
+            return None
+        number = (number << 6) | (byte & 0x3F)
+
+    end += {6: 1, 7: 2}.get(blocksize_code, 0)
+    end += {12: 1, 13: 2, 14: 2}.get(rate_code, 0)
+    if len(data) <= end or _crc8(data[pos:end]) != data[end]:
+        return None
+    return number
+
+
+def _flac_seek_points(data: bytes) -> tuple[int, list[tuple[int, int]]]:
+    """(header_bytes, [(frame, byte_offset)]) for every audio frame in a FLAC file"""
+    pos = 4  # "fLaC"
+    blocksize = 0
+    while True:
+        block_type = data[pos] & 0x7F
+        last = data[pos] & 0x80
+        length = int.from_bytes(data[pos + 1:pos + 4], "big")
+        if block_type == 0:  # STREAMINFO
+            blocksize = int.from_bytes(data[pos + 6:pos + 8], "big")
+        pos += 4 + length
+        if last:
+            break
+    header_bytes = pos
+
+    points = []
+    expected = 0
+    while (pos := data.find(b"\xff", pos)) != -1:
+        if data[pos + 1:pos + 2] in (b"\xf8", b"\xf9"):
+            number = _flac_frame_header(data, pos)
+            if number is not None:
+                # Fixed-blocksize streams count frames, variable ones count samples
+                frame = number * blocksize if data[pos + 1] == 0xF8 else number
+                if frame >= expected:
+                    points.append((frame, pos))
+                    expected = frame + 1
+        pos += 1
+    return header_bytes, points
+
+
+def _ogg_seek_points(data: bytes, sample_rate: int) -> tuple[int, list[tuple[int, int]]]:
+    """(header_bytes, [(frame, byte_offset)]) for every audio page of an OGG/Opus file"""
+    points = []
+    header_bytes = None
+    pre_skip = 0
+    previous_granule = 0
+    pos = 0
+    while data[pos:pos + 4] == b"OggS":
+        granule = struct.unpack_from("<q", data, pos + 6)[0]
+        segments = data[pos + 26]
+        body = pos + 27 + segments
+        if pos == 0 and data[body:body + 8] == b"OpusHead":
+            pre_skip = struct.unpack_from("<H", data, body + 10)[0]
+        if granule > 0:
+            if header_bytes is None:
+                header_bytes = pos
+            # Opus granule positions always count 48 kHz samples, including pre-skip
+            frame = max(previous_granule - pre_skip, 0) * sample_rate // 48000
+            points.append((frame, pos))
+            previous_granule = granule
+        pos = body + sum(data[pos + 27:body])
+    return header_bytes or pos, points
+
+
+def build_index(path: Path, fmt: str) -> dict:
+    """
+    Describe an encoded recording: its size, length, where the audio starts
+    and a byte offset about every AUDIO_SEEK_INTERVAL seconds.
+
+    A player can fetch bytes [0, header_bytes) once and then Range-request
+    from any seek point.
+    """
+    info = soundfile.info(str(path))
+    data = path.read_bytes()
+    if fmt == "flac":
+        header_bytes, points = _flac_seek_points(data)
+    else:
+        header_bytes, points = _ogg_seek_points(data, info.samplerate)
+
+    spacing = max(int(AUDIO_SEEK_INTERVAL * info.samplerate), 1)
+    seek_points = []
+    for frame, offset in points:
+        if not seek_points or frame - seek_points[-1][0] >= spacing:
+            seek_points.append([frame, offset])
+
+    return {
+        "format": fmt,
+        "media_type": FORMATS[fmt].media_type,
+        "sample_rate": info.samplerate,
+        "channels": info.channels,
+        "frames": info.frames,
+        "duration": info.frames / info.samplerate,
+        "size": len(data),
+        "header_bytes": header_bytes,
+        "seek_points": seek_points,
+    }
+
+
+def load_index(session_id: str) -> Optional[dict]:
+    path = index_path(session_id)
+    if not path.exists():
+        return None
+    with open(path, "rb") as f:
+        return json.load(f)
+
+
+# --- Encoding (runs in the process pool) -------------------------------------
+
+def _encode(wav_path: str, fmt: str) -> dict:
+    """Encode a WAV into the archive format and write its index; returns the index"""
+    spec = FORMATS[fmt]
+    wav_path = Path(wav_path)
+    out_path = wav_path.with_suffix(spec.suffix)
+    part_path = out_path.with_name(f"{out_path.name}.part")
+
+    with wave.open(str(wav_path), "rb") as src:
+        with soundfile.SoundFile(
+            str(part_path), "w",
+            samplerate=src.getframerate(),
+            channels=src.getnchannels(),
+            format=spec.sf_format,
+            subtype=spec.sf_subtype,
+        ) as dst:
+            while frames := src.readframes(_BLOCK_FRAMES):
+                dst.buffer_write(frames, dtype="int16")
+
+    with open(part_path, "rb+") as f:
+        os.fsync(f.fileno())
+    index = build_index(part_path, fmt)
+    os.replace(part_path, out_path)
+
+    session_id = wav_path.stem
+    tmp_index = index_path(session_id).with_suffix(".tmp")
+    with open(tmp_index, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_index, index_path(session_id))
+    return index
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn, not fork: the parent runs threads (logging, persistence pools)
+        _pool = ProcessPoolExecutor(
+            max_workers=AUDIO_ARCHIVE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def archive_enabled() -> bool:
+    return AUDIO_ARCHIVE_FORMAT in ("opus", "flac") and soundfile is not None
+
+
+async def archive_recording(session_id: str, fmt: str = AUDIO_ARCHIVE_FORMAT) -> Optional[dict]:
+    """Encode a finished WAV recording; returns its index, or None if there was nothing to do"""
+    wav_path = recording_path(session_id, "wav")
+    if not archive_enabled() or not wav_path.exists():
+        return None
+
+    loop = asyncio.get_running_loop()
+    index = await loop.run_in_executor(_get_pool(), _encode, str(wav_path), fmt)
+    wav_size = wav_path.stat().st_size
+    if not AUDIO_ARCHIVE_KEEP_WAV:
+        wav_path.unlink(missing_ok=True)
+    logger.info(
+        "🗜️ Archived recording %s as %s: %d -> %d bytes",
+        session_id, fmt, wav_size, index["size"],
+    )
+    return index
+
+
+def unarchived_recordings() -> list[str]:
+    """Sessions whose WAV was never archived (e.g. the worker stopped mid-encode)"""
+    if not archive_enabled():
+        return []
+    return [
+        path.stem for path in RECORDINGS_DIR.glob("*.wav")
+        if not recording_path(path.stem, AUDIO_ARCHIVE_FORMAT).exists()
+    ]
+
+
+def shutdown_audio_archive():
+    """Wait for running encodes, then stop the pool (called from the app lifespan)"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
+
+
+# --- Serving -----------------------------------------------------------------
+
+def negotiate_format(available: dict[str, Path], requested: Optional[str], accept: Optional[str]) -> Optional[str]:
+    """
+    Pick the format to serve: an explicit ?format= wins, otherwise the first
+    stored format the Accept header allows. WAV can always be produced by
+    decoding an archive. Returns None if nothing acceptable exists.
+    """
+    can_transcode = soundfile is not None and any(fmt != "wav" for fmt in available)
+
+    if requested:
+        if requested in available or (requested == "wav" and can_transcode):
+            return requested
+        return None
+
+    accepted = set()
+    for part in (accept or "*/*").split(","):
+        media_type, *params = part.split(";")
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    pass
+        if quality > 0:
+            accepted.add(media_type.strip().lower())
+
+    def allowed(fmt: str) -> bool:
+        media_type = FORMATS[fmt].media_type
+        return bool({media_type, "audio/*", "*/*"} & accepted) or (fmt == "opus" and "audio/opus" in accepted)
+
+    for fmt in available:
+        if allowed(fmt):
+            return fmt
+    if can_transcode and allowed("wav"):
+        return "wav"
+    return None
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    """
+    Resolve a single `bytes=` Range header to inclusive offsets.
+
+    Returns None to serve the whole body (no header, multiple ranges, or a
+    header we don't understand); raises ValueError if the range is unsatisfiable.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, sep, last = header[6:].strip().partition("-")
+    if not sep or not (first or last) or not all(part.isdigit() for part in (first, last) if part):
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("range not satisfiable")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None
+    if start >= size:
+        raise ValueError("range not satisfiable")
+    return start, min(end, size - 1)
+
+
+async def stream_file_range(path: Path, start: int, end: int) -> AsyncIterator[bytes]:
+    """Yield bytes [start, end] of a file"""
+    remaining = end - start + 1
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        while remaining > 0:
+            chunk = await f.read(min(_READ_CHUNK, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def wav_header(frames: int, sample_rate: int, channels: int) -> bytes:
+    """Canonical 44-byte header for 16-bit PCM"""
+    data_size = frames * channels * 2
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate, sample_rate * channels * 2, channels * 2, 16,
+        b"data", data_size,
+    )
+
+
+def transcoded_wav_size(index: dict) -> int:
+    return 44 + index["frames"] * index["channels"] * 2
+
+
+def iter_transcoded_wav(path: Path, index: dict, start: int, end: int) -> Iterator[bytes]:
+    """
+    Decode an archived recording and yield bytes [start, end] of the
+    equivalent WAV. Byte offsets map straight to sample positions, so a
+    Range request only decodes from the nearest sample onwards.
+    """
+    header = wav_header(index["frames"], index["sample_rate"], index["channels"])
+    if start < len(header):
+        yield header[start:end + 1]
+
+    pcm_start = max(start - len(header), 0)
+    remaining = end - len(header) - pcm_start + 1
+    if remaining <= 0:
+        return
+
+    frame_bytes = index["channels"] * 2
+    with soundfile.SoundFile(str(path)) as f:
+        frame = pcm_start // frame_bytes
+        skip = pcm_start - frame * frame_bytes
+        f.seek(frame)
+        while remaining > 0:
+            block = bytes(f.buffer_read(_BLOCK_FRAMES, dtype="int16"))
+            if not block:
+                break
+            chunk = block[skip:skip + remaining]
+            skip = 0
+            remaining -= len(chunk)
+            yield chunk
+    if remaining > 0:
+        # Decoder came up short of the indexed length; pad so Content-Length holds
+        yield bytes(remaining)
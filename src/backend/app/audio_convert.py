@@ -0,0 +1,271 @@
+"""
+Per-session playback format conversion for browser clients
+Streaming polyphase resampling, PCM/float conversion and Opus packets, off the event loop
+"""
+import asyncio
+import logging
+import math
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Mapping, NamedTuple, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# opuslib is optional; without it clients asking for Opus get PCM. Its import
+# raises a plain Exception when the libopus shared library is missing
+try:
+    import opuslib
+except Exception:
+    opuslib = None
+
+from app.config import (
+    AUDIO_SAMPLE_RATE,
+    AUDIO_CLIENT_MIN_RATE,
+    AUDIO_CLIENT_MAX_RATE,
+    AUDIO_CONVERT_WORKERS,
+    AUDIO_RESAMPLE_TAPS,
+    OPUS_BITRATE,
+    OPUS_FRAME_MS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Encoding name -> little-endian sample dtype
+ENCODINGS = {
+    "pcm_s16le": np.dtype("<i2"),
+    "f32le": np.dtype("<f4"),
+}
+# Playback can also be packetized
+PLAYBACK_ENCODINGS = (*ENCODINGS, "opus")
+
+# Rates libopus encodes at natively
+OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+_SEQUENCE = struct.Struct(">I")
+
+# Passband edge as a fraction of the lower Nyquist frequency
+_ROLLOFF = 0.9
+_KAISER_BETA = 8.0
+
+# NumPy releases the GIL for the heavy parts, so threads are enough; the filter
+# state lives with the session and never has to cross a process boundary
+_executor = ThreadPoolExecutor(max_workers=AUDIO_CONVERT_WORKERS, thread_name_prefix="audio-convert")
+
+
+class StreamFormat(NamedTuple):
+    sample_rate: int
+    encoding: str
+
+
+# What ElevenLabs takes from the mic and sends by default, and what the recording and VAD expect
+MIC_FORMAT = StreamFormat(AUDIO_SAMPLE_RATE, "pcm_s16le")
+
+
+class FormatRequest(NamedTuple):
+    """What a client asked for; None fields follow the other end of the stream"""
+    sample_rate: Optional[int]
+    encoding: Optional[str]
+
+    def resolve(self, source: StreamFormat) -> StreamFormat:
+        rate = self.sample_rate or source.sample_rate
+        encoding = self.encoding or source.encoding
+        if encoding == "opus" and rate not in OPUS_RATES:
+            rate = 48000
+        return StreamFormat(rate, encoding)
+
+
+def format_request(params: Mapping[str, str], encodings=ENCODINGS) -> FormatRequest:
+    """
+    Read `sample_rate` and `encoding` from a WebSocket query string. Values we can't serve are ignored (with a warning) rather than
+    failing the call; so is Opus without opuslib, leaving the client on PCM.
+    """
+    rate = params.get("sample_rate")
+    encoding = params.get("encoding")
+    if rate is not None:
+        try:
+            rate = int(rate)
+        except ValueError:
+            rate = 0
+        if not AUDIO_CLIENT_MIN_RATE <= rate <= AUDIO_CLIENT_MAX_RATE:
+            logger.warning("⚠️ Ignoring unsupported sample_rate: %s", params.get("sample_rate"))
+            rate = None
+    if encoding is not None and encoding not in encodings:
+        logger.warning("⚠️ Ignoring unsupported encoding: %s", encoding)
+        encoding = None
+    elif encoding == "opus" and opuslib is None:
+        logger.warning("⚠️ Opus requested but opuslib/libopus isn't available; sending PCM")
+        encoding = None
+    return FormatRequest(rate, encoding)
+
+
+def format_info(fmt: StreamFormat) -> dict:
+    """A format as announced to the client in `ready`"""
+    info = fmt._asdict()
+    if fmt.encoding == "opus":
+        info["frame_ms"] = OPUS_FRAME_MS
+    return info
+
+
+def agent_format(name: Optional[str]) -> Optional[StreamFormat]:
+    """
+    The agent's output format from its conversation_initiation_metadata
+    ("pcm_16000"); None for formats we don't convert (e.g. "ulaw_8000")
+    """
+    if not name:
+        return MIC_FORMAT
+    codec, _, rate = name.partition("_")
+    if codec != "pcm" or not rate.isdigit():
+        return None
+    return StreamFormat(int(rate), "pcm_s16le")
+
+
+@lru_cache(maxsize=32)
+def _filter_bank(up: int, down: int, width: int) -> np.ndarray:
+    """
+    Kaiser-windowed sinc low-pass for resampling by up/down, split into `up`
+    phases of `width` taps. Taps are reversed so each phase lines up with a
+    window of input samples in time order.
+    """
+    length = up * width
+    cutoff = _ROLLOFF * 0.5 / max(up, down)
+    t = np.arange(length) - (length - 1) / 2
+    h = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(length, _KAISER_BETA)
+    bank = h.reshape(width, up).T
+    # Unity gain in every phase, so a constant signal comes out constant
+    bank = bank / bank.sum(axis=1, keepdims=True)
+    return np.ascontiguousarray(bank[:, ::-1], dtype=np.float32)
+
+
+class StreamingResampler:
+    """
+    Rational-ratio polyphase resampler for a continuous stream cut into
+    arbitrary chunks.
+
+    The last `width - 1` input samples and the position of the next output
+    sample carry over between chunks, so output is the same as resampling
+    the whole stream at once. Each chunk is one vectorized pass: every output
+    sample's input window and filter phase are gathered and dotted together.
+    """
+
+    __slots__ = ("up", "down", "width", "_bank", "_history", "_pos")
+
+    def __init__(self, in_rate: int, out_rate: int, taps: int = AUDIO_RESAMPLE_TAPS):
+        g = math.gcd(in_rate, out_rate)
+        self.up = out_rate // g
+        self.down = in_rate // g
+        # Downsampling needs a proportionally longer filter for the same transition band
+        self.width = max(taps * -(-self.down // self.up), 2)
+        self._bank = _filter_bank(self.up, self.down, self.width)
+        self._history = np.zeros(self.width - 1, dtype=np.float32)
+        # Next output sample, in input samples * up from the start of the history
+        self._pos = (self.width - 1) * self.up
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        if not len(samples):
+            return np.zeros(0, dtype=np.float32)
+        buf = np.concatenate((self._history, samples.astype(np.float32, copy=False)))
+        end = len(buf) * self.up
+        count = max(-(-(end - self._pos) // self.down), 0)
+
+        if count:
+            pos = self._pos + np.arange(count, dtype=np.int64) * self.down
+            index, phase = np.divmod(pos, self.up)
+            windows = sliding_window_view(buf, self.width)[index - (self.width - 1)]
+            out = np.einsum("ij,ij->i", windows, self._bank[phase])
+        else:
+            # Too few new samples for an output yet; they wait in the history
+            out = np.zeros(0, dtype=np.float32)
+
+        consumed = len(buf) - (self.width - 1)
+        self._pos += count * self.down - consumed * self.up
+        self._history = buf[consumed:].copy()
+        return out
+
+
+class AudioConverter:
+    """Converts one direction of a session's audio between two stream formats"""
+
+    def __init__(self, source: StreamFormat, target: StreamFormat):
+        self.source = source
+        self.target = target
+        self._in_dtype = ENCODINGS[source.encoding]
+        self._out_dtype = ENCODINGS[target.encoding]
+        self._resampler = (
+            StreamingResampler(source.sample_rate, target.sample_rate)
+            if source.sample_rate != target.sample_rate else None
+        )
+        # Bytes of a sample split across two chunks
+        self._partial = b""
+
+    def convert(self, chunk: bytes) -> bytes:
+        if self._partial:
+            chunk = self._partial + chunk
+        usable = len(chunk) - len(chunk) % self._in_dtype.itemsize
+        self._partial = chunk[usable:]
+        if not usable:
+            return b""
+        samples = np.frombuffer(chunk, dtype=self._in_dtype, count=usable // self._in_dtype.itemsize)
+
+        if self._in_dtype.kind == "i":
+            samples = samples * np.float32(1 / 32768)
+        if self._resampler is not None:
+            samples = self._resampler.process(samples)
+
+        if self._out_dtype.kind == "i":
+            samples = np.clip(np.rint(samples * 32768), -32768, 32767)
+        return samples.astype(self._out_dtype).tobytes()
+
+
+class OpusPacketizer:
+    """
+    Encodes PCM into Opus packets of OPUS_FRAME_MS each, one WebSocket
+    message per packet, prefixed with a 4-byte big-endian sequence number so
+    the client can timestamp packets and spot gaps.
+
+    Samples short of a whole frame wait for the next chunk. The encoder uses
+    the "voip" application, since everything it carries is speech.
+    """
+
+    def __init__(self, source: StreamFormat, sample_rate: int, frame_ms: int = OPUS_FRAME_MS, bitrate: int = OPUS_BITRATE):
+        self._pcm = converter_for(source, StreamFormat(sample_rate, "pcm_s16le"))
+        self._encoder = opuslib.Encoder(sample_rate, 1, "voip")
+        self._encoder.bitrate = bitrate
+        self._frame_samples = sample_rate * frame_ms // 1000
+        self._frame_bytes = self._frame_samples * 2
+        self._pending = b""
+        self.sequence = 0
+
+    def convert(self, chunk: bytes) -> list[bytes]:
+        if self._pcm:
+            chunk = self._pcm.convert(chunk)
+        data = self._pending + chunk
+        usable = len(data) - len(data) % self._frame_bytes
+        packets = []
+        for offset in range(0, usable, self._frame_bytes):
+            packet = self._encoder.encode(data[offset:offset + self._frame_bytes], self._frame_samples)
+            packets.append(_SEQUENCE.pack(self.sequence) + packet)
+            self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        self._pending = data[usable:]
+        return packets
+
+
+def converter_for(source: StreamFormat, target: StreamFormat):
+    """A converter between two formats, or None when they already match"""
+    if target.encoding == "opus":
+        return OpusPacketizer(source, target.sample_rate)
+    return AudioConverter(source, target) if source != target else None
+
+
+async def convert(converter, chunk: bytes):
+    """
+    Convert a chunk in the worker pool: bytes of PCM, or a list of packets
+    from an OpusPacketizer. Chunks of one stream must be awaited in order,
+    since the converter carries state from one to the next.
+    """
+    return await asyncio.get_running_loop().run_in_executor(_executor, converter.convert, chunk)
+
+
+def shutdown_audio_convert():
+    """Stop the conversion pool (called from the app lifespan)"""
+    _executor.shutdown(wait=True)
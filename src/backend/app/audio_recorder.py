@@ -0,0 +1,115 @@
+"""
+Streaming WAV recorder for user microphone audio
+Writes PCM frames to disk as they arrive instead of buffering the whole call
+"""
+import json
+import os
+import wave
+from pathlib import Path
+from typing import Optional
+
+from app.config import (
+    RECORDINGS_DIR,
+    AUDIO_SAMPLE_RATE,
+    AUDIO_SAMPLE_WIDTH,
+    AUDIO_CHANNELS,
+    RECORDER_BUFFER_BYTES,
+)
+
+
+class StreamingWavRecorder:
+    """
+    Appends PCM frames to a WAV file incrementally.
+
+    Frames go to a `.wav.part` file through a fixed-size write buffer, so the
+    memory held per session is bounded by RECORDER_BUFFER_BYTES no matter how
+    long the call runs. The RIFF/data sizes are patched by the wave module on
+    close and the file is then renamed to its final `.wav` name, so readers
+    never see a half-written recording.
+
+    When chunks are written with their position in the call (`at`, as the VAD
+    gate does), gaps are left out of the file and a `.segments.json` timing
+    map records where each stretch of the recording sits in the call.
+    """
+
+    def __init__(self, session_id: str, directory: Path = RECORDINGS_DIR):
+        self.session_id = session_id
+        self.path = directory / f"{session_id}.wav"
+        self._part_path = directory / f"{session_id}.wav.part"
+        self._file = None
+        self._wav: Optional[wave.Wave_write] = None
+        self.frames_written = 0
+        self.bytes_written = 0
+        # [call offset, recording offset, frames], all in sample frames
+        self.segments: list[list[int]] = []
+
+    @property
+    def is_open(self) -> bool:
+        return self._wav is not None
+
+    def open(self):
+        """Open the partial file and write a provisional WAV header"""
+        if self._wav is not None:
+            return
+        self._file = open(self._part_path, "wb", buffering=RECORDER_BUFFER_BYTES)
+        self._wav = wave.open(self._file, "wb")
+        self._wav.setnchannels(AUDIO_CHANNELS)
+        self._wav.setsampwidth(AUDIO_SAMPLE_WIDTH)
+        self._wav.setframerate(AUDIO_SAMPLE_RATE)
+
+    def write(self, chunk: bytes, at: Optional[int] = None):
+        """Append a chunk of raw PCM audio, optionally with its frame offset in the call"""
+        if not chunk:
+            return
+        if self._wav is None:
+            self.open()
+        frames = len(chunk) // (AUDIO_SAMPLE_WIDTH * AUDIO_CHANNELS)
+        if at is None:
+            at = self.segments[-1][0] + self.segments[-1][2] if self.segments else 0
+        if self.segments and self.segments[-1][0] + self.segments[-1][2] == at:
+            self.segments[-1][2] += frames
+        else:
+            self.segments.append([at, self.frames_written, frames])
+        self._wav.writeframesraw(chunk)
+        self.bytes_written += len(chunk)
+        self.frames_written += frames
+
+    @property
+    def segments_path(self) -> Path:
+        return self.path.with_suffix(".segments.json")
+
+    def _write_segments(self):
+        """Timing map, only needed when the recording skips parts of the call"""
+        if len(self.segments) == 1 and self.segments[0][0] == 0:
+            return
+        tmp_path = self.segments_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "sample_rate": AUDIO_SAMPLE_RATE,
+                "fields": ["call_offset", "recording_offset", "frames"],
+                "segments": self.segments,
+            }, f)
+        os.replace(tmp_path, self.segments_path)
+
+    def close(self) -> Optional[str]:
+        """
+        Finish the recording and move it into place.
+
+        Returns the final WAV path, or None if nothing was recorded.
+        """
+        if self._wav is None:
+            return str(self.path) if self.path.exists() else None
+
+        # wave patches the RIFF and data chunk sizes on close
+        self._wav.close()
+        self._file.close()
+        self._wav = None
+        self._file = None
+
+        if self.bytes_written == 0:
+            self._part_path.unlink(missing_ok=True)
+            return None
+
+        self._write_segments()
+        os.replace(self._part_path, self.path)
+        return str(self.path)
@@ -0,0 +1,177 @@
+"""
+Indexed catalog of saved conversations
+Lets /api/conversations page and filter without opening every transcript
+
+Rebuild from the files on disk with: python -m app.catalog rebuild
+"""
+import base64
+import gzip
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from app.config import CATALOG_DB_PATH, CONVERSATIONS_DIR
+from app.sqlite_db import SQLiteDatabase
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = "session_id, user_id, started_at, ended_at, message_count, status, profile"
+
+
+def _timestamp(value) -> Optional[str]:
+    """Normalize datetimes (or their ISO strings) so they sort lexicographically"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        # Sessions are stored as naive UTC
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec="microseconds")
+
+
+def encode_cursor(started_at: str, session_id: str) -> str:
+    raw = json.dumps([started_at, session_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    started_at, session_id = json.loads(base64.urlsafe_b64decode(padded))
+    return started_at, session_id
+
+
+class ConversationCatalog:
+    """
+    SQLite index with one row of summary fields per conversation.
+
+    Rows are written whenever a conversation is saved. Listing uses keyset
+    pagination on (started_at, session_id), so each page costs the same no
+    matter how deep into the archive it is.
+    """
+
+    def __init__(self, path: Path = CATALOG_DB_PATH):
+        self._db = SQLiteDatabase(path, schema=(
+            """
+            CREATE TABLE IF NOT EXISTS conversations (
+                session_id TEXT PRIMARY KEY,
+                user_id TEXT,
+                started_at TEXT NOT NULL,
+                ended_at TEXT,
+                message_count INTEGER NOT NULL DEFAULT 0,
+                status TEXT,
+                profile TEXT
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS conversations_started ON conversations (started_at, session_id)",
+            "CREATE INDEX IF NOT EXISTS conversations_user ON conversations (user_id, started_at, session_id)",
+            "CREATE INDEX IF NOT EXISTS conversations_status ON conversations (status, started_at, session_id)",
+        ))
+
+    def upsert(self, data: dict):
+        """
+        Index a conversation from its JSON-mode session dict.
+
+        Either the full dict with messages, or a summary carrying message_count.
+        """
+        row = (
+            data["session_id"],
+            data.get("user_id"),
+            _timestamp(data["started_at"]),
+            _timestamp(data.get("ended_at")),
+            data.get("message_count", len(data.get("messages", []))),
+            data.get("status"),
+            json.dumps(data["profile"]) if data.get("profile") is not None else None,
+        )
+        self._db.execute(f"INSERT OR REPLACE INTO conversations ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+
+    def count(self) -> int:
+        return self._db.fetchone("SELECT COUNT(*) FROM conversations")[0]
+
+    def list(
+        self,
+        user_id: Optional[str] = None,
+        status: Optional[str] = None,
+        started_after: Optional[datetime] = None,
+        started_before: Optional[datetime] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        descending: bool = True,
+    ) -> tuple[list[dict], Optional[str]]:
+        """Return one page of summaries and the cursor for the next page (None at the end)"""
+        clauses, params = [], []
+        if user_id is not None:
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if started_after is not None:
+            clauses.append("started_at >= ?")
+            params.append(_timestamp(started_after))
+        if started_before is not None:
+            clauses.append("started_at < ?")
+            params.append(_timestamp(started_before))
+        if cursor:
+            started_at, session_id = decode_cursor(cursor)
+            op = "<" if descending else ">"
+            clauses.append(f"(started_at, session_id) {op} (?, ?)")
+            params.extend([started_at, session_id])
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        direction = "DESC" if descending else "ASC"
+        query = (
+            f"SELECT {_COLUMNS} FROM conversations {where} "
+            f"ORDER BY started_at {direction}, session_id {direction} LIMIT ?"
+        )
+        # Fetch one extra row to know whether there is another page
+        rows = self._db.fetchall(query, (*params, limit + 1))
+
+        items = [
+            {
+                "session_id": session_id,
+                "user_id": user_id,
+                "started_at": started_at,
+                "ended_at": ended_at,
+                "message_count": message_count,
+                "status": status,
+                "profile": json.loads(profile) if profile else None,
+            }
+            for session_id, user_id, started_at, ended_at, message_count, status, profile in rows[:limit]
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            last = items[-1]
+            next_cursor = encode_cursor(last["started_at"], last["session_id"])
+        return items, next_cursor
+
+    def rebuild(self, directory: Path = CONVERSATIONS_DIR) -> int:
+        """Re-index every conversation file on disk; returns how many were indexed"""
+        self._db.execute("DELETE FROM conversations")
+        indexed = 0
+        for json_file in [*directory.glob("*.json"), *directory.glob("*.json.gz")]:
+            try:
+                opener = gzip.open if json_file.suffix == ".gz" else open
+                with opener(json_file, "rb") as f:
+                    self.upsert(json.load(f))
+                indexed += 1
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("⚠️ Skipping %s: %s", json_file.name, e)
+        return indexed
+
+    def close(self):
+        self._db.close()
+
+
+catalog = ConversationCatalog()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        print("Usage: python -m app.catalog rebuild")
+        sys.exit(1)
+    count = catalog.rebuild()
+    print(f"✅ Indexed {count} conversations into {CATALOG_DB_PATH}")
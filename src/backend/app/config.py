@@ -6,11 +6,21 @@ from pathlib import Path
 ROOT_DIR = Path(__file__).resolve().parent.parent.parent.parent
 load_dotenv(ROOT_DIR / ".env")
 
-# Base paths
+# Base paths; DATA_DIR holds recordings, transcripts, journals and the SQLite databases
 BASE_DIR = Path(__file__).resolve().parent.parent
-DATA_DIR = BASE_DIR / "data"
+DATA_DIR = Path(os.getenv("DATA_DIR", str(BASE_DIR / "data")))
 RECORDINGS_DIR = DATA_DIR / "recordings"
 CONVERSATIONS_DIR = DATA_DIR / "conversations"
+CATALOG_DB_PATH = DATA_DIR / "catalog.db"
+# Saved transcripts: "none" writes .json, "gzip" writes .json.gz
+CONVERSATION_COMPRESSION = os.getenv("CONVERSATION_COMPRESSION", "none")
+PERSIST_WORKERS = int(os.getenv("PERSIST_WORKERS", "4"))
+
+# Live session journals, group-committed every JOURNAL_FLUSH_INTERVAL seconds
+JOURNAL_DIR = DATA_DIR / "journal"
+JOURNAL_DIR.mkdir(parents=True, exist_ok=True)
+JOURNAL_FLUSH_INTERVAL = float(os.getenv("JOURNAL_FLUSH_INTERVAL", "0.2"))
+JOURNAL_FSYNC = os.getenv("JOURNAL_FSYNC", "true").lower() == "true"
 
 # Create directories if they don't exist
 RECORDINGS_DIR.mkdir(parents=True, exist_ok=True)
@@ -19,8 +29,154 @@ CONVERSATIONS_DIR.mkdir(parents=True, exist_ok=True)
 # Eleven Labs
 ELEVEN_LABS_API_KEY = os.getenv("ELEVEN_LABS_API_KEY")
 ELEVENLABS_AGENT_ID = os.getenv("ELEVENLABS_AGENT_ID", "agent_4801kbjgnpzvftarm9ast510wj2q")
+ELEVENLABS_API_URL = os.getenv("ELEVENLABS_API_URL", "https://api.elevenlabs.io/v1")
+ELEVENLABS_MAX_CONNECTIONS = int(os.getenv("ELEVENLABS_MAX_CONNECTIONS", "20"))
+ELEVENLABS_MAX_CONCURRENCY = int(os.getenv("ELEVENLABS_MAX_CONCURRENCY", "32"))
+# Signed URLs are valid for 15 minutes; discard pooled ones well before that
+SIGNED_URL_POOL_SIZE = int(os.getenv("SIGNED_URL_POOL_SIZE", "2"))
+SIGNED_URL_TTL = float(os.getenv("SIGNED_URL_TTL", "600"))
 
 # Supabase
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
+
+# Audio (user microphone PCM)
+AUDIO_SAMPLE_RATE = int(os.getenv("AUDIO_SAMPLE_RATE", "16000"))
+AUDIO_SAMPLE_WIDTH = 2  # 16-bit
+AUDIO_CHANNELS = 1  # Mono
+RECORDER_BUFFER_BYTES = int(os.getenv("RECORDER_BUFFER_BYTES", str(64 * 1024)))
+# Optional energy VAD on the mic stream. Frames louder than VAD_THRESHOLD_DB
+# (dBFS) and VAD_MARGIN_DB above the noise floor count as speech; silence past
+# the hangover is left out of the recording and thinned upstream to one chunk
+# per VAD_SILENCE_KEEPALIVE_MS (0 drops it)
+VAD_ENABLED = os.getenv("VAD_ENABLED", "false").lower() == "true"
+VAD_FRAME_MS = int(os.getenv("VAD_FRAME_MS", "20"))
+VAD_THRESHOLD_DB = float(os.getenv("VAD_THRESHOLD_DB", "-50"))
+VAD_MARGIN_DB = float(os.getenv("VAD_MARGIN_DB", "12"))
+VAD_HANGOVER_MS = int(os.getenv("VAD_HANGOVER_MS", "600"))
+VAD_PREROLL_MS = int(os.getenv("VAD_PREROLL_MS", "200"))
+VAD_SILENCE_KEEPALIVE_MS = int(os.getenv("VAD_SILENCE_KEEPALIVE_MS", "1000"))
+# Browser clients pick their playback format on the WebSocket query string
+# (sample_rate/encoding; "pcm_s16le" or "f32le"); the mic is always 16kHz Int16.
+# Conversion runs in AUDIO_CONVERT_WORKERS threads, resampling with a
+# windowed-sinc filter of AUDIO_RESAMPLE_TAPS taps per output sample
+AUDIO_CLIENT_MIN_RATE = int(os.getenv("AUDIO_CLIENT_MIN_RATE", "8000"))
+AUDIO_CLIENT_MAX_RATE = int(os.getenv("AUDIO_CLIENT_MAX_RATE", "48000"))
+AUDIO_CONVERT_WORKERS = int(os.getenv("AUDIO_CONVERT_WORKERS", "2"))
+AUDIO_RESAMPLE_TAPS = int(os.getenv("AUDIO_RESAMPLE_TAPS", "16"))
+# Playback can also ask for encoding=opus (needs the opuslib package and libopus,
+# otherwise PCM is sent): OPUS_FRAME_MS packets at OPUS_BITRATE bits/s, each
+# prefixed with a 4-byte big-endian sequence number
+OPUS_BITRATE = int(os.getenv("OPUS_BITRATE", "24000"))
+OPUS_FRAME_MS = int(os.getenv("OPUS_FRAME_MS", "20"))
+# Voice clone samples cut from each finished call: the best-scoring speech up to
+# VOICE_SAMPLE_MAX_SECONDS, loudness-normalized to VOICE_SAMPLE_TARGET_DB (dBFS).
+# Calls with less than VOICE_SAMPLE_MIN_SECONDS of usable speech are skipped
+VOICE_CLONE_ENABLED = os.getenv("VOICE_CLONE_ENABLED", "true").lower() == "true"
+VOICE_SAMPLE_MAX_SECONDS = float(os.getenv("VOICE_SAMPLE_MAX_SECONDS", "120"))
+VOICE_SAMPLE_MIN_SECONDS = float(os.getenv("VOICE_SAMPLE_MIN_SECONDS", "20"))
+VOICE_SAMPLE_TARGET_DB = float(os.getenv("VOICE_SAMPLE_TARGET_DB", "-20"))
+# Finished recordings are re-encoded in a process pool: "opus" (OGG/Opus, ~10x
+# smaller), "flac" (lossless, ~2x smaller) or "none". Needs the soundfile package
+AUDIO_ARCHIVE_FORMAT = os.getenv("AUDIO_ARCHIVE_FORMAT", "opus")
+AUDIO_ARCHIVE_WORKERS = int(os.getenv("AUDIO_ARCHIVE_WORKERS", "2"))
+AUDIO_ARCHIVE_KEEP_WAV = os.getenv("AUDIO_ARCHIVE_KEEP_WAV", "false").lower() == "true"
+# Spacing of the seek points stored in each archive's index
+AUDIO_SEEK_INTERVAL = float(os.getenv("AUDIO_SEEK_INTERVAL", "1.0"))
+
+# Profile persistence: "rest" (PostgREST over a pooled async HTTP client)
+# or "postgres" (direct asyncpg connection pool, needs SUPABASE_DB_URL)
+PERSISTENCE_BACKEND = os.getenv("PERSISTENCE_BACKEND", "rest")
+SUPABASE_DB_URL = os.getenv("SUPABASE_DB_URL")
+PERSISTENCE_POOL_SIZE = int(os.getenv("PERSISTENCE_POOL_SIZE", "10"))
+PERSISTENCE_TIMEOUT = float(os.getenv("PERSISTENCE_TIMEOUT", "5.0"))
+PERSISTENCE_RETRIES = int(os.getenv("PERSISTENCE_RETRIES", "3"))
+PERSISTENCE_RETRY_BACKOFF = float(os.getenv("PERSISTENCE_RETRY_BACKOFF", "0.25"))
+
+# Write-behind queue for profile upserts
+SPOOL_DIR = DATA_DIR / "spool"
+SPOOL_DIR.mkdir(parents=True, exist_ok=True)
+PROFILE_WRITE_BATCH_SIZE = int(os.getenv("PROFILE_WRITE_BATCH_SIZE", "50"))
+PROFILE_WRITE_FLUSH_INTERVAL = float(os.getenv("PROFILE_WRITE_FLUSH_INTERVAL", "1.0"))
+
+# Per-worker read-through cache of saved conversations (LRU, bounded by entry
+# count and bytes, with a TTL that caps staleness from writes on other workers).
+# Files over a quarter of CONVERSATION_CACHE_MAX_BYTES are streamed, never cached
+CONVERSATION_CACHE_SIZE = int(os.getenv("CONVERSATION_CACHE_SIZE", "256"))
+CONVERSATION_CACHE_MAX_BYTES = int(os.getenv("CONVERSATION_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CONVERSATION_CACHE_TTL = float(os.getenv("CONVERSATION_CACHE_TTL", "300"))
+
+# Logging: LOG_FORMAT is "text" or "json"; per-frame relay events go to the
+# hot-path logger, which is rate limited to LOG_HOT_PATH_RATE records/second
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_HOT_PATH_LEVEL = os.getenv("LOG_HOT_PATH_LEVEL", LOG_LEVEL).upper()
+LOG_HOT_PATH_RATE = float(os.getenv("LOG_HOT_PATH_RATE", "20"))
+
+# Bridge relay queues, one per direction (policies: drop_oldest, drop_newest,
+# coalesce). Agent audio for the browser is dropped oldest-first beyond
+# DOWNSTREAM_QUEUE_SIZE chunks or DOWNSTREAM_MAX_LAG_MS of waiting; mic audio for
+# ElevenLabs is merged into frames of up to UPSTREAM_COALESCE_BYTES while the
+# upstream is behind, then dropped oldest-first beyond UPSTREAM_QUEUE_SIZE
+DOWNSTREAM_QUEUE_SIZE = int(os.getenv("DOWNSTREAM_QUEUE_SIZE", "50"))
+DOWNSTREAM_MAX_LAG_MS = int(os.getenv("DOWNSTREAM_MAX_LAG_MS", "2000"))
+DOWNSTREAM_DROP_POLICY = os.getenv("DOWNSTREAM_DROP_POLICY", "drop_oldest")
+UPSTREAM_QUEUE_SIZE = int(os.getenv("UPSTREAM_QUEUE_SIZE", "25"))
+UPSTREAM_DROP_POLICY = os.getenv("UPSTREAM_DROP_POLICY", "coalesce")
+UPSTREAM_COALESCE_BYTES = int(os.getenv("UPSTREAM_COALESCE_BYTES", str(AUDIO_SAMPLE_RATE * AUDIO_SAMPLE_WIDTH // 2)))
+# How long the writers get to flush their queues when a bridge closes
+BRIDGE_DRAIN_TIMEOUT = float(os.getenv("BRIDGE_DRAIN_TIMEOUT", "2.0"))
+
+# ElevenLabs socket: keepalive pings catch dead links before the user notices,
+# permessage-deflate is off (base64 audio barely compresses and costs CPU both
+# ends), and frames are capped at UPSTREAM_MAX_MESSAGE_BYTES
+UPSTREAM_PING_INTERVAL = float(os.getenv("UPSTREAM_PING_INTERVAL", "10"))
+UPSTREAM_PING_TIMEOUT = float(os.getenv("UPSTREAM_PING_TIMEOUT", "10"))
+UPSTREAM_COMPRESSION = os.getenv("UPSTREAM_COMPRESSION", "false").lower() == "true"
+UPSTREAM_MAX_MESSAGE_BYTES = int(os.getenv("UPSTREAM_MAX_MESSAGE_BYTES", str(2 * 1024 * 1024)))
+# A dropped ElevenLabs connection is re-established with a fresh signed URL,
+# retrying with exponential backoff; the last UPSTREAM_RING_SECONDS of mic audio
+# is held meanwhile and the transcript (up to UPSTREAM_RESUME_CONTEXT_CHARS) is
+# replayed as context. 0 attempts ends the call on the first drop instead
+UPSTREAM_RECONNECT_ATTEMPTS = int(os.getenv("UPSTREAM_RECONNECT_ATTEMPTS", "3"))
+UPSTREAM_RECONNECT_BACKOFF = float(os.getenv("UPSTREAM_RECONNECT_BACKOFF", "0.5"))
+UPSTREAM_RING_SECONDS = float(os.getenv("UPSTREAM_RING_SECONDS", "5"))
+UPSTREAM_RESUME_CONTEXT_CHARS = int(os.getenv("UPSTREAM_RESUME_CONTEXT_CHARS", "4000"))
+
+# Session registry shared between /start and /ws. "memory" only works with a
+# single worker; "sqlite" covers several workers on one host, "redis" (needs
+# the redis package) covers several hosts
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_DB_PATH = Path(os.getenv("SESSION_DB_PATH", str(DATA_DIR / "sessions.db")))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Unclaimed sessions expire after SESSION_TTL; claimed ones after ACTIVE_SESSION_TTL
+SESSION_TTL = float(os.getenv("SESSION_TTL", "300"))
+ACTIVE_SESSION_TTL = float(os.getenv("ACTIVE_SESSION_TTL", str(4 * 60 * 60)))
+SESSION_REAP_INTERVAL = float(os.getenv("SESSION_REAP_INTERVAL", "30"))
+
+# Admission control: live bridges per worker, live sessions per user, and how
+# many WebSockets may wait (for up to ADMISSION_QUEUE_TIMEOUT s) for a free slot
+MAX_BRIDGES_PER_WORKER = int(os.getenv("MAX_BRIDGES_PER_WORKER", "100"))
+MAX_SESSIONS_PER_USER = int(os.getenv("MAX_SESSIONS_PER_USER", "2"))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "20"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "30"))
+
+# Post-call job queue (transcript compaction, profile sync, voice clone, archive).
+# "sqlite" survives restarts and is shared by workers on one host; "memory" doesn't.
+# Failed jobs retry after JOB_RETRY_BACKOFF * 2^n seconds; running jobs whose
+# lease lapses (the worker died) are picked up again
+JOB_STORE = os.getenv("JOB_STORE", "sqlite")
+JOB_DB_PATH = Path(os.getenv("JOB_DB_PATH", str(DATA_DIR / "jobs.db")))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "2.0"))
+JOB_LEASE = float(os.getenv("JOB_LEASE", "600"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", str(7 * 24 * 60 * 60)))
+
+# Client tools the agent calls mid-conversation run beside the audio relay; each
+# call gets TOOL_TIMEOUT seconds, and at most TOOL_MAX_CONCURRENCY calls of one
+# tool run at once on a worker (tools can override both when registering)
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "10"))
+TOOL_MAX_CONCURRENCY = int(os.getenv("TOOL_MAX_CONCURRENCY", "16"))
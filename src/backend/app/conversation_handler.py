@@ -4,26 +4,32 @@ Manages the conversation flow and audio recording
 """
 import json
 import asyncio
+import logging
 import uuid
-import wave
-import io
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, Callable
-import httpx
 
 from app.config import (
-    ELEVEN_LABS_API_KEY, 
     ELEVENLABS_AGENT_ID,
+    VAD_ENABLED,
     RECORDINGS_DIR,
     CONVERSATIONS_DIR
 )
 from app.models import (
     ConversationSession, 
-    ConversationMessage, 
     MessageRole,
     DatingProfile
 )
+from app.transcript import LiveTranscript
+from app.audio_recorder import StreamingWavRecorder
+from app.vad import SpeechGate
+from app.http_client import elevenlabs_request
+from app.conversation_store import save_conversation
+from app.journal import SessionJournal, compact_journal
+from app.metrics import ACTIVE_SESSIONS
+
+logger = logging.getLogger(__name__)
 
 
 class ConversationManager:
@@ -38,18 +44,35 @@ class ConversationManager:
             started_at=datetime.utcnow(),
             profile=DatingProfile()  # Initialize empty profile
         )
-        self.audio_chunks: list[bytes] = []
+        # Turns live here while the call runs; session.messages stays empty until to_session()
+        self.transcript = LiveTranscript(self.session.started_at)
+        self.recorder = StreamingWavRecorder(session_id)
+        self.audio_chunk_count = 0
+        self.gate = SpeechGate() if VAD_ENABLED else None
+        self.relay_queues = {}  # Set by the bridge: direction -> RelayQueue
         self.is_active = False
+        self.journal = SessionJournal(session_id)
+        self.journal.append({
+            "e": "start",
+            "session_id": session_id,
+            "user_id": user_id,
+            "started_at": self.session.started_at.isoformat(),
+        })
         
     def add_message(self, role: MessageRole, content: str, audio_file: Optional[str] = None):
         """Add a message to the conversation"""
-        message = ConversationMessage(
-            role=role,
-            content=content,
-            timestamp=datetime.utcnow(),
-            audio_file=audio_file
-        )
-        self.session.messages.append(message)
+        timestamp = self.transcript.append(role, content, audio_file)
+        self.journal.append({
+            "e": "msg",
+            "role": role.value,
+            "content": content,
+            "timestamp": timestamp.isoformat(),
+            "audio_file": audio_file,
+        })
+    
+    def to_session(self) -> ConversationSession:
+        """The full session model, transcript included"""
+        return self.session.model_copy(update={"messages": self.transcript.to_messages()})
     
     def update_profile(self, **kwargs):
         """Update the dating profile with new information"""
@@ -66,84 +89,94 @@ class ConversationManager:
         if kwargs.get("looking_for"):
             profile.looking_for = kwargs["looking_for"]
         
-        print(f"📝 Profile updated: {kwargs}")
+        logger.info("📝 Profile updated: %s", kwargs)
+        self.journal.append({"e": "profile", "profile": profile.model_dump()})
         return profile
         
-    def add_audio_chunk(self, chunk: bytes):
-        """Add an audio chunk from user's speech"""
-        self.audio_chunks.append(chunk)
+    def add_audio_chunk(self, chunk: bytes) -> list[bytes]:
+        """
+        Stream an audio chunk from user's speech to the recording on disk.
         
-    def save_audio_recording(self) -> str:
-        """Save all audio chunks as a WAV file"""
-        if not self.audio_chunks:
-            return None
-            
-        audio_path = RECORDINGS_DIR / f"{self.session_id}.wav"
+        Returns the chunks to forward upstream: just this one, or with VAD
+        enabled whatever the speech gate lets through (possibly none).
+        """
+        if not chunk:
+            return []
+        self.audio_chunk_count += 1
+        if self.gate is None:
+            self.recorder.write(chunk)
+            return [chunk]
         
-        # Combine all chunks
-        all_audio = b''.join(self.audio_chunks)
+        result = self.gate.feed(chunk)
+        for offset, speech_chunk in result.store:
+            self.recorder.write(speech_chunk, at=offset)
+        return result.forward
         
-        # Save as WAV (assuming 16kHz, 16-bit, mono - adjust if needed)
-        with wave.open(str(audio_path), 'wb') as wav_file:
-            wav_file.setnchannels(1)  # Mono
-            wav_file.setsampwidth(2)  # 16-bit
-            wav_file.setframerate(16000)  # 16kHz
-            wav_file.writeframes(all_audio)
+    def save_audio_recording(self) -> str:
+        """Finish the streamed recording and return the WAV path"""
+        audio_path = self.recorder.close()
+        if not audio_path:
+            return None
             
-        self.session.audio_recording_path = str(audio_path)
-        return str(audio_path)
+        self.session.audio_recording_path = audio_path
+        return audio_path
     
-    def save_conversation_json(self) -> str:
-        """Save conversation to JSON file"""
-        json_path = CONVERSATIONS_DIR / f"{self.session_id}.json"
-        
-        # Convert session to dict for JSON serialization
-        session_dict = self.session.model_dump(mode='json')
-        
-        with open(json_path, 'w') as f:
-            json.dump(session_dict, f, indent=2, default=str)
-            
-        return str(json_path)
+    def mark_ended(self, status: str = "completed"):
+        """Record the end of the session in memory and in the journal"""
+        self.session.ended_at = datetime.utcnow()
+        self.session.status = status
+        self.journal.append({
+            "e": "end",
+            "ended_at": self.session.ended_at.isoformat(),
+            "status": status,
+            "audio_recording_path": self.session.audio_recording_path,
+        })
+    
+    async def save_conversation_json(self) -> str:
+        """Compact the journal into the final JSON file (off the event loop, atomically)"""
+        await self.journal.close()
+        json_path = await compact_journal(self.session_id)
+        if json_path is None:
+            # Journal already gone (e.g. recovered elsewhere); write what we hold
+            json_path = await save_conversation(self.to_session())
+        return json_path
     
-    def end_session(self):
+    async def end_session(self):
         """End the conversation session and save everything"""
-        self.session.ended_at = datetime.utcnow()
-        self.session.status = "completed"
         self.is_active = False
         
         # Save audio and conversation
         audio_path = self.save_audio_recording()
-        json_path = self.save_conversation_json()
+        self.mark_ended()
+        json_path = await self.save_conversation_json()
         
         return {
             "audio_path": audio_path,
             "json_path": json_path,
-            "session": self.session,
+            "session": self.to_session(),
             "profile": self.session.profile
         }
 
 
-async def get_signed_url() -> dict:
+async def get_signed_url(agent_id: str = ELEVENLABS_AGENT_ID) -> dict:
     """Get a signed URL for Eleven Labs Conversational AI"""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"https://api.elevenlabs.io/v1/convai/conversation/get_signed_url",
-            params={"agent_id": ELEVENLABS_AGENT_ID},
-            headers={"xi-api-key": ELEVEN_LABS_API_KEY}
-        )
-        print(f"🔗 Signed URL response: {response.status_code}")
-        response.raise_for_status()
-        return response.json()
+    response = await elevenlabs_request(
+        "GET", "/convai/conversation/get_signed_url", "signed_url",
+        params={"agent_id": agent_id}
+    )
+    logger.debug("🔗 Signed URL response: %s", response.status_code)
+    response.raise_for_status()
+    return response.json()
 
 
-def create_session() -> ConversationManager:
-    """Create a new conversation session"""
-    session_id = str(uuid.uuid4())
-    return ConversationManager(session_id=session_id)
+def create_session(session_id: Optional[str] = None, user_id: Optional[str] = None) -> ConversationManager:
+    """Create a conversation session (with a new ID unless one is given)"""
+    return ConversationManager(session_id=session_id or str(uuid.uuid4()), user_id=user_id)
 
 
-# Store active sessions
+# Live bridges on this worker; the cross-worker registry is app.session_store
 active_sessions: dict[str, ConversationManager] = {}
+ACTIVE_SESSIONS.set_function(lambda: len(active_sessions))
 
 
 def get_session(session_id: str) -> Optional[ConversationManager]:
@@ -161,3 +194,15 @@ def unregister_session(session_id: str):
     """Remove a session from active sessions"""
     if session_id in active_sessions:
         del active_sessions[session_id]
+
+
+def relay_queue_stats() -> dict:
+    """Queue depth and drop counters per direction, summed over this worker's live bridges"""
+    totals = {}
+    for manager in active_sessions.values():
+        for direction, queue in manager.relay_queues.items():
+            stats = totals.setdefault(direction, {"depth": 0, "dropped": 0, "dropped_stale": 0, "coalesced": 0})
+            for name, value in queue.stats().items():
+                if name in stats:
+                    stats[name] += value
+    return totals
@@ -0,0 +1,129 @@
+"""
+Off-loop persistence for conversation transcripts
+Serialization and file I/O run in a bounded thread pool; writes are atomic
+"""
+import asyncio
+import gzip
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, Callable, Optional
+
+import aiofiles
+
+from app.config import CONVERSATIONS_DIR, CONVERSATION_COMPRESSION, PERSIST_WORKERS
+from app.models import ConversationSession
+from app.catalog import catalog
+from app.response_cache import conversation_cache
+
+_executor = ThreadPoolExecutor(max_workers=PERSIST_WORKERS, thread_name_prefix="persist")
+
+_READ_CHUNK = 64 * 1024
+
+
+def conversation_path(session_id: str, compressed: bool = CONVERSATION_COMPRESSION == "gzip") -> Path:
+    return CONVERSATIONS_DIR / (f"{session_id}.json.gz" if compressed else f"{session_id}.json")
+
+
+def find_conversation(session_id: str) -> Optional[Path]:
+    """Locate a saved conversation in either format"""
+    for compressed in (True, False):
+        path = conversation_path(session_id, compressed)
+        if path.exists():
+            return path
+    return None
+
+
+def _write_atomic(path: Path, data: bytes):
+    """Write to a temp file and rename, so readers only ever see complete files"""
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _save(session: ConversationSession) -> str:
+    compressed = CONVERSATION_COMPRESSION == "gzip"
+    data = session.model_dump_json().encode("utf-8")
+    if compressed:
+        data = gzip.compress(data, compresslevel=6)
+
+    path = conversation_path(session.session_id, compressed)
+    _write_atomic(path, data)
+    # Drop a copy left in the other format by an earlier setting
+    conversation_path(session.session_id, not compressed).unlink(missing_ok=True)
+
+    summary = session.model_dump(mode="json", exclude={"messages"})
+    summary["message_count"] = len(session.messages)
+    catalog.upsert(summary)
+    return str(path)
+
+
+async def save_conversation(session: ConversationSession) -> str:
+    """Serialize and write a session off the event loop; returns the file path"""
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_executor, _save, session)
+    finally:
+        conversation_cache.invalidate(session.session_id)
+
+
+def _load(session_id: str) -> Optional[ConversationSession]:
+    path = find_conversation(session_id)
+    if path is None:
+        return None
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rb") as f:
+        return ConversationSession.model_validate_json(f.read())
+
+
+async def load_conversation(session_id: str) -> Optional[ConversationSession]:
+    """A saved conversation, or None if it isn't saved"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, _load, session_id)
+
+
+def _update(session_id: str, fields: dict) -> Optional[str]:
+    session = _load(session_id)
+    if session is None:
+        return None
+    return _save(session.model_copy(update=fields))
+
+
+async def update_conversation(session_id: str, **fields) -> Optional[str]:
+    """Set fields on a saved conversation; returns the file path, or None if it isn't saved"""
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_executor, _update, session_id, fields)
+    finally:
+        conversation_cache.invalidate(session_id)
+
+
+async def stream_conversation(
+    path: Path,
+    decompress: bool,
+    on_complete: Optional[Callable[[bytes], None]] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Yield a saved conversation in chunks, gunzipping on the fly if asked to.
+    `on_complete` gets the stored bytes once the whole file has been read.
+    """
+    inflater = zlib.decompressobj(wbits=31) if decompress else None
+    stored = [] if on_complete else None
+    async with aiofiles.open(path, "rb") as f:
+        while chunk := await f.read(_READ_CHUNK):
+            if stored is not None:
+                stored.append(chunk)
+            yield inflater.decompress(chunk) if inflater else chunk
+    if inflater:
+        yield inflater.flush()
+    if on_complete:
+        on_complete(b"".join(stored))
+
+
+def shutdown_conversation_store():
+    """Wait for in-flight writes (called from the app lifespan)"""
+    _executor.shutdown(wait=True)
@@ -0,0 +1,78 @@
+"""
+Shared HTTP client for Eleven Labs REST calls
+One pooled HTTP/2 connection set per worker instead of a new client per request
+"""
+import asyncio
+import time
+from typing import Optional
+
+import httpx
+
+from app.config import (
+    ELEVEN_LABS_API_KEY,
+    ELEVENLABS_API_URL,
+    ELEVENLABS_MAX_CONNECTIONS,
+    ELEVENLABS_MAX_CONCURRENCY,
+)
+from app.metrics import ELEVENLABS_REQUEST
+
+# Per-endpoint timeouts; voice cloning uploads audio and can take a while
+ENDPOINT_TIMEOUTS = {
+    "signed_url": httpx.Timeout(5.0, connect=2.0),
+    "voice": httpx.Timeout(10.0, connect=5.0),
+    "voice_clone": httpx.Timeout(120.0, connect=5.0),
+}
+
+_client: Optional[httpx.AsyncClient] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+async def init_http_client():
+    """Create the application-scoped client (called from the app lifespan)"""
+    global _client, _semaphore
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=ELEVENLABS_API_URL,
+            headers={"xi-api-key": ELEVEN_LABS_API_KEY or ""},
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=ELEVENLABS_MAX_CONNECTIONS,
+                max_keepalive_connections=ELEVENLABS_MAX_CONNECTIONS,
+                keepalive_expiry=60.0,
+            ),
+            timeout=ENDPOINT_TIMEOUTS["voice"],
+        )
+        _semaphore = asyncio.Semaphore(ELEVENLABS_MAX_CONCURRENCY)
+
+
+async def close_http_client():
+    """Close pooled connections on shutdown"""
+    global _client, _semaphore
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        _semaphore = None
+
+
+async def elevenlabs_request(method: str, path: str, endpoint: str, **kwargs) -> httpx.Response:
+    """
+    Send a request to the Eleven Labs REST API on the shared client.
+
+    `endpoint` selects the timeout from ENDPOINT_TIMEOUTS. Requests beyond
+    ELEVENLABS_MAX_CONCURRENCY wait for a slot instead of opening more
+    connections.
+    """
+    if _client is None:
+        # Scripts and tests that run without the app lifespan
+        await init_http_client()
+    async with _semaphore:
+        started = time.perf_counter()
+        try:
+            return await _client.request(
+                method,
+                path,
+                timeout=ENDPOINT_TIMEOUTS[endpoint],
+                **kwargs
+            )
+        finally:
+            ELEVENLABS_REQUEST.labels(endpoint).observe(time.perf_counter() - started)
@@ -0,0 +1,474 @@
+"""
+Background job queue for post-call work
+Runs transcript compaction, profile sync, voice cloning and archiving off the WebSocket teardown path
+"""
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from app.config import (
+    JOB_STORE,
+    JOB_DB_PATH,
+    JOB_WORKERS,
+    JOB_MAX_ATTEMPTS,
+    JOB_RETRY_BACKOFF,
+    JOB_LEASE,
+    JOB_POLL_INTERVAL,
+    JOB_RETENTION,
+)
+from app.models import JobRecord
+from app.sqlite_db import SQLiteDatabase
+from app.metrics import JOBS, JOB_RUNS
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[JobRecord], Awaitable[Optional[dict]]]
+
+
+class JobStore(ABC):
+    """
+    Persistence for jobs.
+
+    enqueue() is idempotent on the job's key. claim() atomically moves the
+    next due job to "running" under a lease, so each run happens on exactly
+    one worker.
+    """
+
+    @abstractmethod
+    async def enqueue(self, job: JobRecord) -> JobRecord:
+        """Insert a job, or return the existing one with the same key"""
+        ...
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[JobRecord]:
+        ...
+
+    @abstractmethod
+    async def claim(self, lease: float) -> Optional[JobRecord]:
+        """Take the oldest due job, or None if nothing is due"""
+        ...
+
+    @abstractmethod
+    async def renew(self, job_id: str, lease_until: float):
+        """Extend the lease of a job that is still running"""
+        ...
+
+    @abstractmethod
+    async def finish(self, job: JobRecord):
+        """Write back a job's status, attempts, result, error and next run time"""
+        ...
+
+    @abstractmethod
+    async def requeue_expired(self) -> int:
+        """Put running jobs whose lease lapsed back in the queue"""
+        ...
+
+    @abstractmethod
+    async def purge_finished(self, before: float) -> int:
+        ...
+
+    @abstractmethod
+    async def counts(self) -> dict[str, int]:
+        """Number of jobs in each status"""
+        ...
+
+    async def close(self):
+        pass
+
+
+class MemoryJobStore(JobStore):
+    """In-process store; jobs are lost on restart"""
+
+    def __init__(self):
+        self._jobs: dict[str, JobRecord] = {}
+        self._keys: dict[str, str] = {}
+
+    async def enqueue(self, job: JobRecord) -> JobRecord:
+        if job.key and job.key in self._keys:
+            return self._jobs[self._keys[job.key]]
+        self._jobs[job.job_id] = job
+        if job.key:
+            self._keys[job.key] = job.job_id
+        return job
+
+    async def get(self, job_id: str) -> Optional[JobRecord]:
+        return self._jobs.get(job_id)
+
+    async def claim(self, lease: float) -> Optional[JobRecord]:
+        now = time.time()
+        due = [job for job in self._jobs.values() if job.status == "queued" and job.run_at <= now]
+        if not due:
+            return None
+        job = min(due, key=lambda job: job.run_at)
+        job.status = "running"
+        job.attempts += 1
+        job.lease_until = now + lease
+        job.updated_at = now
+        return job
+
+    async def renew(self, job_id: str, lease_until: float):
+        job = self._jobs.get(job_id)
+        if job is not None and job.status == "running":
+            job.lease_until = lease_until
+
+    async def finish(self, job: JobRecord):
+        self._jobs[job.job_id] = job
+
+    async def requeue_expired(self) -> int:
+        now = time.time()
+        expired = [job for job in self._jobs.values() if job.status == "running" and job.lease_until <= now]
+        for job in expired:
+            job.status = "queued"
+        return len(expired)
+
+    async def purge_finished(self, before: float) -> int:
+        finished = [
+            job for job in self._jobs.values()
+            if job.status in ("succeeded", "failed") and job.updated_at < before
+        ]
+        for job in finished:
+            del self._jobs[job.job_id]
+            if job.key:
+                self._keys.pop(job.key, None)
+        return len(finished)
+
+    async def counts(self) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+
+_JOB_COLUMNS = (
+    "job_id, kind, key, payload, status, attempts, max_attempts, run_at, "
+    "created_at, updated_at, lease_until, last_error, result"
+)
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Durable store in a SQLite file shared by all workers on one host.
+
+    Queries run in a thread; claims happen inside an IMMEDIATE transaction so
+    two workers never take the same job.
+    """
+
+    def __init__(self, path: Path = JOB_DB_PATH):
+        self._db = SQLiteDatabase(path, schema=(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                key TEXT UNIQUE,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                max_attempts INTEGER NOT NULL,
+                run_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                lease_until REAL,
+                last_error TEXT,
+                result TEXT
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, run_at)",
+        ))
+
+    @staticmethod
+    def _record(row) -> Optional[JobRecord]:
+        if row is None:
+            return None
+        (job_id, kind, key, payload, status, attempts, max_attempts, run_at,
+         created_at, updated_at, lease_until, last_error, result) = row
+        return JobRecord(
+            job_id=job_id,
+            kind=kind,
+            key=key,
+            payload=json.loads(payload),
+            status=status,
+            attempts=attempts,
+            max_attempts=max_attempts,
+            run_at=run_at,
+            created_at=created_at,
+            updated_at=updated_at,
+            lease_until=lease_until,
+            last_error=last_error,
+            result=json.loads(result) if result else None,
+        )
+
+    def _enqueue(self, job: JobRecord) -> JobRecord:
+        with self._db.transaction() as conn:
+            conn.execute(
+                f"INSERT OR IGNORE INTO jobs ({_JOB_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job.job_id, job.kind, job.key, json.dumps(job.payload), job.status, job.attempts,
+                    job.max_attempts, job.run_at, job.created_at, job.updated_at, job.lease_until,
+                    job.last_error, json.dumps(job.result) if job.result is not None else None,
+                ),
+            )
+            if job.key is None:
+                return job
+            row = conn.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE key = ?", (job.key,)).fetchone()
+        return self._record(row)
+
+    async def enqueue(self, job: JobRecord) -> JobRecord:
+        return await asyncio.to_thread(self._enqueue, job)
+
+    async def get(self, job_id: str) -> Optional[JobRecord]:
+        row = await asyncio.to_thread(
+            self._db.fetchone, f"SELECT {_JOB_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)
+        )
+        return self._record(row)
+
+    def _claim(self, lease: float) -> Optional[JobRecord]:
+        now = time.time()
+        with self._db.transaction() as conn:
+            row = conn.execute(
+                "SELECT job_id FROM jobs WHERE status = 'queued' AND run_at <= ? ORDER BY run_at LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_until = ?, updated_at = ? "
+                "WHERE job_id = ?",
+                (now + lease, now, row[0]),
+            )
+            claimed = conn.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE job_id = ?", (row[0],)).fetchone()
+        return self._record(claimed)
+
+    async def claim(self, lease: float) -> Optional[JobRecord]:
+        return await asyncio.to_thread(self._claim, lease)
+
+    async def renew(self, job_id: str, lease_until: float):
+        await asyncio.to_thread(
+            self._db.execute,
+            "UPDATE jobs SET lease_until = ? WHERE job_id = ? AND status = 'running'",
+            (lease_until, job_id),
+        )
+
+    async def finish(self, job: JobRecord):
+        await asyncio.to_thread(
+            self._db.execute,
+            "UPDATE jobs SET status = ?, attempts = ?, run_at = ?, updated_at = ?, lease_until = ?, "
+            "last_error = ?, result = ? WHERE job_id = ?",
+            (
+                job.status, job.attempts, job.run_at, job.updated_at, job.lease_until, job.last_error,
+                json.dumps(job.result) if job.result is not None else None, job.job_id,
+            ),
+        )
+
+    async def requeue_expired(self) -> int:
+        return await asyncio.to_thread(
+            self._db.execute,
+            "UPDATE jobs SET status = 'queued', lease_until = NULL WHERE status = 'running' AND lease_until <= ?",
+            (time.time(),),
+        )
+
+    async def purge_finished(self, before: float) -> int:
+        return await asyncio.to_thread(
+            self._db.execute,
+            "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND updated_at < ?",
+            (before,),
+        )
+
+    async def counts(self) -> dict[str, int]:
+        rows = await asyncio.to_thread(self._db.fetchall, "SELECT status, COUNT(*) FROM jobs GROUP BY status")
+        return dict(rows)
+
+    async def close(self):
+        self._db.close()
+
+
+class JobQueue:
+    """
+    Worker pool that runs jobs from a JobStore.
+
+    Handlers are registered per job kind and receive the JobRecord; whatever
+    dict they return is stored as the job's result. A handler that raises is
+    retried with exponential backoff and jitter until max_attempts, then the
+    job is marked failed.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        workers: int = JOB_WORKERS,
+        lease: float = JOB_LEASE,
+        poll_interval: float = JOB_POLL_INTERVAL,
+    ):
+        self.store = store
+        self.workers = workers
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self._handlers: dict[str, Handler] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: list[asyncio.Task] = []
+        self._running: set[asyncio.Task] = set()
+
+    def register(self, kind: str, handler: Handler):
+        self._handlers[kind] = handler
+
+    async def enqueue(
+        self,
+        kind: str,
+        payload: dict,
+        key: Optional[str] = None,
+        delay: float = 0.0,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+    ) -> JobRecord:
+        """Queue a job; with a key that's already queued, returns the existing job instead"""
+        now = time.time()
+        job = await self.store.enqueue(JobRecord(
+            job_id=uuid.uuid4().hex,
+            kind=kind,
+            key=key,
+            payload=payload,
+            max_attempts=max_attempts,
+            run_at=now + delay,
+            created_at=now,
+            updated_at=now,
+        ))
+        if self._wakeup:
+            self._wakeup.set()
+        return job
+
+    async def start(self):
+        self._wakeup = asyncio.Event()
+        requeued = await self.store.requeue_expired()
+        if requeued:
+            logger.info("🔁 Requeued %d jobs from a stopped worker", requeued)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._maintain()))
+
+    async def stop(self, timeout: float = 30.0):
+        """Stop taking jobs and give running ones `timeout` seconds to finish"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._running:
+            done, pending = await asyncio.wait(self._running, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _worker(self):
+        while True:
+            try:
+                job = await self.store.claim(self.lease)
+            except Exception as e:
+                logger.error("❌ Job claim failed: %s", e)
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # Run in its own task so stop() can let it finish instead of cancelling it
+            task = asyncio.create_task(self._run(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+            await asyncio.shield(task)
+
+    async def _run(self, job: JobRecord):
+        handler = self._handlers.get(job.kind)
+        started = time.monotonic()
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        interrupted: Optional[asyncio.CancelledError] = None
+        try:
+            if handler is None:
+                raise LookupError(f"No handler for job kind {job.kind!r}")
+            job.result = await handler(job)
+            job.status = "succeeded"
+            job.last_error = None
+        except asyncio.CancelledError as e:
+            # Shutting down mid-run: hand it straight back to the queue, without
+            # counting the interrupted run as an attempt
+            job.status = "queued"
+            job.attempts -= 1
+            job.last_error = "interrupted by shutdown"
+            interrupted = e
+        except Exception as e:
+            job.last_error = f"{type(e).__name__}: {e}"
+            if job.attempts < job.max_attempts and handler is not None:
+                job.status = "queued"
+                backoff = JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+                job.run_at = time.time() + backoff * random.uniform(0.8, 1.2)
+                logger.warning(
+                    "⚠️ Job %s (%s) attempt %d failed, retrying in %.1fs: %s",
+                    job.job_id, job.kind, job.attempts, backoff, job.last_error,
+                )
+            else:
+                job.status = "failed"
+                logger.error("❌ Job %s (%s) failed: %s", job.job_id, job.kind, job.last_error)
+            JOB_RUNS.labels(job.kind, "error").inc()
+        else:
+            JOB_RUNS.labels(job.kind, "succeeded").inc()
+            logger.info(
+                "✅ Job %s (%s) done in %.2fs", job.job_id, job.kind, time.monotonic() - started
+            )
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+        job.lease_until = None
+        job.updated_at = time.time()
+        await self.store.finish(job)
+        if interrupted:
+            raise interrupted
+
+    async def _heartbeat(self, job: JobRecord):
+        """Keep extending a running job's lease, so _maintain doesn't hand it to another worker"""
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            job.lease_until = time.time() + self.lease
+            try:
+                await self.store.renew(job.job_id, job.lease_until)
+            except Exception as e:
+                logger.warning("⚠️ Lease renewal for job %s failed: %s", job.job_id, e)
+
+    async def update_metrics(self):
+        """Refresh the per-status job gauges from the store (called at scrape time)"""
+        try:
+            counts = await self.store.counts()
+        except Exception as e:
+            logger.error("❌ Job counts failed: %s", e)
+            return
+        for status in ("queued", "running", "succeeded", "failed"):
+            JOBS.labels(status).set(counts.get(status, 0))
+
+    async def _maintain(self):
+        """Pick up jobs from dead workers and drop old finished ones"""
+        while True:
+            await asyncio.sleep(max(self.lease / 10, self.poll_interval))
+            try:
+                requeued = await self.store.requeue_expired()
+                if requeued:
+                    logger.info("🔁 Requeued %d jobs with lapsed leases", requeued)
+                    self._wakeup.set()
+                await self.store.purge_finished(time.time() - JOB_RETENTION)
+            except Exception as e:
+                logger.error("❌ Job maintenance failed: %s", e)
+
+
+def create_job_store(backend: str = JOB_STORE) -> JobStore:
+    """Build the store selected by JOB_STORE"""
+    if backend == "sqlite":
+        return SQLiteJobStore()
+    if backend != "memory":
+        raise ValueError(f"Unknown JOB_STORE: {backend!r}")
+    return MemoryJobStore()
+
+
+job_queue = JobQueue(create_job_store())
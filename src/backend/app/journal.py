@@ -0,0 +1,213 @@
+"""
+Append-only transcript journal for live sessions
+Messages and profile updates hit disk as they happen; the final JSON is compacted from the journal
+"""
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from app.config import JOURNAL_DIR, JOURNAL_FLUSH_INTERVAL, JOURNAL_FSYNC
+from app.models import ConversationSession
+from app.conversation_store import save_conversation
+from app import relay
+
+logger = logging.getLogger(__name__)
+
+# One writer thread keeps appends to each file in order
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal")
+
+
+def journal_path(session_id: str) -> Path:
+    return JOURNAL_DIR / f"{session_id}.jsonl"
+
+
+class SessionJournal:
+    """
+    JSON-lines event log for one session.
+
+    append() only buffers the event; the shared JournalWriter writes every
+    dirty journal in one pass per tick (group commit).
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.path = journal_path(session_id)
+        self._pending: list[bytes] = []
+        self._file = None
+
+    def append(self, event: dict):
+        self._pending.append(relay.dumps(event).encode("utf-8") + b"\n")
+        journal_writer.mark_dirty(self)
+
+    def _take_pending(self) -> list[bytes]:
+        lines, self._pending = self._pending, []
+        return lines
+
+    def _write(self, lines: list[bytes]):
+        # Runs on the journal thread
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        self._file.write(b"".join(lines))
+        self._file.flush()
+        if JOURNAL_FSYNC:
+            os.fsync(self._file.fileno())
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    async def close(self):
+        """Flush everything appended so far and close the file"""
+        await journal_writer.flush()
+        await asyncio.get_running_loop().run_in_executor(_executor, self._close_file)
+
+
+class JournalWriter:
+    """Background group commit for all open journals on this worker"""
+
+    def __init__(self, interval: float = JOURNAL_FLUSH_INTERVAL):
+        self.interval = interval
+        self._dirty: dict[str, SessionJournal] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def mark_dirty(self, journal: SessionJournal):
+        self._dirty[journal.session_id] = journal
+
+    def start(self):
+        self._lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self):
+        """Write all buffered events in a single trip to the journal thread"""
+        if self._lock is None:
+            # Not started (scripts, tests): flush inline
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self._dirty:
+                return
+            batch = [(journal, journal._take_pending()) for journal in self._dirty.values()]
+            self._dirty = {}
+            failed = await asyncio.get_running_loop().run_in_executor(_executor, _write_batch, batch)
+            # Put lines that didn't make it back in front of anything appended since
+            for journal, lines in failed:
+                journal._pending[:0] = lines
+                self.mark_dirty(journal)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("❌ Journal flush failed: %s", e)
+
+
+def _write_batch(batch: list[tuple[SessionJournal, list[bytes]]]) -> list[tuple[SessionJournal, list[bytes]]]:
+    """Write each journal's lines; returns the ones that failed, so one bad file can't lose the rest"""
+    failed = []
+    for journal, lines in batch:
+        if not lines:
+            continue
+        try:
+            journal._write(lines)
+        except Exception as e:
+            logger.error("❌ Journal write for %s failed: %s", journal.session_id, e)
+            failed.append((journal, lines))
+    return failed
+
+
+journal_writer = JournalWriter()
+
+
+def replay_journal(path: Path) -> Optional[ConversationSession]:
+    """Rebuild a session from its journal; a torn final line is ignored"""
+    data = None
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                break
+            kind = event.pop("e")
+            if kind == "start":
+                data = {**event, "messages": [], "profile": {}}
+            elif data is None:
+                continue
+            elif kind == "msg":
+                data["messages"].append(event)
+            elif kind == "profile":
+                data["profile"] = event["profile"]
+            elif kind == "end":
+                data.update(event)
+    # Validate once at the end rather than per event
+    return ConversationSession.model_validate(data) if data else None
+
+
+def _compact(session_id: str, status: Optional[str]) -> Optional[ConversationSession]:
+    path = journal_path(session_id)
+    if not path.exists():
+        return None
+    session = replay_journal(path)
+    if session is not None and status and session.status == "in_progress":
+        session.status = status
+    return session
+
+
+async def compact_journal(session_id: str, status: Optional[str] = None) -> Optional[str]:
+    """
+    Write the final conversation JSON from a session's journal, then remove it.
+
+    `status` overrides the journalled status (used for crash recovery).
+    Returns the saved path, or None if there was no journal.
+    """
+    loop = asyncio.get_running_loop()
+    session = await loop.run_in_executor(_executor, _compact, session_id, status)
+    if session is None:
+        return None
+    saved = await save_conversation(session)
+    journal_path(session_id).unlink(missing_ok=True)
+    return saved
+
+
+async def read_live_session(session_id: str) -> Optional[ConversationSession]:
+    """Replay an in-progress session's journal (for reads while the call is live)"""
+    path = journal_path(session_id)
+    if not path.exists():
+        return None
+    return await asyncio.get_running_loop().run_in_executor(_executor, replay_journal, path)
+
+
+async def recover_journals(is_live) -> int:
+    """
+    Compact journals left behind by a crashed worker.
+
+    `is_live(session_id)` is awaited for each journal so that sessions still
+    running on another worker are left alone.
+    """
+    recovered = 0
+    for path in JOURNAL_DIR.glob("*.jsonl"):
+        session_id = path.stem
+        if await is_live(session_id):
+            continue
+        try:
+            if await compact_journal(session_id, status="interrupted"):
+                recovered += 1
+        except Exception as e:
+            logger.error("❌ Could not recover journal %s: %s", path.name, e)
+    return recovered
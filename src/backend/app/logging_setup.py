@@ -0,0 +1,159 @@
+"""
+Structured, non-blocking logging
+Records are handed to a queue on the event loop and written by a background thread
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from app.config import LOG_LEVEL, LOG_FORMAT, LOG_HOT_PATH_LEVEL, LOG_HOT_PATH_RATE
+
+# Per-session context; asyncio tasks copy it, so both relay directions see it
+session_id_var: ContextVar[Optional[str]] = ContextVar("session_id", default=None)
+user_id_var: ContextVar[Optional[str]] = ContextVar("user_id", default=None)
+
+# Logger for per-frame relay events, rate limited and usually below INFO
+HOT_PATH_LOGGER = "app.hotpath"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def bind_session(session_id: Optional[str], user_id: Optional[str] = None):
+    """Attach session context to every record logged from the current task"""
+    session_id_var.set(session_id)
+    user_id_var.set(user_id)
+
+
+class ContextFilter(logging.Filter):
+    """Stamps session_id and user_id onto records"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.session_id = session_id_var.get()
+        record.user_id = user_id_var.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket shared by all records passing through it.
+
+    Records over the rate are dropped; the next record that gets through
+    reports how many were suppressed.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst or max(rate, 1.0)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._suppressed = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens < 1.0:
+                self._suppressed += 1
+                return False
+            self._tokens -= 1.0
+            if self._suppressed:
+                record.suppressed = self._suppressed
+                self._suppressed = 0
+        return True
+
+
+class LocalQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler for an in-process queue.
+
+    Only merges the message arguments. The stock prepare() also formats the
+    traceback on the event loop, which is needed only when records are pickled.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in ("session_id", "user_id", "suppressed"):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines with session context after the message"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s%(context)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        context = [
+            f"{field}={getattr(record, field)}"
+            for field in ("session_id", "user_id", "suppressed")
+            if getattr(record, field, None) is not None
+        ]
+        record.context = f" [{' '.join(context)}]" if context else ""
+        return super().format(record)
+
+
+def configure_logging():
+    """Route the app's loggers through a queue to a background writer thread"""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+    # Unbounded queue: put_nowait never blocks the event loop
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = LocalQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+
+    app_logger = logging.getLogger("app")
+    app_logger.setLevel(LOG_LEVEL)
+    app_logger.addHandler(queue_handler)
+    app_logger.propagate = False
+
+    hot_path = logging.getLogger(HOT_PATH_LOGGER)
+    hot_path.setLevel(LOG_HOT_PATH_LEVEL)
+    hot_path.propagate = False
+    hot_path_handler = LocalQueueHandler(log_queue)
+    hot_path_handler.addFilter(RateLimitFilter(LOG_HOT_PATH_RATE))
+    hot_path_handler.addFilter(ContextFilter())
+    hot_path.addHandler(hot_path_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -3,29 +3,134 @@ Centrum Backend - Dating Profile Conversation API
 """
 import json
 import asyncio
-import base64
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from functools import partial
+from typing import Literal, Optional
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 import websockets
 
-from app.config import ELEVEN_LABS_API_KEY, ELEVENLABS_AGENT_ID, CONVERSATIONS_DIR, RECORDINGS_DIR
-from app.models import StartConversationRequest, StartConversationResponse, MessageRole
+from app.config import (
+    ELEVEN_LABS_API_KEY,
+    ELEVENLABS_AGENT_ID,
+    CONVERSATIONS_DIR,
+    MAX_SESSIONS_PER_USER,
+    DOWNSTREAM_QUEUE_SIZE,
+    DOWNSTREAM_MAX_LAG_MS,
+    DOWNSTREAM_DROP_POLICY,
+    UPSTREAM_QUEUE_SIZE,
+    UPSTREAM_DROP_POLICY,
+    UPSTREAM_COALESCE_BYTES,
+    BRIDGE_DRAIN_TIMEOUT,
+)
+from app.models import StartConversationRequest, StartConversationResponse, MessageRole, SessionRecord, JobRecord
 from app.conversation_handler import (
     create_session,
-    get_session,
     register_session,
     unregister_session,
-    get_signed_url,
+    relay_queue_stats,
     ConversationManager,
 )
-from app.supabase_client import save_user_profile
+from app.supabase_client import close_persistence
+from app.profile_writer import profile_writer
+from app.http_client import init_http_client, close_http_client
+from app.session_store import session_store, session_reaper
+from app.admission import admission
+from app.catalog import catalog
+from app.conversation_store import find_conversation, stream_conversation, shutdown_conversation_store
+from app.response_cache import conversation_cache, cached_response
+from app.journal import journal_writer, recover_journals, read_live_session
+from app.audio_archive import (
+    FORMATS,
+    find_recordings,
+    negotiate_format,
+    parse_range,
+    load_index,
+    build_index,
+    transcoded_wav_size,
+    iter_transcoded_wav,
+    stream_file_range,
+    unarchived_recordings,
+    shutdown_audio_archive,
+)
+from app.jobs import job_queue
+from app.post_call import enqueue_post_call
+from app.signed_url_pool import get_signed_url_pool, close_signed_url_pools
+from app.metrics import TIME_TO_READY, SIGNED_URL_WAIT, render_metrics
+from app import relay
+from app.relay_queue import RelayQueue
+from app.upstream import UpstreamLink, resume_messages
+from app.tools import ToolDispatcher, tool_registry
+from app.audio_convert import (
+    PLAYBACK_ENCODINGS,
+    agent_format,
+    format_request,
+    format_info,
+    converter_for,
+    convert as convert_audio,
+    shutdown_audio_convert,
+)
+from app.logging_setup import configure_logging, shutdown_logging, bind_session, HOT_PATH_LOGGER
+
+configure_logging()
+logger = logging.getLogger(__name__)
+hot_path_logger = logging.getLogger(HOT_PATH_LOGGER)
+
+
+async def _session_is_live(session_id: str) -> bool:
+    return await session_store.get(session_id) is not None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown"""
+    await init_http_client()
+    profile_writer.start()
+    session_reaper.start()
+    journal_writer.start()
+    await job_queue.start()
+    if catalog.count() == 0:
+        # First start with an existing archive: index the files already on disk
+        indexed = await asyncio.to_thread(catalog.rebuild)
+        if indexed:
+            logger.info("📚 Indexed %d existing conversations", indexed)
+    recovered = await recover_journals(_session_is_live)
+    if recovered:
+        logger.info("🩹 Recovered %d interrupted conversations from journals", recovered)
+    backlog = unarchived_recordings()
+    for session_id in backlog:
+        await job_queue.enqueue("archive", {"session_id": session_id}, key=f"archive:{session_id}")
+    if backlog:
+        logger.info("🗜️ Archiving %d recordings left as WAV", len(backlog))
+    if ELEVEN_LABS_API_KEY:
+        get_signed_url_pool().prefetch()
+    yield
+    await job_queue.stop()
+    await job_queue.store.close()
+    await close_signed_url_pools()
+    await session_reaper.stop()
+    await session_store.close()
+    await profile_writer.stop()
+    await close_persistence()
+    await close_http_client()
+    await journal_writer.stop()
+    shutdown_audio_archive()
+    shutdown_audio_convert()
+    shutdown_conversation_store()
+    catalog.close()
+    shutdown_logging()
+
 
 app = FastAPI(
     title="Centrum API",
     description="Dating Profile Conversation API with Voice Cloning",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # CORS for frontend
@@ -45,7 +150,19 @@ async def root():
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        **admission.stats(),
+        "relay_queues": relay_queue_stats(),
+        "caches": {"conversation": conversation_cache.stats()},
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    await job_queue.update_metrics()
+    return render_metrics()
 
 
 @app.get("/debug/supabase")
@@ -89,62 +206,28 @@ async def start_conversation(request: StartConversationRequest):
             detail="Eleven Labs credentials not configured"
         )
     
-    # Create new session
-    manager = create_session()
-    manager.user_id = request.user_id
-    register_session(manager)
-    
-    return StartConversationResponse(
-        session_id=manager.session_id,
-        websocket_url=f"/api/conversation/{manager.session_id}/ws"
+    # Register the session where any worker can claim it. Bridge capacity is
+    # per worker and the WebSocket may land on any of them, so it is enforced
+    # at admission there; the per-user limit holds across workers here
+    record = SessionRecord(
+        session_id=str(uuid.uuid4()),
+        user_id=request.user_id,
+        created_at=time.time()
     )
-
-
-def handle_tool_call(manager: ConversationManager, tool_name: str, tool_args: dict) -> str:
-    """Handle tool calls from the agent"""
-    if tool_name == "update_dating_profile":
-        profile = manager.update_profile(**tool_args)
-        return json.dumps({
-            "success": True,
-            "message": "Profile updated",
-            "current_profile": profile.model_dump() if profile else {}
-        })
-    else:
-        return json.dumps({"error": f"Unknown tool: {tool_name}"})
-
-
-async def finalize_session(manager: ConversationManager):
-    """
-    Finalize the session:
-    1. Save profile to Supabase (age, about_me, looking_for)
-    """
-    user_id = manager.user_id
-    if not user_id:
-        print("⚠️ No user_id, skipping Supabase save")
-        return
+    if not await session_store.create(record, max_per_user=MAX_SESSIONS_PER_USER):
+        raise HTTPException(
+            status_code=429,
+            detail="Too many active conversations for this user",
+            headers={"Retry-After": "10"}
+        )
     
-    profile = manager.session.profile
-    print(f"📋 Final profile data: {profile.model_dump() if profile else 'None'}")
+    # Make sure a signed URL is waiting by the time the WebSocket connects
+    get_signed_url_pool().prefetch()
     
-    # Save profile to Supabase
-    if profile:
-        try:
-            profile_data = {
-                "age": profile.age,
-                "about_me": profile.about_me,
-                "looking_for": profile.looking_for,
-                "profile_completed": True,
-            }
-            # Remove None values
-            profile_data = {k: v for k, v in profile_data.items() if v is not None}
-            
-            print(f"💾 Saving to Supabase: {profile_data}")
-            await save_user_profile(user_id, profile_data)
-            print(f"✅ Profile saved to Supabase for user {user_id}")
-        except Exception as e:
-            print(f"❌ Failed to save profile: {e}")
-    else:
-        print("⚠️ No profile data to save")
+    return StartConversationResponse(
+        session_id=record.session_id,
+        websocket_url=f"/api/conversation/{record.session_id}/ws"
+    )
 
 
 @app.websocket("/api/conversation/{session_id}/ws")
@@ -153,34 +236,99 @@ async def conversation_websocket(websocket: WebSocket, session_id: str):
     WebSocket endpoint that bridges the frontend to Eleven Labs Conversational AI
     """
     await websocket.accept()
+    accepted_at = time.perf_counter()
     
-    manager = get_session(session_id)
-    if not manager:
+    # Atomically take ownership, so a session can only be bridged once
+    record = await session_store.claim(session_id)
+    if not record:
         await websocket.close(code=4004, reason="Session not found")
         return
     
-    eleven_ws = None
+    # Wait for a bridge slot on this worker, telling the client where it stands
+    async def notify_queued(position: int):
+        await websocket.send_json({"type": "queued", "position": position})
+    
+    try:
+        admitted = await admission.admit(on_queued=notify_queued)
+    except BaseException:
+        # The client left while queued
+        await session_store.release(session_id)
+        raise
+    if not admitted:
+        logger.warning("🚦 Rejected session %s: worker at capacity", session_id)
+        await session_store.release(session_id)
+        await websocket.close(code=1013, reason="Server busy")
+        return
+    
+    try:
+        manager = create_session(session_id, record.user_id)
+    except BaseException:
+        admission.release()
+        await session_store.release(session_id)
+        raise
+    
+    link = None
+    tools = None
+    playback_converter = None
     
     try:
-        # Get signed URL for Eleven Labs
-        signed_url_data = await get_signed_url()
-        signed_url = signed_url_data.get("signed_url")
+        register_session(manager)
         
-        print(f"🔗 Got signed URL, connecting to Eleven Labs...")
+        # Both relay tasks inherit this context, so every log line carries it
+        bind_session(session_id, manager.user_id)
+        link = UpstreamLink(get_signed_url_pool().acquire)
+        
+        # Playback format the client asked for, settled at ready once the agent's is known.
+        # The mic always arrives as 16kHz Int16, what Eleven Labs takes
+        playback_request = format_request(websocket.query_params, encodings=PLAYBACK_ENCODINGS)
+        
+        # Get signed URL for Eleven Labs (usually prefetched)
+        url_started = time.perf_counter()
+        signed_url = await get_signed_url_pool().acquire()
+        SIGNED_URL_WAIT.observe(time.perf_counter() - url_started)
+        
+        logger.info("🔗 Got signed URL, connecting to Eleven Labs...")
         
         if not signed_url:
             await websocket.send_json({"type": "error", "message": "Failed to get Eleven Labs URL"})
             return
         
         # Connect to Eleven Labs
-        eleven_ws = await websockets.connect(signed_url)
-        print(f"✅ Connected to Eleven Labs")
+        await link.connect(signed_url)
+        link.connected.set()
+        logger.info("✅ Connected to Eleven Labs")
         
         # Ready will be sent when we receive conversation_initiation_metadata from Eleven Labs
-        print("⏳ Waiting for Eleven Labs to initialize...")
+        logger.debug("⏳ Waiting for Eleven Labs to initialize...")
+        
+        # Each direction gets a bounded queue, so a slow peer never stalls the other socket
+        upstream = RelayQueue(
+            "upstream", UPSTREAM_QUEUE_SIZE, UPSTREAM_DROP_POLICY, coalesce_bytes=UPSTREAM_COALESCE_BYTES
+        )
+        downstream = RelayQueue(
+            "downstream", DOWNSTREAM_QUEUE_SIZE, DOWNSTREAM_DROP_POLICY, max_age=DOWNSTREAM_MAX_LAG_MS / 1000
+        )
+        manager.relay_queues = {"upstream": upstream, "downstream": downstream}
+        
+        def on_tool_result(tool_call_id: str, tool_name: str, result: dict, is_error: bool):
+            """Send a finished tool call's result back to Eleven Labs"""
+            upstream.put(relay.dumps({
+                "type": "client_tool_result",
+                "tool_call_id": tool_call_id,
+                "result": relay.dumps(result),
+                "is_error": is_error,
+            }), droppable=False)
+            logger.debug("✅ Tool result queued: %s", result)
+            
+            downstream.put({
+                "type": "profile_updated",
+                "profile": manager.session.profile.model_dump() if manager.session.profile else {}
+            }, droppable=False)
+        
+        tools = ToolDispatcher(manager, tool_registry, on_tool_result)
         
         async def forward_to_eleven():
-            """Forward messages from frontend to Eleven Labs"""
+            """Read messages from the frontend and queue them for Eleven Labs"""
             audio_count = 0
             try:
                 while True:
@@ -189,156 +337,207 @@ async def conversation_websocket(websocket: WebSocket, session_id: str):
                     if "text" in data:
                         try:
                             msg = json.loads(data["text"])
-                            print(f"📤 From frontend (text): {msg.get('type', 'unknown')}")
+                            logger.debug("📤 From frontend (text): %s", msg.get("type", "unknown"))
                             
                             if msg.get("type") == "end_conversation":
-                                print("🛑 User ended conversation")
+                                logger.info("🛑 User ended conversation")
                                 break
                             
-                            await eleven_ws.send(data["text"])
+                            upstream.put(data["text"], droppable=False)
                         except json.JSONDecodeError:
-                            print(f"📤 From frontend (non-json text): {data['text'][:50]}")
+                            logger.debug("📤 From frontend (non-json text): %.50s", data["text"])
                         
                     elif "bytes" in data:
                         audio_bytes = data["bytes"]
+                        if not audio_bytes:
+                            continue
                         audio_count += 1
                         if audio_count % 50 == 1:  # Log every 50th chunk
-                            print(f"🎤 Audio chunk #{audio_count}: {len(audio_bytes)} bytes")
-                        manager.add_audio_chunk(audio_bytes)
+                            hot_path_logger.debug("🎤 Audio chunk #%d: %d bytes", audio_count, len(audio_bytes))
                         
-                        # Eleven Labs expects base64 audio in JSON format
-                        audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
-                        audio_message = {
-                            "user_audio_chunk": audio_base64
-                        }
-                        await eleven_ws.send(json.dumps(audio_message))
+                        for chunk in manager.add_audio_chunk(audio_bytes):
+                            upstream.put(chunk)
                     
                     elif "type" in data and data["type"] == "websocket.disconnect":
-                        print(f"📴 Frontend WebSocket disconnect event")
+                        logger.info("📴 Frontend WebSocket disconnect event")
                         break
                         
             except WebSocketDisconnect as e:
-                print(f"📴 Frontend disconnected (WebSocketDisconnect). Total audio chunks: {audio_count}")
+                logger.info("📴 Frontend disconnected (WebSocketDisconnect). Total audio chunks: %d", audio_count)
             except Exception as e:
-                print(f"❌ forward_to_eleven error: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("❌ forward_to_eleven error: %s", e)
+        
+        async def send_to_eleven():
+            """Drain the upstream queue into the Eleven Labs socket"""
+            try:
+                while (item := await upstream.get()) is not None:
+                    if not link.connected.is_set():
+                        link.hold(item)
+                        continue
+                    try:
+                        await link.send(item)
+                    except websockets.exceptions.ConnectionClosed:
+                        # The reader sees the same close and reconnects
+                        link.hold(item)
+            except Exception as e:
+                logger.exception("❌ send_to_eleven error: %s", e)
         
         async def forward_from_eleven():
-            """Forward messages from Eleven Labs to frontend"""
+            """Read messages from Eleven Labs and queue them for the frontend"""
+            nonlocal playback_converter
             message_count = 0
             audio_count = 0
             try:
-                async for message in eleven_ws:
-                    message_count += 1
-                    
-                    if isinstance(message, str):
-                        msg_data = json.loads(message)
-                        msg_type = msg_data.get("type")
-                        
-                        # Log non-ping messages
-                        if msg_type != "ping":
-                            print(f"📨 From Eleven Labs ({msg_type}): {message[:150]}...")
-                        
-                        # Handle audio events - decode base64 and send as binary
-                        if "audio_event" in msg_data:
-                            audio_base64 = msg_data["audio_event"].get("audio_base_64")
-                            if audio_base64:
-                                audio_count += 1
-                                audio_bytes = base64.b64decode(audio_base64)
-                                if audio_count % 10 == 1:
-                                    print(f"🔊 Sending audio #{audio_count} to frontend: {len(audio_bytes)} bytes")
-                                await websocket.send_bytes(audio_bytes)
-                        
-                        # Handle user transcript
-                        elif msg_type == "user_transcript":
-                            event_data = msg_data.get("user_transcription_event", {})
-                            text = event_data.get("user_transcript", "")
-                            if text:
-                                manager.add_message(MessageRole.USER, text)
-                                await websocket.send_json({
-                                    "type": "user_transcript",
-                                    "user_transcript": text
-                                })
-                        
-                        # Handle agent response
-                        elif msg_type == "agent_response":
-                            event_data = msg_data.get("agent_response_event", {})
-                            text = event_data.get("agent_response", "")
-                            if text:
-                                manager.add_message(MessageRole.AGENT, text)
-                                await websocket.send_json({
-                                    "type": "agent_response",
-                                    "agent_response": text
-                                })
-                        
-                        # Handle tool calls (Eleven Labs sends "client_tool_call" type)
-                        elif msg_type == "client_tool_call" or "client_tool_call" in msg_data:
-                            tool_data = msg_data.get("client_tool_call", {})
-                            tool_name = tool_data.get("tool_name")
-                            tool_call_id = tool_data.get("tool_call_id")
-                            tool_args = tool_data.get("parameters", {})
-                            
-                            print(f"🔧 Tool call: {tool_name} with args: {tool_args}")
-                            
-                            result = handle_tool_call(manager, tool_name, tool_args)
-                            
-                            # Send response back to Eleven Labs
-                            tool_response = {
-                                "type": "client_tool_result",
-                                "tool_call_id": tool_call_id,
-                                "result": json.dumps(result)
-                            }
-                            await eleven_ws.send(json.dumps(tool_response))
-                            print(f"✅ Tool result sent: {result}")
+                while True:
+                    try:
+                        async for message in link.ws:
+                            message_count += 1
                             
-                            await websocket.send_json({
-                                "type": "profile_updated",
-                                "profile": manager.session.profile.model_dump() if manager.session.profile else {}
-                            })
-                        
-                        # Handle conversation init (type is in the message)
-                        if "conversation_initiation_metadata_event" in msg_data:
-                            print("✅ Eleven Labs conversation initialized")
-                            await websocket.send_json({
-                                "type": "ready",
-                                "session_id": session_id
-                            })
-                        
-                        # Handle pings - respond with pong
-                        elif msg_type == "ping":
-                            ping_event = msg_data.get("ping_event", {})
-                            event_id = ping_event.get("event_id")
-                            pong = {"type": "pong", "event_id": event_id}
-                            await eleven_ws.send(json.dumps(pong))
-                        
-                    else:
-                        # Binary audio data (fallback)
-                        audio_count += 1
-                        await websocket.send_bytes(message)
+                            if isinstance(message, str):
+                                # Fast path: audio events are decoded without a full parse
+                                audio_bytes = relay.extract_agent_audio(message)
+                                if audio_bytes is not None:
+                                    if audio_bytes:
+                                        audio_count += 1
+                                        if audio_count % 10 == 1:
+                                            hot_path_logger.debug("🔊 Sending audio #%d to frontend: %d bytes", audio_count, len(audio_bytes))
+                                        downstream.put(audio_bytes)
+                                    continue
+                                
+                                msg_data = relay.loads(message)
+                                msg_type = msg_data.get("type")
+                                
+                                # Log non-ping messages
+                                if msg_type != "ping":
+                                    hot_path_logger.debug("📨 From Eleven Labs (%s): %.150s", msg_type, message)
+                                
+                                # Handle user transcript
+                                if msg_type == "user_transcript":
+                                    event_data = msg_data.get("user_transcription_event", {})
+                                    text = event_data.get("user_transcript", "")
+                                    if text:
+                                        manager.add_message(MessageRole.USER, text)
+                                        downstream.put({
+                                            "type": "user_transcript",
+                                            "user_transcript": text
+                                        }, droppable=False)
+                                
+                                # Handle agent response
+                                elif msg_type == "agent_response":
+                                    event_data = msg_data.get("agent_response_event", {})
+                                    text = event_data.get("agent_response", "")
+                                    if text:
+                                        manager.add_message(MessageRole.AGENT, text)
+                                        downstream.put({
+                                            "type": "agent_response",
+                                            "agent_response": text
+                                        }, droppable=False)
+                                
+                                # Handle tool calls (Eleven Labs sends "client_tool_call" type)
+                                elif msg_type == "client_tool_call" or "client_tool_call" in msg_data:
+                                    tool_data = msg_data.get("client_tool_call", {})
+                                    tool_name = tool_data.get("tool_name")
+                                    tool_call_id = tool_data.get("tool_call_id")
+                                    tool_args = tool_data.get("parameters", {})
+                                    
+                                    logger.info("🔧 Tool call: %s with args: %s", tool_name, tool_args)
+                                    
+                                    # Runs as its own task; the result is queued by on_tool_result
+                                    tools.dispatch(tool_call_id, tool_name, tool_args)
+                                
+                                # Handle conversation init (type is in the message); a
+                                # reconnect starts a new conversation but the client is already ready
+                                if "conversation_initiation_metadata_event" in msg_data:
+                                    logger.info("✅ Eleven Labs conversation initialized")
+                                    if not link.reconnects:
+                                        init_event = msg_data["conversation_initiation_metadata_event"]
+                                        source = agent_format(init_event.get("agent_output_audio_format"))
+                                        playback_format = playback_request.resolve(source) if source else None
+                                        if playback_format:
+                                            playback_converter = converter_for(source, playback_format)
+                                        elif any(playback_request):
+                                            logger.warning(
+                                                "⚠️ Can't convert agent audio (%s); sending it as is",
+                                                init_event.get("agent_output_audio_format"),
+                                            )
+                                        downstream.put({
+                                            "type": "ready",
+                                            "session_id": session_id,
+                                            "audio_format": {
+                                                "output": format_info(playback_format) if playback_format else None,
+                                            },
+                                        }, droppable=False)
+                                        TIME_TO_READY.observe(time.perf_counter() - accepted_at)
+                                
+                                # Handle pings - respond with pong
+                                elif msg_type == "ping":
+                                    ping_event = msg_data.get("ping_event", {})
+                                    event_id = ping_event.get("event_id")
+                                    pong = {"type": "pong", "event_id": event_id}
+                                    upstream.put(relay.dumps(pong), droppable=False)
+                                
+                            else:
+                                # Binary audio data (fallback)
+                                audio_count += 1
+                                downstream.put(message)
+                    except websockets.exceptions.ConnectionClosed as e:
+                        logger.warning("⚠️ Eleven Labs connection lost: %s", e)
+                    
+                    ws = link.ws
+                    if not link.attempts or not link.dropped():
+                        logger.info("📴 Eleven Labs connection closed: %s - %s", ws.close_code, ws.close_reason)
+                        break
+                    
+                    # Hold mic audio and tell the client while a new conversation is set up
+                    downstream.put({"type": "upstream_reconnecting"}, droppable=False)
+                    if not await link.reconnect(resume_messages(manager.transcript, manager.session.profile)):
+                        logger.error("❌ Could not reconnect to Eleven Labs")
+                        break
+                    downstream.put({"type": "upstream_reconnected"}, droppable=False)
                         
-            except websockets.exceptions.ConnectionClosed as e:
-                print(f"📴 Eleven Labs connection closed: {e.code} - {e.reason}")
             except Exception as e:
-                print(f"❌ forward_from_eleven error: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("❌ forward_from_eleven error: %s", e)
             
-            print(f"📊 Eleven Labs session ended. Messages: {message_count}, Audio chunks: {audio_count}")
+            logger.info("📊 Eleven Labs session ended. Messages: %d, Audio chunks: %d", message_count, audio_count)
         
-        # Run both directions concurrently
-        results = await asyncio.gather(
-            forward_to_eleven(),
-            forward_from_eleven(),
-            return_exceptions=True
-        )
+        async def send_to_client():
+            """Drain the downstream queue into the frontend socket"""
+            try:
+                while (item := await downstream.get()) is not None:
+                    if isinstance(item, bytes):
+                        if playback_converter:
+                            item = await convert_audio(playback_converter, item)
+                        # Opus comes back as a list of packets, one message each
+                        for frame in item if isinstance(item, list) else (item,):
+                            await websocket.send_bytes(frame)
+                    else:
+                        await websocket.send_json(item)
+            except Exception as e:
+                logger.info("📴 Frontend send failed: %s", e)
+        
+        # Run all four until either side goes away, then let the writers drain
+        tasks = [
+            asyncio.create_task(forward_to_eleven()),
+            asyncio.create_task(send_to_eleven()),
+            asyncio.create_task(forward_from_eleven()),
+            asyncio.create_task(send_to_client()),
+        ]
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        upstream.close()
+        downstream.close()
+        tasks[0].cancel()
+        tasks[2].cancel()
+        _, pending = await asyncio.wait(tasks, timeout=BRIDGE_DRAIN_TIMEOUT)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
         
-        print(f"🔄 Gather completed. Results: {results}")
+        logger.info("📊 Relay queues: upstream %s, downstream %s", upstream.stats(), downstream.stats())
+        if link.reconnects or link.ring.dropped_bytes:
+            logger.info("🔁 Upstream link: %s", link.stats())
         
     except Exception as e:
-        print(f"❌ Main error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Main error: %s", e)
         try:
             await websocket.send_json({
                 "type": "error",
@@ -348,84 +547,199 @@ async def conversation_websocket(websocket: WebSocket, session_id: str):
             pass
     
     finally:
-        print(f"🔚 Connection ending. Total audio chunks: {len(manager.audio_chunks)}")
-        
-        if eleven_ws:
-            await eleven_ws.close()
-        
-        # End session and save locally
-        manager.session.ended_at = datetime.utcnow()
-        manager.session.status = "completed"
-        
-        # Save to Supabase
-        await finalize_session(manager)
-        
-        # Also save locally as backup
-        manager.save_conversation_json()
-        print(f"💾 Saved conversation locally")
-        
-        profile_data = manager.session.profile.model_dump() if manager.session.profile else None
+        # Whatever fails while winding down, give back the slot and the claim
+        try:
+            logger.info("🔚 Connection ending. Total audio chunks: %d", manager.audio_chunk_count)
+            if manager.gate and manager.gate.frames_in:
+                stats = manager.gate.stats()
+                logger.info(
+                    "🔇 VAD kept %.0f%% of mic audio upstream, %.0f%% in the recording",
+                    100 * stats["frames_forwarded"] / stats["frames_in"],
+                    100 * stats["frames_stored"] / stats["frames_in"],
+                )
+            
+            if tools:
+                await tools.close()
+            if link:
+                await link.close()
+            
+            # Close the streamed recording so /audio can serve it right away
+            audio_path = manager.save_audio_recording()
+            if audio_path:
+                logger.info("🎙️ Saved recording: %s", audio_path)
+            
+            # End session; the journal holds everything the post-call jobs need
+            manager.mark_ended()
+            await manager.journal.close()
+            
+            # Transcript save, Supabase sync, voice clone and archiving run as jobs
+            try:
+                jobs = await enqueue_post_call(manager, has_audio=bool(audio_path))
+            except Exception as e:
+                # The journal stays on disk and is recovered on the next start
+                logger.error("❌ Could not queue post-call jobs for %s: %s", session_id, e)
+                jobs = {}
+            
+            profile_data = manager.session.profile.model_dump() if manager.session.profile else None
         
-        unregister_session(session_id)
+        finally:
+            unregister_session(session_id)
+            admission.release()
+            await session_store.release(session_id)
         
         try:
             await websocket.send_json({
                 "type": "session_ended",
                 "session_id": session_id,
-                "message_count": len(manager.session.messages),
-                "profile": profile_data
+                "message_count": len(manager.transcript),
+                "profile": profile_data,
+                "jobs": jobs
             })
         except:
             pass
 
 
 @app.get("/api/conversation/{session_id}")
-async def get_conversation(session_id: str):
+async def get_conversation(session_id: str, request: Request):
     """Get conversation data by session ID"""
-    json_path = CONVERSATIONS_DIR / f"{session_id}.json"
+    entry = conversation_cache.get(session_id)
+    if entry is not None:
+        return cached_response(request, entry)
     
-    if not json_path.exists():
-        raise HTTPException(status_code=404, detail="Conversation not found")
+    token = conversation_cache.token()
+    json_path = find_conversation(session_id)
+    if not json_path:
+        # Still in progress: rebuild what has been said so far from the journal (not cached)
+        session = await read_live_session(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+        return Response(session.model_dump_json(), media_type="application/json")
     
-    with open(json_path) as f:
-        return json.load(f)
+    # Stream the stored bytes; gzip files pass through when the client accepts gzip
+    headers = {}
+    compressed = json_path.suffix == ".gz"
+    passthrough = compressed and "gzip" in request.headers.get("accept-encoding", "")
+    if compressed:
+        headers["Vary"] = "Accept-Encoding"
+    if passthrough:
+        headers["Content-Encoding"] = "gzip"
+    
+    # Small files are cached as stored once read, so later requests get them with an ETag
+    on_complete = None
+    if conversation_cache.fits(json_path.stat().st_size):
+        encoding = "gzip" if compressed else None
+        on_complete = partial(conversation_cache.put, session_id, token=token, encoding=encoding)
+    
+    return StreamingResponse(
+        stream_conversation(json_path, decompress=compressed and not passthrough, on_complete=on_complete),
+        media_type="application/json",
+        headers=headers
+    )
 
 
 @app.get("/api/conversation/{session_id}/audio")
-async def get_conversation_audio(session_id: str):
-    """Get audio recording for a conversation"""
-    audio_path = RECORDINGS_DIR / f"{session_id}.wav"
+async def get_conversation_audio(
+    session_id: str,
+    request: Request,
+    format: Optional[Literal["opus", "flac", "wav"]] = None
+):
+    """
+    Get audio recording for a conversation.
     
-    if not audio_path.exists():
+    Serves the archived file (OGG/Opus or FLAC) as stored, or WAV decoded on
+    the fly when that's what the client asks for (?format= or Accept).
+    Supports single byte-range requests for seeking.
+    """
+    available = find_recordings(session_id)
+    if not available:
         raise HTTPException(status_code=404, detail="Audio not found")
     
-    return FileResponse(
-        path=str(audio_path),
-        media_type="audio/wav",
-        filename=f"{session_id}.wav"
+    fmt = negotiate_format(available, format, request.headers.get("accept"))
+    if fmt is None:
+        raise HTTPException(status_code=406, detail=f"Audio available as: {', '.join(available)}")
+    
+    path = available.get(fmt)
+    index = None
+    if path is not None:
+        size = path.stat().st_size
+    else:
+        # Decode an archive to WAV; its size is known up front from the index
+        path = next(p for f, p in available.items() if f != "wav")
+        index = load_index(session_id) or await asyncio.to_thread(build_index, path, path.suffix[1:])
+        size = transcoded_wav_size(index)
+    
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="{session_id}{FORMATS[fmt].suffix}"',
+        "Vary": "Accept",
+    }
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+    except ValueError:
+        raise HTTPException(
+            status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"}
+        )
+    start, end = byte_range or (0, size - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    
+    body = (
+        iter_transcoded_wav(path, index, start, end) if index is not None
+        else stream_file_range(path, start, end)
+    )
+    return StreamingResponse(
+        body,
+        status_code=206 if byte_range else 200,
+        media_type=FORMATS[fmt].media_type,
+        headers=headers
     )
 
 
+@app.get("/api/conversation/{session_id}/audio/index")
+async def get_conversation_audio_index(session_id: str):
+    """Seek index of the archived recording (byte offsets about every second)"""
+    index = load_index(session_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail="Audio index not found")
+    return index
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobRecord)
+async def get_job(job_id: str):
+    """Status of a post-call job"""
+    job = await job_queue.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
 @app.get("/api/conversations")
-async def list_conversations():
-    """List all saved conversations"""
-    conversations = []
-    
-    for json_file in CONVERSATIONS_DIR.glob("*.json"):
-        with open(json_file) as f:
-            data = json.load(f)
-            conversations.append({
-                "session_id": data.get("session_id"),
-                "started_at": data.get("started_at"),
-                "ended_at": data.get("ended_at"),
-                "message_count": len(data.get("messages", [])),
-                "status": data.get("status"),
-                "profile": data.get("profile")
-            })
-    
-    conversations.sort(key=lambda x: x.get("started_at", ""), reverse=True)
+async def list_conversations(
+    user_id: Optional[str] = None,
+    status: Optional[str] = None,
+    started_after: Optional[datetime] = None,
+    started_before: Optional[datetime] = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    order: Literal["desc", "asc"] = "desc"
+):
+    """List saved conversations, newest first, one page at a time"""
+    try:
+        conversations, next_cursor = await asyncio.to_thread(
+            catalog.list,
+            user_id=user_id,
+            status=status,
+            started_after=started_after,
+            started_before=started_before,
+            limit=limit,
+            cursor=cursor,
+            descending=order == "desc"
+        )
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     
-    return {"conversations": conversations}
+    return {"conversations": conversations, "next_cursor": next_cursor}
 
 
 if __name__ == "__main__":
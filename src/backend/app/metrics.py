@@ -0,0 +1,272 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format
+"""
+import bisect
+from abc import ABC, abstractmethod
+from typing import Callable, Optional
+
+# Seconds; tuned for sub-second network latencies up to a few seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Seconds a frame spends in a relay queue: well under a millisecond when the
+# writer keeps up, up to the downstream lag cap when it doesn't
+RELAY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+REGISTRY: list = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_pairs(names: tuple, values: tuple) -> list[str]:
+    return [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+
+
+def _braces(pairs: list[str]) -> str:
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterValue:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def render(self, name: str, pairs: list[str]) -> list[str]:
+        return [f"{name}{_braces(pairs)} {self.value}"]
+
+
+class _GaugeValue:
+    __slots__ = ("_value", "_function")
+
+    def __init__(self):
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    @property
+    def value(self) -> float:
+        return self._function() if self._function else self._value
+
+    def set(self, value: float):
+        self._value = value
+
+    def inc(self, amount: float = 1):
+        self._value += amount
+
+    def dec(self, amount: float = 1):
+        self._value -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the value from `function` at scrape time instead"""
+        self._function = function
+
+    def render(self, name: str, pairs: list[str]) -> list[str]:
+        return [f"{name}{_braces(pairs)} {self.value}"]
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "_counts", "_sum")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+
+    def observe(self, value: float):
+        self._counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    def render(self, name: str, pairs: list[str]) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self._counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_braces(pairs + _label_pairs(('le',), (str(bound),)))} {cumulative}")
+        cumulative += self._counts[-1]
+        lines.append(f"{name}_bucket{_braces(pairs + _label_pairs(('le',), ('+Inf',)))} {cumulative}")
+        lines.append(f"{name}_sum{_braces(pairs)} {self._sum}")
+        lines.append(f"{name}_count{_braces(pairs)} {cumulative}")
+        return lines
+
+
+class _Metric(ABC):
+    """
+    A metric family. Each label set gets its own value object from labels();
+    hot paths look theirs up once and keep it, so an update is a single
+    attribute bump with no dict lookup or locking. An unlabelled metric
+    forwards straight to its one value.
+    """
+
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, object] = {}
+        REGISTRY.append(self)
+
+    @abstractmethod
+    def _new_value(self):
+        """A fresh value object for one label set"""
+        ...
+
+    def labels(self, *values):
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+        key = tuple(str(value) for value in values)
+        value = self._values.get(key)
+        if value is None:
+            value = self._values[key] = self._new_value()
+        return value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for key, value in self._values.items():
+            lines.extend(value.render(self.name, _label_pairs(self.labelnames, key)))
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonic count; name it with a _total suffix"""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        super().__init__(name, help, labelnames)
+        if not self.labelnames:
+            self.inc = self.labels().inc
+
+    def _new_value(self):
+        return _CounterValue()
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, or is read from a function at scrape time"""
+
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        super().__init__(name, help, labelnames)
+        if not self.labelnames:
+            value = self.labels()
+            self.set = value.set
+            self.inc = value.inc
+            self.dec = value.dec
+            self.set_function = value.set_function
+
+    def _new_value(self):
+        return _GaugeValue()
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; observe() is a bisect and two additions"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+        if not self.labelnames:
+            self.observe = self.labels().observe
+
+    def _new_value(self):
+        return _HistogramValue(self.buckets)
+
+    @property
+    def count(self) -> int:
+        return sum(value.count for value in self._values.values())
+
+
+def render_metrics() -> str:
+    """Render every registered metric"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Latency
+TIME_TO_READY = Histogram(
+    "centrum_time_to_ready_seconds",
+    "Time from WebSocket accept to the ready message",
+)
+SIGNED_URL_WAIT = Histogram(
+    "centrum_signed_url_wait_seconds",
+    "Time a bridge waited for a signed URL (near zero when the pool has one)",
+)
+ELEVENLABS_REQUEST = Histogram(
+    "centrum_elevenlabs_request_seconds",
+    "Eleven Labs REST request latency by endpoint",
+    ("endpoint",),
+)
+SUPABASE_UPSERT = Histogram(
+    "centrum_supabase_upsert_seconds",
+    "Profile upsert latency per batch, retries included",
+    ("backend",),
+)
+TOOL_CALL = Histogram(
+    "centrum_tool_call_seconds",
+    "Time from a client_tool_call arriving to its result being queued for Eleven Labs",
+    ("tool",),
+)
+RELAY_LATENCY = Histogram(
+    "centrum_relay_frame_latency_seconds",
+    "Time a frame waits in a bridge relay queue",
+    ("direction",),
+    buckets=RELAY_BUCKETS,
+)
+
+# Throughput
+RELAY_FRAMES = Counter(
+    "centrum_relay_frames_total",
+    "Audio frames received for relaying",
+    ("direction",),
+)
+RELAY_BYTES = Counter(
+    "centrum_relay_bytes_total",
+    "Audio bytes received for relaying",
+    ("direction",),
+)
+RELAY_DROPPED = Counter(
+    "centrum_relay_dropped_frames_total",
+    "Audio frames dropped: queue overflow, too stale to play, or beyond the reconnect buffer",
+    ("direction", "reason"),
+)
+UPSTREAM_RECONNECTS = Counter(
+    "centrum_upstream_reconnects_total",
+    "Eleven Labs reconnect attempts by result",
+    ("result",),
+)
+CACHE_LOOKUPS = Counter(
+    "centrum_cache_lookups_total",
+    "Response cache lookups by cache and result (hit or miss)",
+    ("cache", "result"),
+)
+JOB_RUNS = Counter(
+    "centrum_job_runs_total",
+    "Job attempts by kind and outcome",
+    ("kind", "outcome"),
+)
+
+# Load
+ACTIVE_SESSIONS = Gauge(
+    "centrum_active_sessions",
+    "Bridges open on this worker",
+)
+ADMISSION_QUEUED = Gauge(
+    "centrum_admission_queued",
+    "Connections waiting for a bridge slot on this worker",
+)
+JOBS = Gauge(
+    "centrum_jobs",
+    "Jobs in the store by status",
+    ("status",),
+)
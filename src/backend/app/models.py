@@ -45,3 +45,28 @@ class StartConversationResponse(BaseModel):
     session_id: str
     websocket_url: str
 
+
+class SessionRecord(BaseModel):
+    """Shared registry entry for a session between /start and its WebSocket"""
+    session_id: str
+    user_id: Optional[str] = None
+    created_at: float  # Unix time
+    claimed_at: Optional[float] = None
+    claimed_by: Optional[str] = None  # Worker that owns the live bridge
+
+
+class JobRecord(BaseModel):
+    """A unit of post-call work in the job queue"""
+    job_id: str
+    kind: str
+    key: Optional[str] = None  # Idempotency key; one job per key
+    payload: dict = {}
+    status: str = "queued"  # queued, running, succeeded, failed
+    attempts: int = 0
+    max_attempts: int = 5
+    run_at: float  # Unix time it becomes eligible to run
+    created_at: float
+    updated_at: float
+    lease_until: Optional[float] = None  # Running jobs past this are presumed lost
+    last_error: Optional[str] = None
+    result: Optional[dict] = None
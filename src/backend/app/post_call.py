@@ -0,0 +1,126 @@
+"""
+Post-call pipeline
+Jobs queued when a bridge closes; every step is keyed by session_id so it runs once
+"""
+import logging
+
+from app.config import VOICE_CLONE_ENABLED
+from app.models import JobRecord
+from app.conversation_handler import ConversationManager
+from app.jobs import job_queue
+from app.journal import compact_journal
+from app.conversation_store import find_conversation
+from app.profile_writer import profile_writer
+from app.audio_archive import archive_recording
+from app.voice_sample import clone_session_voice
+
+logger = logging.getLogger(__name__)
+
+
+async def enqueue_post_call(manager: ConversationManager, has_audio: bool) -> dict[str, str]:
+    """
+    Queue the work for a finished session; returns job IDs by kind.
+
+    Compaction comes first and queues the audio steps when it's done
+    (voice clone, then archive), so those always see the saved transcript
+    and the uncompressed recording.
+    """
+    session_id = manager.session_id
+    user_id = manager.user_id
+    jobs = {}
+
+    job = await job_queue.enqueue(
+        "compact",
+        {"session_id": session_id, "user_id": user_id, "has_audio": has_audio},
+        key=f"compact:{session_id}",
+    )
+    jobs["compact"] = job.job_id
+
+    if not user_id:
+        logger.warning("⚠️ No user_id, skipping Supabase save")
+        return jobs
+
+    profile = manager.session.profile
+    logger.info("📋 Final profile data: %s", profile.model_dump() if profile else None)
+    if profile:
+        profile_data = {
+            "age": profile.age,
+            "about_me": profile.about_me,
+            "looking_for": profile.looking_for,
+            "profile_completed": True,
+        }
+        # Remove None values
+        profile_data = {k: v for k, v in profile_data.items() if v is not None}
+        job = await job_queue.enqueue(
+            "profile_sync",
+            {"user_id": user_id, "profile": profile_data},
+            key=f"profile_sync:{session_id}",
+        )
+        jobs["profile_sync"] = job.job_id
+    else:
+        logger.warning("⚠️ No profile data to save")
+
+    return jobs
+
+
+async def _enqueue_archive(session_id: str) -> JobRecord:
+    return await job_queue.enqueue("archive", {"session_id": session_id}, key=f"archive:{session_id}")
+
+
+async def compact(job: JobRecord) -> dict:
+    """Write the final transcript from the journal, then queue the audio steps"""
+    session_id = job.payload["session_id"]
+    user_id = job.payload.get("user_id")
+
+    # None means a retry or journal recovery got there first
+    path = await compact_journal(session_id) or find_conversation(session_id)
+    logger.info("💾 Saved conversation %s", session_id)
+
+    next_jobs = {}
+    if job.payload.get("has_audio"):
+        if user_id and VOICE_CLONE_ENABLED:
+            clone = await job_queue.enqueue(
+                "voice_clone",
+                {"session_id": session_id, "user_id": user_id},
+                key=f"voice_clone:{session_id}",
+            )
+            next_jobs["voice_clone"] = clone.job_id
+        else:
+            next_jobs["archive"] = (await _enqueue_archive(session_id)).job_id
+    return {"path": str(path) if path else None, "next": next_jobs}
+
+
+async def sync_profile(job: JobRecord) -> dict:
+    """
+    Hand the profile to the write-behind, which batches it with other users'
+    and spools it if the upsert fails
+    """
+    profile_writer.enqueue(job.payload["user_id"], job.payload["profile"])
+    return {"fields": sorted(job.payload["profile"])}
+
+
+async def voice_clone(job: JobRecord) -> dict:
+    """Clone the user's voice, then queue the recording for archiving"""
+    session_id = job.payload["session_id"]
+    try:
+        voice_id = await clone_session_voice(session_id, job.payload["user_id"])
+    except Exception:
+        # Archive even if cloning never succeeds, but not while retries still need the WAV
+        if job.attempts >= job.max_attempts:
+            await _enqueue_archive(session_id)
+        raise
+    archive = await _enqueue_archive(session_id)
+    return {"voice_id": voice_id, "next": {"archive": archive.job_id}}
+
+
+async def archive(job: JobRecord) -> dict:
+    index = await archive_recording(job.payload["session_id"])
+    if index is None:
+        return {"archived": False}
+    return {"archived": True, "format": index["format"], "size": index["size"]}
+
+
+job_queue.register("compact", compact)
+job_queue.register("profile_sync", sync_profile)
+job_queue.register("voice_clone", voice_clone)
+job_queue.register("archive", archive)
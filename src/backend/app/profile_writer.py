@@ -0,0 +1,137 @@
+"""
+Write-behind queue for profile upserts
+Takes the Supabase round trip off the WebSocket teardown path
+"""
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+from app.config import SPOOL_DIR, PROFILE_WRITE_BATCH_SIZE, PROFILE_WRITE_FLUSH_INTERVAL
+from app.supabase_client import save_user_profiles
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileWriteBehind:
+    """
+    Coalesces pending profile writes and flushes them as multi-row upserts.
+
+    Writes are keyed by user_id and merged field by field, so the latest value
+    of each field wins. A flush happens once BATCH_SIZE users are pending or
+    FLUSH_INTERVAL seconds have passed. Batches that fail are written to a
+    local spool file and retried on the next flush or after a restart.
+    """
+
+    def __init__(
+        self,
+        spool_path: Path = SPOOL_DIR / "profiles.json",
+        batch_size: int = PROFILE_WRITE_BATCH_SIZE,
+        flush_interval: float = PROFILE_WRITE_FLUSH_INTERVAL,
+    ):
+        self.spool_path = spool_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: dict[str, dict] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def start(self):
+        """Load any spooled writes and start the background flusher"""
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        spooled = self._read_spool()
+        if spooled:
+            logger.info("📦 Recovered %d spooled profile writes", len(spooled))
+            self._merge(spooled)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and drain whatever is still pending"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def enqueue(self, user_id: str, profile_data: dict):
+        """Queue a profile write; returns immediately"""
+        self._merge({user_id: profile_data})
+        if self._wakeup and len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self):
+        """Upsert everything pending in one batch, spooling it on failure"""
+        if self._flush_lock is None:
+            # Not started (scripts, tests): flush inline
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._pending:
+                return
+
+            batch, self._pending = self._pending, {}
+            rows = [{"user_id": user_id, **data} for user_id, data in batch.items()]
+
+            try:
+                await save_user_profiles(rows)
+                logger.info("✅ Flushed %d profile writes", len(rows))
+                # The spool may still hold values this batch just superseded; a
+                # replay of those after a crash would overwrite newer data
+                await asyncio.to_thread(self._sync_spool, dict(self._pending))
+            except Exception as e:
+                logger.error("❌ Profile flush failed, spooling %d writes: %s", len(rows), e)
+                # Anything enqueued while the flush was in flight is newer
+                newer, self._pending = self._pending, batch
+                self._merge(newer)
+                await asyncio.to_thread(self._write_spool, dict(self._pending))
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def _merge(self, writes: dict[str, dict]):
+        for user_id, data in writes.items():
+            self._pending.setdefault(user_id, {}).update(data)
+
+    def _read_spool(self) -> dict[str, dict]:
+        if not self.spool_path.exists():
+            return {}
+        try:
+            with open(self.spool_path) as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("⚠️ Could not read profile spool: %s", e)
+            return {}
+
+    def _write_spool(self, writes: dict[str, dict]):
+        tmp_path = self.spool_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(writes, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.spool_path)
+
+    def _sync_spool(self, writes: dict[str, dict]):
+        """After a successful flush: keep only what is still pending, if anything was spooled"""
+        if not writes:
+            self.spool_path.unlink(missing_ok=True)
+        elif self.spool_path.exists():
+            self._write_spool(writes)
+
+
+profile_writer = ProfileWriteBehind()
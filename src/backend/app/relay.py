@@ -0,0 +1,67 @@
+"""
+Low-overhead encoding and decoding for the audio relay hot path
+"""
+import binascii
+import json
+from typing import Optional
+
+# orjson is optional; it is several times faster than json for control messages
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+if orjson is not None:
+    def loads(data):
+        return orjson.loads(data)
+
+    def dumps(obj) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+else:
+    loads = json.loads
+    _encoder = json.JSONEncoder(separators=(",", ":"))
+
+    def dumps(obj) -> str:
+        return _encoder.encode(obj)
+
+
+# Precompiled envelope for {"user_audio_chunk": "<base64>"}
+_USER_AUDIO_PREFIX = '{"user_audio_chunk":"'
+_USER_AUDIO_SUFFIX = '"}'
+
+# A quoted key can only appear unescaped as an actual key, never inside a
+# string value, so finding it is enough to identify an audio event
+_AGENT_AUDIO_KEY = '"audio_base_64"'
+
+
+def encode_user_audio(chunk: bytes) -> str:
+    """Wrap a raw PCM mic frame in the Eleven Labs user_audio_chunk message"""
+    return _USER_AUDIO_PREFIX + binascii.b2a_base64(chunk, newline=False).decode("ascii") + _USER_AUDIO_SUFFIX
+
+
+def extract_agent_audio(message: str) -> Optional[bytes]:
+    """
+    Decode the audio of an Eleven Labs audio event without parsing it.
+
+    Returns None for any other message type, which callers then parse in
+    full. Audio events are by far the largest and most frequent messages,
+    so this skips building a dict around a large base64 string.
+    """
+    key = message.find(_AGENT_AUDIO_KEY)
+    if key < 0:
+        return None
+    key += len(_AGENT_AUDIO_KEY)
+    start = message.find('"', key)
+    # Only a colon and whitespace may sit between the key and its string value
+    if start < 0 or message[key:start].strip() != ":":
+        return None
+    start += 1
+    end = message.find('"', start)
+    if end < 0:
+        return None
+    payload = message[start:end]
+    if "\\" in payload:
+        # Some encoders escape "/" as "\/"
+        payload = payload.replace("\\/", "/")
+    return binascii.a2b_base64(payload)
@@ -0,0 +1,142 @@
+"""
+Bounded queues between the bridge's socket readers and writers
+A slow peer costs dropped or merged audio instead of unbounded buffering and lag
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Optional
+
+from app.metrics import RELAY_FRAMES, RELAY_BYTES, RELAY_DROPPED, RELAY_LATENCY
+
+POLICIES = ("drop_oldest", "drop_newest", "coalesce")
+
+
+class RelayQueue:
+    """
+    One direction of the bridge.
+
+    The reader put()s without ever waiting, so it keeps draining its socket
+    (and answering pings) however slow the other side is. Audio items are
+    droppable; control messages are not and are never counted against the
+    bound. When more than `max_items` audio items are waiting:
+
+    - drop_oldest: the oldest audio item is discarded (stale audio goes first)
+    - drop_newest: the incoming item is discarded
+    - coalesce: audio is merged into the last queued item (up to
+      `coalesce_bytes`) so the writer sends fewer, larger frames; past that
+      the oldest audio is discarded
+
+    With `max_age`, get() also discards audio that waited longer than that.
+    Audio in, drops and time in the queue are recorded in the relay metrics
+    under `name` as the direction.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_items: int,
+        policy: str = "drop_oldest",
+        max_age: Optional[float] = None,
+        coalesce_bytes: int = 0,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown relay queue policy: {policy!r}")
+        self.name = name
+        self.max_items = max_items
+        self.policy = policy
+        self.max_age = max_age
+        self.coalesce_bytes = coalesce_bytes
+        self._items: deque[list] = deque()  # [enqueued_at, item, droppable]
+        self._droppable = 0
+        self._ready = asyncio.Event()
+        self._closed = False
+        self.max_depth = 0
+        self.dropped = 0
+        self.dropped_stale = 0
+        self.coalesced = 0
+        # Bound once, so the per-frame path skips the label lookups
+        self._frames_in = RELAY_FRAMES.labels(name).inc
+        self._bytes_in = RELAY_BYTES.labels(name).inc
+        self._overflow = RELAY_DROPPED.labels(name, "overflow").inc
+        self._stale = RELAY_DROPPED.labels(name, "stale").inc
+        self._latency = RELAY_LATENCY.labels(name).observe
+
+    @property
+    def depth(self) -> int:
+        return len(self._items)
+
+    def put(self, item: Any, droppable: bool = True):
+        """Queue an item for the writer; never blocks"""
+        if self._closed:
+            return
+        if droppable:
+            self._frames_in()
+            self._bytes_in(len(item))
+            if self.policy == "coalesce" and self._coalesce(item):
+                return
+            if self._droppable >= self.max_items:
+                if self.policy == "drop_newest":
+                    self.dropped += 1
+                    self._overflow()
+                    return
+                self._drop_oldest()
+            self._droppable += 1
+
+        self._items.append([time.monotonic(), item, droppable])
+        self.max_depth = max(self.max_depth, len(self._items))
+        self._ready.set()
+
+    def _coalesce(self, item: bytes) -> bool:
+        # Merge only while the writer is behind, and only into trailing audio
+        if not self._items:
+            return False
+        tail = self._items[-1]
+        if not tail[2] or len(tail[1]) + len(item) > self.coalesce_bytes:
+            return False
+        tail[1] = tail[1] + item
+        self.coalesced += 1
+        return True
+
+    def _drop_oldest(self):
+        for entry in self._items:
+            if entry[2]:
+                self._items.remove(entry)
+                self._droppable -= 1
+                self.dropped += 1
+                self._overflow()
+                return
+
+    async def get(self) -> Optional[Any]:
+        """Next item for the writer, or None once the queue is closed and drained"""
+        while True:
+            while not self._items:
+                if self._closed:
+                    return None
+                self._ready.clear()
+                await self._ready.wait()
+
+            enqueued_at, item, droppable = self._items.popleft()
+            waited = time.monotonic() - enqueued_at
+            if droppable:
+                self._droppable -= 1
+                if self.max_age is not None and waited > self.max_age:
+                    self.dropped_stale += 1
+                    self._stale()
+                    continue
+            self._latency(waited)
+            return item
+
+    def close(self):
+        """Stop accepting items; get() returns None after the backlog"""
+        self._closed = True
+        self._ready.set()
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "dropped": self.dropped,
+            "dropped_stale": self.dropped_stale,
+            "coalesced": self.coalesced,
+        }
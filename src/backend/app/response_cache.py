@@ -0,0 +1,139 @@
+"""
+Read-through cache of serialized API responses
+Small finished conversations are served from memory with ETags instead of from disk
+"""
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.config import (
+    CONVERSATION_CACHE_SIZE,
+    CONVERSATION_CACHE_MAX_BYTES,
+    CONVERSATION_CACHE_TTL,
+)
+from app.metrics import CACHE_LOOKUPS
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    encoding: Optional[str]  # "gzip" when body is stored compressed
+    expires_at: float
+
+
+class ResponseCache:
+    """
+    LRU of response bodies keyed by ID, bounded by entry count and total
+    bytes, each entry living at most `ttl` seconds.
+
+    A miss takes a token() before loading, and put() discards the result if
+    anything was invalidated in the meantime, so a read racing a write can't
+    cache the old body. Writes in this process invalidate right away; the TTL
+    caps how stale an entry can get from writes on other workers.
+    """
+
+    def __init__(self, name: str, max_entries: int, max_bytes: int, ttl: float):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._size = 0
+        self._invalidations = 0
+        # Invalidation can come from persistence threads
+        self._lock = threading.Lock()
+        self._hit = CACHE_LOOKUPS.labels(name, "hit").inc
+        self._miss = CACHE_LOOKUPS.labels(name, "miss").inc
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                self._miss()
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self._hit()
+            return entry
+
+    def fits(self, size: int) -> bool:
+        """Whether a body of `size` bytes is small enough to cache"""
+        return size <= self.max_bytes // 4
+
+    def token(self) -> int:
+        """Take before loading a missed entry; pass to put()"""
+        return self._invalidations
+
+    def put(self, key: str, body: bytes, token: int, encoding: Optional[str] = None) -> CachedResponse:
+        """Cache a loaded body (unless invalidated since `token`) and return it as an entry"""
+        etag = 'W/"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        entry = CachedResponse(body, etag, encoding, time.monotonic() + self.ttl)
+        with self._lock:
+            if token != self._invalidations or not self.fits(len(body)):
+                return entry
+            self._remove(key)
+            self._entries[key] = entry
+            self._size += len(body)
+            while self._entries and (len(self._entries) > self.max_entries or self._size > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+        return entry
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._invalidations += 1
+            self._remove(key)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry.body)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "bytes": self._size, "hits": self.hits, "misses": self.misses}
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    """Weak comparison against an If-None-Match header"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def cached_response(request: Request, entry: CachedResponse, media_type: str = "application/json") -> Response:
+    """
+    Serve a cached body: 304 when the client already has it, the stored gzip
+    bytes when the client accepts them, otherwise the plain body.
+    """
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if entry.encoding:
+        headers["Vary"] = "Accept-Encoding"
+    if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+
+    body = entry.body
+    if entry.encoding == "gzip":
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+        else:
+            body = gzip.decompress(body)
+    return Response(body, media_type=media_type, headers=headers)
+
+
+conversation_cache = ResponseCache(
+    "conversation", CONVERSATION_CACHE_SIZE, CONVERSATION_CACHE_MAX_BYTES, CONVERSATION_CACHE_TTL
+)
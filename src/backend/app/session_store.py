@@ -0,0 +1,378 @@
+"""
+Session registry shared between /api/conversation/start and the WebSocket
+Lets the two requests land on different workers or hosts
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Optional
+
+from app.config import (
+    SESSION_STORE,
+    SESSION_DB_PATH,
+    REDIS_URL,
+    SESSION_TTL,
+    ACTIVE_SESSION_TTL,
+    SESSION_REAP_INTERVAL,
+)
+from app.models import SessionRecord
+from app.sqlite_db import SQLiteDatabase
+
+logger = logging.getLogger(__name__)
+
+# Identifies the worker that claimed a session
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class SessionStore(ABC):
+    """
+    Registry of sessions created by /start.
+
+    A session is created unclaimed with a short TTL. claim() atomically hands
+    it to exactly one WebSocket, on whichever worker that lands, and extends the
+    TTL to cover the call. release() removes it when the bridge ends.
+    """
+
+    @abstractmethod
+    async def create(self, record: SessionRecord, ttl: float = SESSION_TTL, max_per_user: Optional[int] = None) -> bool:
+        """
+        Register an unclaimed session; False (and nothing stored) if its user
+        already has `max_per_user` live sessions. The check and the insert are
+        one atomic step, so concurrent /start calls can't both squeeze in.
+        """
+        ...
+
+    @abstractmethod
+    async def get(self, session_id: str) -> Optional[SessionRecord]:
+        ...
+
+    @abstractmethod
+    async def claim(self, session_id: str, ttl: float = ACTIVE_SESSION_TTL) -> Optional[SessionRecord]:
+        """Mark the session as claimed by this worker; None if missing, expired or already claimed"""
+        ...
+
+    @abstractmethod
+    async def release(self, session_id: str):
+        ...
+
+    @abstractmethod
+    async def count_user_sessions(self, user_id: str) -> int:
+        """Live (pending or claimed) sessions for a user, across all workers"""
+        ...
+
+    async def purge_expired(self) -> int:
+        """Drop expired entries; returns how many were removed"""
+        return 0
+
+    async def close(self):
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    """In-process store; only valid with a single worker"""
+
+    def __init__(self):
+        self._entries: dict[str, tuple[SessionRecord, float]] = {}  # record, expires_at
+
+    async def create(self, record: SessionRecord, ttl: float = SESSION_TTL, max_per_user: Optional[int] = None) -> bool:
+        # No await between the count and the insert, so nothing can interleave
+        if record.user_id and max_per_user is not None:
+            if self._count(record.user_id) >= max_per_user:
+                return False
+        self._entries[record.session_id] = (record, time.time() + ttl)
+        return True
+
+    async def get(self, session_id: str) -> Optional[SessionRecord]:
+        entry = self._entries.get(session_id)
+        if entry is None or entry[1] <= time.time():
+            return None
+        return entry[0]
+
+    async def claim(self, session_id: str, ttl: float = ACTIVE_SESSION_TTL) -> Optional[SessionRecord]:
+        record = await self.get(session_id)
+        if record is None or record.claimed_at is not None:
+            return None
+        record.claimed_at = time.time()
+        record.claimed_by = WORKER_ID
+        self._entries[session_id] = (record, record.claimed_at + ttl)
+        return record
+
+    async def release(self, session_id: str):
+        self._entries.pop(session_id, None)
+
+    def _count(self, user_id: str) -> int:
+        now = time.time()
+        return sum(
+            1 for record, expires_at in self._entries.values()
+            if record.user_id == user_id and expires_at > now
+        )
+
+    async def count_user_sessions(self, user_id: str) -> int:
+        return self._count(user_id)
+
+    async def purge_expired(self) -> int:
+        now = time.time()
+        expired = [sid for sid, (_, expires_at) in self._entries.items() if expires_at <= now]
+        for session_id in expired:
+            del self._entries[session_id]
+        return len(expired)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Store in a SQLite file shared by all workers on one host.
+
+    Claims are a single conditional UPDATE, which SQLite serializes across
+    processes. Queries run in a thread so the event loop never waits on the
+    database lock.
+    """
+
+    def __init__(self, path: Path = SESSION_DB_PATH):
+        self._db = SQLiteDatabase(path, schema=(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                user_id TEXT,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                claimed_at REAL,
+                claimed_by TEXT
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)",
+            "CREATE INDEX IF NOT EXISTS sessions_user_id ON sessions (user_id)",
+        ))
+
+    @staticmethod
+    def _record(row) -> Optional[SessionRecord]:
+        if row is None:
+            return None
+        session_id, user_id, created_at, claimed_at, claimed_by = row
+        return SessionRecord(
+            session_id=session_id,
+            user_id=user_id,
+            created_at=created_at,
+            claimed_at=claimed_at,
+            claimed_by=claimed_by,
+        )
+
+    async def create(self, record: SessionRecord, ttl: float = SESSION_TTL, max_per_user: Optional[int] = None) -> bool:
+        now = time.time()
+        query = "INSERT OR REPLACE INTO sessions (session_id, user_id, created_at, expires_at) SELECT ?, ?, ?, ?"
+        params = (record.session_id, record.user_id, record.created_at, now + ttl)
+        if record.user_id and max_per_user is not None:
+            # One statement, so SQLite checks and inserts under the same write lock
+            query += " WHERE (SELECT COUNT(*) FROM sessions WHERE user_id = ? AND expires_at > ?) < ?"
+            params += (record.user_id, now, max_per_user)
+        return await asyncio.to_thread(self._db.execute, query, params) == 1
+
+    async def get(self, session_id: str) -> Optional[SessionRecord]:
+        row = await asyncio.to_thread(
+            self._db.fetchone,
+            "SELECT session_id, user_id, created_at, claimed_at, claimed_by FROM sessions "
+            "WHERE session_id = ? AND expires_at > ?",
+            (session_id, time.time()),
+        )
+        return self._record(row)
+
+    def _claim(self, session_id: str, ttl: float) -> Optional[SessionRecord]:
+        now = time.time()
+        with self._db.transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE sessions SET claimed_at = ?, claimed_by = ?, expires_at = ? "
+                "WHERE session_id = ? AND claimed_at IS NULL AND expires_at > ?",
+                (now, WORKER_ID, now + ttl, session_id, now),
+            )
+            if cursor.rowcount != 1:
+                return None
+            row = conn.execute(
+                "SELECT session_id, user_id, created_at, claimed_at, claimed_by FROM sessions WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+        return self._record(row)
+
+    async def claim(self, session_id: str, ttl: float = ACTIVE_SESSION_TTL) -> Optional[SessionRecord]:
+        return await asyncio.to_thread(self._claim, session_id, ttl)
+
+    async def release(self, session_id: str):
+        await asyncio.to_thread(self._db.execute, "DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    async def count_user_sessions(self, user_id: str) -> int:
+        row = await asyncio.to_thread(
+            self._db.fetchone,
+            "SELECT COUNT(*) FROM sessions WHERE user_id = ? AND expires_at > ?",
+            (user_id, time.time()),
+        )
+        return row[0]
+
+    async def purge_expired(self) -> int:
+        return await asyncio.to_thread(
+            self._db.execute, "DELETE FROM sessions WHERE expires_at <= ?", (time.time(),)
+        )
+
+    async def close(self):
+        self._db.close()
+
+
+# Add to the user's set unless it already holds the limit (-1: no limit), then
+# write the session hash. KEYS[2] is the user's set, absent for anonymous sessions
+_REDIS_CREATE = """
+if KEYS[2] then
+    redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[4])
+    local limit = tonumber(ARGV[6])
+    if limit >= 0 and redis.call('ZCARD', KEYS[2]) >= limit then return 0 end
+    redis.call('ZADD', KEYS[2], ARGV[5], ARGV[8])
+    redis.call('PEXPIRE', KEYS[2], ARGV[7])
+end
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], 'user_id', ARGV[1], 'created_at', ARGV[2])
+redis.call('PEXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+# Claim only if the key exists and has not been claimed, then extend its TTL
+_REDIS_CLAIM = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return false end
+if redis.call('HSETNX', KEYS[1], 'claimed_at', ARGV[1]) == 0 then return false end
+redis.call('HSET', KEYS[1], 'claimed_by', ARGV[2])
+redis.call('PEXPIRE', KEYS[1], ARGV[3])
+return redis.call('HGETALL', KEYS[1])
+"""
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Store in Redis (or any Redis-compatible server); expiry uses native key TTLs.
+
+    Each user also has a sorted set of their session IDs scored by expiry
+    time, so per-user counts don't need a key scan.
+    """
+
+    def __init__(self, url: str = REDIS_URL):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("SESSION_STORE=redis requires the redis package") from e
+        self._redis = redis.from_url(url, decode_responses=True)
+        self._create_script = self._redis.register_script(_REDIS_CREATE)
+        self._claim_script = self._redis.register_script(_REDIS_CLAIM)
+
+    @staticmethod
+    def _key(session_id: str) -> str:
+        return f"centrum:session:{session_id}"
+
+    @staticmethod
+    def _user_key(user_id: str) -> str:
+        return f"centrum:user_sessions:{user_id}"
+
+    @staticmethod
+    def _record(session_id: str, fields: dict) -> SessionRecord:
+        return SessionRecord(
+            session_id=session_id,
+            user_id=fields.get("user_id") or None,
+            created_at=float(fields["created_at"]),
+            claimed_at=float(fields["claimed_at"]) if fields.get("claimed_at") else None,
+            claimed_by=fields.get("claimed_by"),
+        )
+
+    async def create(self, record: SessionRecord, ttl: float = SESSION_TTL, max_per_user: Optional[int] = None) -> bool:
+        keys = [self._key(record.session_id)]
+        if record.user_id:
+            keys.append(self._user_key(record.user_id))
+        now = time.time()
+        created = await self._create_script(keys=keys, args=[
+            record.user_id or "",
+            record.created_at,
+            int(ttl * 1000),
+            now,
+            now + ttl,
+            -1 if max_per_user is None else max_per_user,
+            int(ACTIVE_SESSION_TTL * 1000),
+            record.session_id,
+        ])
+        return bool(created)
+
+    async def get(self, session_id: str) -> Optional[SessionRecord]:
+        fields = await self._redis.hgetall(self._key(session_id))
+        return self._record(session_id, fields) if fields else None
+
+    async def claim(self, session_id: str, ttl: float = ACTIVE_SESSION_TTL) -> Optional[SessionRecord]:
+        result = await self._claim_script(keys=[self._key(session_id)], args=[time.time(), WORKER_ID, int(ttl * 1000)])
+        if not result:
+            return None
+        # HGETALL comes back from Lua as a flat [field, value, ...] list
+        record = self._record(session_id, dict(zip(result[::2], result[1::2])))
+        if record.user_id:
+            await self._redis.zadd(self._user_key(record.user_id), {session_id: time.time() + ttl})
+        return record
+
+    async def release(self, session_id: str):
+        key = self._key(session_id)
+        user_id = await self._redis.hget(key, "user_id")
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            if user_id:
+                pipe.zrem(self._user_key(user_id), session_id)
+            await pipe.execute()
+
+    async def count_user_sessions(self, user_id: str) -> int:
+        user_key = self._user_key(user_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(user_key, "-inf", time.time())
+            pipe.zcard(user_key)
+            _, count = await pipe.execute()
+        return count
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+class SessionReaper:
+    """Background task that expires unclaimed and abandoned sessions"""
+
+    def __init__(self, store: SessionStore, interval: float = SESSION_REAP_INTERVAL):
+        self.store = store
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                removed = await self.store.purge_expired()
+                if removed:
+                    logger.info("🧹 Reaped %d expired sessions", removed)
+            except Exception as e:
+                logger.error("❌ Session reaper failed: %s", e)
+
+
+def create_session_store(backend: str = SESSION_STORE) -> SessionStore:
+    """Build the store selected by SESSION_STORE"""
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    if backend == "redis":
+        return RedisSessionStore()
+    if backend != "memory":
+        raise ValueError(f"Unknown SESSION_STORE: {backend!r}")
+    return MemorySessionStore()
+
+
+session_store = create_session_store()
+session_reaper = SessionReaper(session_store)
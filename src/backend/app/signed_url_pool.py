@@ -0,0 +1,122 @@
+"""
+Prefetch pool of Eleven Labs signed URLs
+Keeps the signed-URL REST round trip off the WebSocket critical path
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Optional
+
+from app.config import ELEVENLABS_AGENT_ID, SIGNED_URL_POOL_SIZE, SIGNED_URL_TTL
+from app.conversation_handler import get_signed_url
+
+logger = logging.getLogger(__name__)
+
+# Back off this long before refilling again after a failed fetch
+_RETRY_DELAY = 5.0
+
+
+class SignedUrlPool:
+    """
+    A small pool of fresh signed URLs for one agent.
+
+    Each URL starts one conversation, so acquire() removes it from the pool
+    and wakes the background task to fetch a replacement. URLs older than
+    `ttl` seconds are discarded before they can be handed out.
+    """
+
+    def __init__(self, agent_id: str, size: int = SIGNED_URL_POOL_SIZE, ttl: float = SIGNED_URL_TTL):
+        self.agent_id = agent_id
+        self.size = size
+        self.ttl = ttl
+        self._urls: deque[tuple[str, float]] = deque()  # (url, fetched_at)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def available(self) -> int:
+        self._discard_expired()
+        return len(self._urls)
+
+    def start(self):
+        if self._task is None and self.size > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def prefetch(self):
+        """Ask the background task to top the pool up"""
+        self.start()
+        self._wakeup.set()
+
+    async def acquire(self) -> Optional[str]:
+        """Take a fresh URL from the pool, fetching one inline if the pool is empty"""
+        self._discard_expired()
+        url = self._urls.popleft()[0] if self._urls else None
+        self.prefetch()
+        if url:
+            return url
+
+        logger.warning("⚠️ Signed URL pool empty for %s, fetching inline", self.agent_id)
+        data = await get_signed_url(self.agent_id)
+        return data.get("signed_url")
+
+    def _discard_expired(self):
+        now = time.monotonic()
+        while self._urls and now - self._urls[0][1] >= self.ttl:
+            self._urls.popleft()
+
+    def _next_check(self) -> float:
+        """Seconds until the oldest pooled URL expires"""
+        if not self._urls:
+            return self.ttl
+        return max(0.0, self.ttl - (time.monotonic() - self._urls[0][1]))
+
+    async def _run(self):
+        while True:
+            self._discard_expired()
+            timeout = None
+            while len(self._urls) < self.size:
+                try:
+                    data = await get_signed_url(self.agent_id)
+                except Exception as e:
+                    logger.error("❌ Signed URL prefetch failed: %s", e)
+                    timeout = _RETRY_DELAY
+                    break
+                if not data.get("signed_url"):
+                    logger.error("❌ Signed URL prefetch returned no URL: %s", data)
+                    timeout = _RETRY_DELAY
+                    break
+                self._urls.append((data["signed_url"], time.monotonic()))
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout or self._next_check())
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+
+_pools: dict[str, SignedUrlPool] = {}
+
+
+def get_signed_url_pool(agent_id: str = ELEVENLABS_AGENT_ID) -> SignedUrlPool:
+    """Get (or create) the pool for an agent"""
+    pool = _pools.get(agent_id)
+    if pool is None:
+        pool = _pools[agent_id] = SignedUrlPool(agent_id)
+    return pool
+
+
+async def close_signed_url_pools():
+    """Stop all refill tasks (called from the app lifespan)"""
+    for pool in _pools.values():
+        await pool.stop()
+    _pools.clear()
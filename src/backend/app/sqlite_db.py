@@ -0,0 +1,61 @@
+"""
+Shared SQLite connection for the job queue, session store and catalog
+One autocommit WAL connection per file, used from threads under a lock
+"""
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator
+
+
+class SQLiteDatabase:
+    """
+    A SQLite file opened once and shared between threads.
+
+    The connection is in autocommit mode with WAL, so readers in other
+    processes never block on a writer. Every use holds a lock, since a
+    sqlite3 connection can't be used from two threads at once. `schema`
+    statements run when the database is opened.
+    """
+
+    def __init__(self, path: Path, schema: Iterable[str] = ()):
+        self._conn = sqlite3.connect(str(path), isolation_level=None, check_same_thread=False, timeout=5.0)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            for statement in schema:
+                self._conn.execute(statement)
+
+    def execute(self, query: str, params: tuple = ()) -> int:
+        """Run one statement; returns the number of rows it changed"""
+        with self._lock:
+            return self._conn.execute(query, params).rowcount
+
+    def fetchone(self, query: str, params: tuple = ()):
+        with self._lock:
+            return self._conn.execute(query, params).fetchone()
+
+    def fetchall(self, query: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._conn.execute(query, params).fetchall()
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Hold the lock and an IMMEDIATE transaction, which takes the write lock
+        up front so another process can't change what we just read. Commits
+        on exit, rolls back if the block raises.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,27 +1,209 @@
 """
 Supabase client for database and storage operations
 """
+import asyncio
+import logging
+import re
+import time
+from typing import Optional
+
+import asyncpg
+import httpx
 from supabase import create_client, Client
-from app.config import SUPABASE_URL, SUPABASE_SERVICE_KEY
+from app.config import (
+    SUPABASE_URL,
+    SUPABASE_SERVICE_KEY,
+    SUPABASE_DB_URL,
+    PERSISTENCE_BACKEND,
+    PERSISTENCE_POOL_SIZE,
+    PERSISTENCE_TIMEOUT,
+    PERSISTENCE_RETRIES,
+    PERSISTENCE_RETRY_BACKOFF,
+)
+from app.metrics import SUPABASE_UPSERT
+
+logger = logging.getLogger(__name__)
 
 # Use service key for backend operations
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
 
+# Async connection pools, created lazily on first use and closed on shutdown
+_rest_client: Optional[httpx.AsyncClient] = None
+_pg_pool: Optional[asyncpg.Pool] = None
+_pg_pool_lock = asyncio.Lock()
+
+_COLUMN_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+# Transient failures worth retrying; anything else is raised straight away
+_RETRYABLE = (
+    httpx.TransportError,
+    asyncio.TimeoutError,
+    asyncpg.exceptions.PostgresConnectionError,
+    asyncpg.exceptions.InterfaceError,
+    ConnectionError,
+)
+
+
+def _get_rest_client() -> httpx.AsyncClient:
+    """Pooled async client for the PostgREST API"""
+    global _rest_client
+    if _rest_client is None:
+        _rest_client = httpx.AsyncClient(
+            base_url=f"{SUPABASE_URL}/rest/v1",
+            headers={
+                "apikey": SUPABASE_SERVICE_KEY,
+                "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
+            },
+            timeout=PERSISTENCE_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=PERSISTENCE_POOL_SIZE,
+                max_keepalive_connections=PERSISTENCE_POOL_SIZE,
+            ),
+        )
+    return _rest_client
+
+
+async def _get_pg_pool() -> asyncpg.Pool:
+    """Pooled direct Postgres connections (PERSISTENCE_BACKEND=postgres)"""
+    global _pg_pool
+    if _pg_pool is None:
+        async with _pg_pool_lock:
+            if _pg_pool is None:
+                if not SUPABASE_DB_URL:
+                    raise RuntimeError("SUPABASE_DB_URL is required for the postgres backend")
+                _pg_pool = await asyncpg.create_pool(
+                    SUPABASE_DB_URL,
+                    min_size=1,
+                    max_size=PERSISTENCE_POOL_SIZE,
+                    command_timeout=PERSISTENCE_TIMEOUT,
+                )
+    return _pg_pool
+
+
+async def close_persistence():
+    """Close pooled connections (called from the app lifespan)"""
+    global _rest_client, _pg_pool
+    if _rest_client is not None:
+        await _rest_client.aclose()
+        _rest_client = None
+    if _pg_pool is not None:
+        await _pg_pool.close()
+        _pg_pool = None
+
+
+async def _with_retries(operation, *args):
+    """Run a persistence call with a timeout and exponential backoff on transient errors"""
+    for attempt in range(PERSISTENCE_RETRIES + 1):
+        try:
+            return await asyncio.wait_for(operation(*args), PERSISTENCE_TIMEOUT)
+        except Exception as e:
+            retryable = isinstance(e, _RETRYABLE) or (
+                isinstance(e, httpx.HTTPStatusError) and e.response.status_code >= 500
+            )
+            if not retryable or attempt == PERSISTENCE_RETRIES:
+                raise
+            delay = PERSISTENCE_RETRY_BACKOFF * (2 ** attempt)
+            logger.warning("⚠️ Supabase call failed (%r), retrying in %.2fs", e, delay)
+            await asyncio.sleep(delay)
+
+
+async def _timed_upsert(upsert, rows: list[dict]) -> list[dict]:
+    started = time.perf_counter()
+    try:
+        return await _with_retries(upsert, rows)
+    finally:
+        SUPABASE_UPSERT.labels(PERSISTENCE_BACKEND).observe(time.perf_counter() - started)
+
+
+def _columns(data: dict) -> list[str]:
+    """Validate column names before they are interpolated into SQL"""
+    columns = list(data.keys())
+    for column in columns:
+        if not _COLUMN_RE.match(column):
+            raise ValueError(f"Invalid column name: {column!r}")
+    return columns
+
+
+async def _rest_upsert_profiles(rows: list[dict]) -> list[dict]:
+    response = await _get_rest_client().post(
+        "/profiles",
+        params={"on_conflict": "user_id"},
+        json=rows,
+        headers={"Prefer": "resolution=merge-duplicates,return=representation"},
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def _rest_get_profile(user_id: str) -> Optional[dict]:
+    response = await _get_rest_client().get(
+        "/profiles",
+        params={"user_id": f"eq.{user_id}", "select": "*", "limit": "1"},
+    )
+    response.raise_for_status()
+    rows = response.json()
+    return rows[0] if rows else None
+
+
+async def _pg_upsert_profiles(rows: list[dict]) -> list[dict]:
+    columns = _columns(rows[0])
+    width = len(columns)
+    values = ", ".join(
+        "(" + ", ".join(f"${i * width + j}" for j in range(1, width + 1)) + ")"
+        for i in range(len(rows))
+    )
+    updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in columns if c != "user_id")
+    conflict = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+    query = (
+        f"INSERT INTO profiles ({', '.join(columns)}) VALUES {values} "
+        f"ON CONFLICT (user_id) {conflict} RETURNING *"
+    )
+    args = [row[c] for row in rows for c in columns]
+    pool = await _get_pg_pool()
+    return [dict(r) for r in await pool.fetch(query, *args)]
+
+
+async def _pg_get_profile(user_id: str) -> Optional[dict]:
+    pool = await _get_pg_pool()
+    row = await pool.fetchrow("SELECT * FROM profiles WHERE user_id = $1 LIMIT 1", user_id)
+    return dict(row) if row else None
+
 
 async def save_user_profile(user_id: str, profile_data: dict) -> dict:
     """Save or update user profile (age, about_me, looking_for)"""
     data = {"user_id": user_id, **profile_data}
-    
+    upsert = _pg_upsert_profiles if PERSISTENCE_BACKEND == "postgres" else _rest_upsert_profiles
+
     try:
-        result = supabase.table("profiles").upsert(data, on_conflict="user_id").execute()
-        print(f"✅ Profile saved: {result.data}")
-        return result.data[0] if result.data else None
+        result = await _timed_upsert(upsert, [data])
+        logger.info("✅ Profile saved: %s", result)
+        return result[0] if result else None
     except Exception as e:
-        print(f"❌ Supabase error: {e}")
+        logger.error("❌ Supabase error: %s", e)
         raise
 
 
+async def save_user_profiles(rows: list[dict]) -> list[dict]:
+    """
+    Upsert many profiles in as few round trips as possible.
+
+    Rows are grouped by their column set, since a multi-row upsert must name
+    the same columns for every row and a missing column would otherwise be
+    overwritten with its default.
+    """
+    upsert = _pg_upsert_profiles if PERSISTENCE_BACKEND == "postgres" else _rest_upsert_profiles
+
+    groups: dict[tuple, list[dict]] = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+
+    saved = []
+    for group in groups.values():
+        saved.extend(await _timed_upsert(upsert, group))
+    return saved
+
+
 async def get_user_profile(user_id: str) -> dict:
     """Get user profile"""
-    result = supabase.table("profiles").select("*").eq("user_id", user_id).single().execute()
-    return result.data
+    fetch = _pg_get_profile if PERSISTENCE_BACKEND == "postgres" else _rest_get_profile
+    return await _with_retries(fetch, user_id)
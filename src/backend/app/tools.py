@@ -0,0 +1,106 @@
+"""
+Client tools the agent can call mid-conversation
+Handlers are async and run beside the audio relay, each with a timeout and a concurrency cap
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, NamedTuple, Optional
+
+from app.config import TOOL_TIMEOUT, TOOL_MAX_CONCURRENCY
+from app.conversation_handler import ConversationManager
+from app.metrics import TOOL_CALL
+
+logger = logging.getLogger(__name__)
+
+ToolHandler = Callable[[ConversationManager, dict], Awaitable[dict]]
+# (tool_call_id, tool_name, result, is_error)
+ResultCallback = Callable[[str, str, dict, bool], None]
+
+
+class Tool(NamedTuple):
+    name: str
+    handler: ToolHandler
+    timeout: float
+    slots: asyncio.Semaphore  # shared by every session on this worker
+
+
+class ToolRegistry:
+    """Tools by the name the agent calls them with"""
+
+    def __init__(self):
+        self._tools: dict[str, Tool] = {}
+
+    def register(
+        self,
+        name: str,
+        timeout: float = TOOL_TIMEOUT,
+        max_concurrency: int = TOOL_MAX_CONCURRENCY,
+    ) -> Callable[[ToolHandler], ToolHandler]:
+        """Decorator registering an async handler(manager, parameters) -> result dict"""
+        def decorator(handler: ToolHandler) -> ToolHandler:
+            self._tools[name] = Tool(name, handler, timeout, asyncio.Semaphore(max_concurrency))
+            return handler
+        return decorator
+
+    def get(self, name: str) -> Optional[Tool]:
+        return self._tools.get(name)
+
+
+class ToolDispatcher:
+    """
+    Runs one bridge's tool calls as tasks, so the relay keeps reading audio
+    while they execute. Each result (or error) is handed to `on_result`;
+    unknown tools, timeouts and exceptions come back as error results for
+    the agent rather than raising.
+    """
+
+    def __init__(self, manager: ConversationManager, registry: "ToolRegistry", on_result: ResultCallback):
+        self.manager = manager
+        self.registry = registry
+        self.on_result = on_result
+        self._tasks: set[asyncio.Task] = set()
+
+    def dispatch(self, tool_call_id: str, name: str, parameters: dict):
+        task = asyncio.create_task(self._run(tool_call_id, name, parameters or {}, time.perf_counter()))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, tool_call_id: str, name: str, parameters: dict, received_at: float):
+        tool = self.registry.get(name)
+        is_error = True
+        if tool is None:
+            result = {"error": f"Unknown tool: {name}"}
+        else:
+            try:
+                async with tool.slots:
+                    result = await asyncio.wait_for(tool.handler(self.manager, parameters), tool.timeout)
+                is_error = False
+            except asyncio.TimeoutError:
+                logger.warning("⏱️ Tool %s timed out after %.1fs", name, tool.timeout)
+                result = {"error": f"{name} timed out"}
+            except Exception as e:
+                logger.exception("❌ Tool %s failed: %s", name, e)
+                result = {"error": f"{name} failed"}
+
+        TOOL_CALL.labels(name if tool else "unknown").observe(time.perf_counter() - received_at)
+        self.on_result(tool_call_id, name, result, is_error)
+
+    async def close(self):
+        """Cancel calls still running; their results have nowhere to go"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+tool_registry = ToolRegistry()
+
+
+@tool_registry.register("update_dating_profile")
+async def update_dating_profile(manager: ConversationManager, parameters: dict) -> dict:
+    profile = manager.update_profile(**parameters)
+    return {
+        "success": True,
+        "message": "Profile updated",
+        "current_profile": profile.model_dump() if profile else {},
+    }
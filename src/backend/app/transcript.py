@@ -0,0 +1,74 @@
+"""
+Compact in-memory transcript for live sessions
+Parallel arrays instead of a Pydantic model per turn; models are built only at the API and persistence boundary
+"""
+import sys
+import time
+from array import array
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+
+from app.models import ConversationMessage, MessageRole
+
+_ROLES = tuple(MessageRole)
+_ROLE_CODES = {role: code for code, role in enumerate(_ROLES)}
+
+# Short utterances ("Yes", "Okay", "Mhm") repeat a lot; sharing one copy is free
+_INTERN_MAX_CHARS = 32
+
+
+class LiveTranscript:
+    """
+    The turns of one live conversation.
+
+    Each turn costs a byte for the role, eight bytes for its offset from the
+    start of the session (monotonic, so wall clock jumps can't reorder turns)
+    and a reference to its text. Audio file names are rare and kept sparse.
+    """
+
+    __slots__ = ("started_at", "_started", "_roles", "_offsets", "_contents", "_audio_files")
+
+    def __init__(self, started_at: datetime):
+        self.started_at = started_at
+        self._started = time.monotonic()
+        self._roles = bytearray()
+        self._offsets = array("d")
+        self._contents: list[str] = []
+        self._audio_files: dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._contents)
+
+    def append(self, role: MessageRole, content: str, audio_file: Optional[str] = None) -> datetime:
+        """Add a turn; returns its timestamp"""
+        offset = time.monotonic() - self._started
+        if len(content) <= _INTERN_MAX_CHARS:
+            content = sys.intern(content)
+        if audio_file:
+            self._audio_files[len(self._contents)] = audio_file
+        self._roles.append(_ROLE_CODES[role])
+        self._offsets.append(offset)
+        self._contents.append(content)
+        return self.started_at + timedelta(seconds=offset)
+
+    def timestamp(self, index: int) -> datetime:
+        return self.started_at + timedelta(seconds=self._offsets[index])
+
+    def lines(self, reverse: bool = False) -> Iterator[tuple[MessageRole, str]]:
+        """(role, content) per turn, without building messages"""
+        indices = range(len(self._contents) - 1, -1, -1) if reverse else range(len(self._contents))
+        for i in indices:
+            yield _ROLES[self._roles[i]], self._contents[i]
+
+    def to_messages(self) -> list[ConversationMessage]:
+        """The turns as app.models messages, for the API and persistence"""
+        # Everything was typed on the way in, so skip validation
+        return [
+            ConversationMessage.model_construct(
+                role=_ROLES[self._roles[i]],
+                content=self._contents[i],
+                timestamp=self.timestamp(i),
+                audio_file=self._audio_files.get(i),
+            )
+            for i in range(len(self._contents))
+        ]
@@ -0,0 +1,213 @@
+"""
+The bridge's connection to Eleven Labs
+Survives transient drops: reconnects with a fresh signed URL and resumes the conversation
+"""
+import asyncio
+import logging
+import random
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+import websockets
+from websockets.asyncio.client import ClientConnection, connect
+
+from app.config import (
+    AUDIO_SAMPLE_RATE,
+    AUDIO_SAMPLE_WIDTH,
+    UPSTREAM_PING_INTERVAL,
+    UPSTREAM_PING_TIMEOUT,
+    UPSTREAM_COMPRESSION,
+    UPSTREAM_MAX_MESSAGE_BYTES,
+    UPSTREAM_RECONNECT_ATTEMPTS,
+    UPSTREAM_RECONNECT_BACKOFF,
+    UPSTREAM_RING_SECONDS,
+    UPSTREAM_RESUME_CONTEXT_CHARS,
+)
+from app.models import DatingProfile
+from app.transcript import LiveTranscript
+from app.metrics import RELAY_DROPPED, UPSTREAM_RECONNECTS
+from app import relay
+
+logger = logging.getLogger(__name__)
+
+# Close codes that mean the conversation is over; anything else (1001 going
+# away, 1006 abnormal, 1011 server error) is treated as a broken link
+_FINAL_CLOSE_CODES = {1000}
+
+
+async def connect_upstream(signed_url: str) -> ClientConnection:
+    """Open an Eleven Labs socket tuned for streaming audio"""
+    return await connect(
+        signed_url,
+        ping_interval=UPSTREAM_PING_INTERVAL,
+        ping_timeout=UPSTREAM_PING_TIMEOUT,
+        compression="deflate" if UPSTREAM_COMPRESSION else None,
+        max_size=UPSTREAM_MAX_MESSAGE_BYTES,
+    )
+
+
+def resume_messages(
+    transcript: LiveTranscript,
+    profile: Optional[DatingProfile],
+    max_chars: int = UPSTREAM_RESUME_CONTEXT_CHARS,
+) -> list[dict]:
+    """
+    Messages that bring a fresh Eleven Labs conversation up to speed.
+
+    The protocol has no way to resume a conversation, so the transcript so
+    far (most recent turns first to go over `max_chars`) and the profile
+    collected are sent as a contextual update, which the agent takes into
+    account without replying to it.
+    """
+    lines = []
+    used = 0
+    for role, content in transcript.lines(reverse=True):
+        line = f"{role.value}: {content}"
+        if used + len(line) > max_chars:
+            break
+        lines.append(line)
+        used += len(line) + 1
+    if not lines and not profile:
+        return []
+
+    text = (
+        "The connection dropped and this conversation was resumed. "
+        "Continue where it left off without greeting the user again."
+    )
+    if lines:
+        text += "\n\nConversation so far:\n" + "\n".join(reversed(lines))
+    collected = profile.model_dump(exclude_none=True) if profile else None
+    if collected:
+        text += "\n\nProfile collected so far: " + relay.dumps(collected)
+    return [{"type": "contextual_update", "text": text}]
+
+
+class MicRing:
+    """Bounded byte ring for mic audio while upstream is down; the oldest audio goes first"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._chunks: deque[bytes] = deque()
+        self.size = 0
+        self.dropped_bytes = 0
+        self._dropped = RELAY_DROPPED.labels("upstream", "reconnect").inc
+
+    def append(self, chunk: bytes):
+        self._chunks.append(chunk)
+        self.size += len(chunk)
+        while self.size > self.max_bytes and self._chunks:
+            dropped = self._chunks.popleft()
+            self.size -= len(dropped)
+            self.dropped_bytes += len(dropped)
+            self._dropped()
+
+    def drain(self) -> list[bytes]:
+        chunks = list(self._chunks)
+        self._chunks.clear()
+        self.size = 0
+        return chunks
+
+
+class UpstreamLink:
+    """
+    The current Eleven Labs socket for one bridge.
+
+    The reader owns reconnection: when its socket closes abnormally it calls
+    reconnect(), which fetches a new signed URL, reconnects with backoff and
+    replays context. Meanwhile `connected` is clear and the writer hold()s
+    mic audio in a ring instead of sending; it flushes the ring once the new
+    socket is up. Control messages (pongs, tool results) belong to the old
+    conversation and are dropped.
+    """
+
+    def __init__(
+        self,
+        get_url: Callable[[], Awaitable[Optional[str]]],
+        attempts: int = UPSTREAM_RECONNECT_ATTEMPTS,
+        backoff: float = UPSTREAM_RECONNECT_BACKOFF,
+        ring_seconds: float = UPSTREAM_RING_SECONDS,
+    ):
+        self.get_url = get_url
+        self.attempts = attempts
+        self.backoff = backoff
+        self.ring = MicRing(int(ring_seconds * AUDIO_SAMPLE_RATE * AUDIO_SAMPLE_WIDTH))
+        self.ws: Optional[ClientConnection] = None
+        self.connected = asyncio.Event()
+        self.reconnects = 0
+        self.dropped_control = 0
+
+    async def connect(self, signed_url: Optional[str] = None) -> bool:
+        signed_url = signed_url or await self.get_url()
+        if not signed_url:
+            return False
+        self.ws = await connect_upstream(signed_url)
+        return True
+
+    def dropped(self) -> bool:
+        """Whether the socket closed in a way worth reconnecting over, rather than the conversation ending"""
+        return self.ws.close_code not in _FINAL_CLOSE_CODES
+
+    async def reconnect(self, context: list[dict]) -> bool:
+        """Replace a dropped socket; False once every attempt has failed"""
+        self.connected.clear()
+        old = self.ws
+        if old is not None:
+            await old.close()
+
+        for attempt in range(self.attempts):
+            # Full jitter, so a provider blip doesn't bring every bridge back at once
+            await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+            try:
+                if not await self.connect():
+                    raise RuntimeError("no signed URL")
+                for message in context:
+                    await self.ws.send(relay.dumps(message))
+            except Exception as e:
+                if self.ws is not old:
+                    await self.ws.close()
+                logger.warning("⚠️ Eleven Labs reconnect %d/%d failed: %s", attempt + 1, self.attempts, e)
+                UPSTREAM_RECONNECTS.labels("failed").inc()
+                continue
+            UPSTREAM_RECONNECTS.labels("ok").inc()
+            self.reconnects += 1
+            self.connected.set()
+            logger.info("🔁 Reconnected to Eleven Labs (attempt %d)", attempt + 1)
+            return True
+        return False
+
+    def hold(self, item):
+        """Keep an item the writer could not send while disconnected"""
+        if isinstance(item, bytes):
+            self.ring.append(item)
+        else:
+            self.dropped_control += 1
+
+    async def send(self, item):
+        """Send one upstream item, flushing held mic audio first"""
+        if self.ring.size:
+            held = self.ring.drain()
+            for i, chunk in enumerate(held):
+                try:
+                    await self.ws.send(relay.encode_user_audio(chunk))
+                except websockets.exceptions.ConnectionClosed:
+                    for unsent in held[i:]:
+                        self.ring.append(unsent)
+                    raise
+        if isinstance(item, bytes):
+            # Eleven Labs expects base64 audio in JSON format
+            await self.ws.send(relay.encode_user_audio(item))
+        else:
+            await self.ws.send(item)
+
+    async def close(self):
+        self.connected.clear()
+        if self.ws is not None:
+            await self.ws.close()
+
+    def stats(self) -> dict:
+        return {
+            "reconnects": self.reconnects,
+            "held_bytes": self.ring.size,
+            "dropped_bytes": self.ring.dropped_bytes,
+            "dropped_control": self.dropped_control,
+        }
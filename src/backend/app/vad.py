@@ -0,0 +1,160 @@
+"""
+Energy-based voice activity detection for the mic stream
+Decides per chunk what is forwarded upstream and what is kept in the recording
+"""
+import math
+from collections import deque
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from app.config import (
+    AUDIO_SAMPLE_RATE,
+    VAD_FRAME_MS,
+    VAD_THRESHOLD_DB,
+    VAD_MARGIN_DB,
+    VAD_HANGOVER_MS,
+    VAD_PREROLL_MS,
+    VAD_SILENCE_KEEPALIVE_MS,
+)
+
+# dBFS of a full-scale int16 square wave, so levels come out relative to full scale
+_FULL_SCALE_DB = 20 * math.log10(32768)
+
+
+class EnergyVAD:
+    """
+    Classifies fixed-length frames of int16 PCM as speech or silence.
+
+    A frame is speech when its RMS level is above both an absolute floor and
+    a margin over the tracked background noise level. All frames in a chunk
+    are scored in one vectorized pass.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = AUDIO_SAMPLE_RATE,
+        frame_ms: int = VAD_FRAME_MS,
+        threshold_db: float = VAD_THRESHOLD_DB,
+        margin_db: float = VAD_MARGIN_DB,
+    ):
+        self.frame_length = max(sample_rate * frame_ms // 1000, 1)
+        self.threshold_db = threshold_db
+        self.margin_db = margin_db
+        self.noise_db = threshold_db
+
+    def levels(self, samples: np.ndarray) -> np.ndarray:
+        """RMS level in dBFS of each frame (a short tail counts as one more frame)"""
+        full = len(samples) // self.frame_length * self.frame_length
+        frames = samples[:full].reshape(-1, self.frame_length).astype(np.float32)
+        energy = np.mean(frames * frames, axis=1)
+        if full < len(samples):
+            tail = samples[full:].astype(np.float32)
+            energy = np.append(energy, np.mean(tail * tail))
+        return 10 * np.log10(energy + 1e-10) - _FULL_SCALE_DB
+
+    def classify(self, samples: np.ndarray) -> np.ndarray:
+        """Boolean speech flag per frame"""
+        levels = self.levels(samples)
+        speech = levels > max(self.threshold_db, self.noise_db + self.margin_db)
+
+        # The quietest frame of a chunk approximates the background level:
+        # follow it down at once, but up only slowly so speech doesn't raise it
+        quietest = float(levels.min())
+        if quietest < self.noise_db:
+            self.noise_db = quietest
+        else:
+            self.noise_db = 0.98 * self.noise_db + 0.02 * quietest
+        return speech
+
+
+class GateResult(NamedTuple):
+    forward: list[bytes]  # chunks to send upstream
+    store: list[tuple[int, bytes]]  # (stream offset in frames, chunk) to keep in the recording
+
+
+class SpeechGate:
+    """
+    Per-session gate in front of the upstream socket and the recorder.
+
+    Speech chunks pass through, followed by VAD_HANGOVER_MS of trailing
+    audio so word endings and the upstream turn detector's pause aren't cut.
+    Up to VAD_PREROLL_MS of silence before an onset is held back and released
+    with it, so onsets aren't clipped either. Past the hangover, one silent
+    chunk per VAD_SILENCE_KEEPALIVE_MS still goes upstream (0 drops them all)
+    and none are recorded.
+    """
+
+    def __init__(
+        self,
+        vad: Optional[EnergyVAD] = None,
+        sample_rate: int = AUDIO_SAMPLE_RATE,
+        hangover_ms: int = VAD_HANGOVER_MS,
+        preroll_ms: int = VAD_PREROLL_MS,
+        keepalive_ms: int = VAD_SILENCE_KEEPALIVE_MS,
+    ):
+        self.vad = vad or EnergyVAD(sample_rate)
+        self.hangover = sample_rate * hangover_ms // 1000
+        self.preroll = sample_rate * preroll_ms // 1000
+        self.keepalive = sample_rate * keepalive_ms // 1000
+        self.position = 0  # frames of mic audio seen so far
+        self._hangover_left = 0
+        self._last_forward = 0
+        self._held: deque[tuple[int, bytes, bool]] = deque()  # offset, chunk, already forwarded
+        self._held_frames = 0
+        self.frames_in = 0
+        self.frames_forwarded = 0
+        self.frames_stored = 0
+
+    def feed(self, chunk: bytes) -> GateResult:
+        samples = np.frombuffer(chunk, dtype="<i2", count=len(chunk) // 2)
+        if not len(samples):
+            # Nothing to classify; a stray odd byte isn't worth forwarding either
+            return GateResult([], [])
+        offset = self.position
+        self.position += len(samples)
+        self.frames_in += len(samples)
+
+        speech = self.vad.classify(samples)
+        active = self._hangover_left > 0 or bool(speech.any())
+        if speech.any():
+            last = len(speech) - 1 - int(np.argmax(speech[::-1]))
+            trailing = len(samples) - (last + 1) * self.vad.frame_length
+            self._hangover_left = self.hangover - max(trailing, 0)
+        else:
+            self._hangover_left -= len(samples)
+
+        if active:
+            forward, store = [], []
+            while self._held:
+                held_offset, held_chunk, sent = self._held.popleft()
+                if not sent:
+                    forward.append(held_chunk)
+                store.append((held_offset, held_chunk))
+            self._held_frames = 0
+            forward.append(chunk)
+            store.append((offset, chunk))
+            return self._account(forward, store)
+
+        # Silence: hold it back as pre-roll, forwarding the odd chunk as a keepalive
+        sent = self.keepalive > 0 and self.position - self._last_forward >= self.keepalive
+        self._held.append((offset, chunk, sent))
+        self._held_frames += len(samples)
+        while self._held and self._held_frames - len(self._held[0][1]) // 2 >= self.preroll:
+            self._held_frames -= len(self._held.popleft()[1]) // 2
+        return self._account([chunk] if sent else [], [])
+
+    def _account(self, forward: list[bytes], store: list[tuple[int, bytes]]) -> GateResult:
+        if forward:
+            self._last_forward = self.position
+        self.frames_forwarded += sum(len(chunk) for chunk in forward) // 2
+        self.frames_stored += sum(len(chunk) for _, chunk in store) // 2
+        return GateResult(forward, store)
+
+    def stats(self) -> dict:
+        return {
+            "frames_in": self.frames_in,
+            "frames_forwarded": self.frames_forwarded,
+            "frames_stored": self.frames_stored,
+            "noise_db": round(self.vad.noise_db, 1),
+        }
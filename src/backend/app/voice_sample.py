@@ -0,0 +1,192 @@
+"""
+Voice clone samples from finished calls
+Picks the cleanest speech in a recording, normalizes it and submits it for cloning
+"""
+import asyncio
+import io
+import logging
+import wave
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from app.config import (
+    VAD_THRESHOLD_DB,
+    VAD_MARGIN_DB,
+    VOICE_SAMPLE_MAX_SECONDS,
+    VOICE_SAMPLE_MIN_SECONDS,
+    VOICE_SAMPLE_TARGET_DB,
+)
+from app.vad import EnergyVAD
+from app.audio_archive import read_recording
+from app.conversation_store import load_conversation, update_conversation
+from app.voice_clone import create_voice_clone
+
+logger = logging.getLogger(__name__)
+
+_MIN_SEGMENT_SECONDS = 1.0
+_MAX_GAP_SECONDS = 0.3  # pauses shorter than this stay inside a segment
+_JOIN_SILENCE_SECONDS = 0.25
+_FADE_SECONDS = 0.01
+_CLIP_LEVEL = 32000
+_MAX_CLIPPED = 0.001  # segments with more clipped samples than this are dropped
+_PEAK_LIMIT = 0.89 * 32767  # -1 dBFS
+
+
+class VoiceSample(NamedTuple):
+    wav: bytes
+    duration: float
+    segments: int
+
+
+def find_speech_segments(levels: np.ndarray, frame_length: int, rate: int) -> tuple[list[tuple[int, int]], float]:
+    """
+    Frame ranges [start, end) of speech, and the noise floor in dBFS.
+
+    Short pauses are bridged and short runs dropped, so segments are whole
+    phrases rather than single syllables.
+    """
+    noise_db = float(np.percentile(levels, 10))
+    speech = levels > max(VAD_THRESHOLD_DB, noise_db + VAD_MARGIN_DB)
+
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], speech.astype(np.int8), [0]))))
+    runs = list(zip(edges[::2], edges[1::2]))
+
+    frames_per_second = rate / frame_length
+    max_gap = int(_MAX_GAP_SECONDS * frames_per_second)
+    merged: list[list[int]] = []
+    for start, end in runs:
+        if merged and start - merged[-1][1] <= max_gap:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+
+    min_frames = int(_MIN_SEGMENT_SECONDS * frames_per_second)
+    return [(start, end) for start, end in merged if end - start >= min_frames], noise_db
+
+
+def score_segment(samples: np.ndarray, levels: np.ndarray, noise_db: float) -> Optional[float]:
+    """
+    Higher is cleaner: SNR over the noise floor, less a penalty for sitting
+    far from the target loudness. None if the segment is clipped.
+    """
+    clipped = np.count_nonzero(np.abs(samples.astype(np.int32)) >= _CLIP_LEVEL) / len(samples)
+    if clipped > _MAX_CLIPPED:
+        return None
+    snr_db = float(np.percentile(levels, 90)) - noise_db
+    loudness_db = float(np.median(levels))
+    return snr_db - 0.5 * abs(loudness_db - VOICE_SAMPLE_TARGET_DB)
+
+
+def _normalize(samples: np.ndarray, rate: int) -> np.ndarray:
+    audio = samples.astype(np.float32)
+    rms = float(np.sqrt(np.mean(audio * audio))) or 1.0
+    gain = 10 ** (VOICE_SAMPLE_TARGET_DB / 20) * 32768 / rms
+    peak = float(np.max(np.abs(audio))) or 1.0
+    audio *= min(gain, _PEAK_LIMIT / peak)
+
+    # Short fades so the joins don't click
+    fade = min(int(_FADE_SECONDS * rate), len(audio) // 2)
+    if fade:
+        ramp = np.linspace(0.0, 1.0, fade, dtype=np.float32)
+        audio[:fade] *= ramp
+        audio[-fade:] *= ramp[::-1]
+    return audio.astype(np.int16)
+
+
+def build_voice_sample(
+    samples: np.ndarray,
+    rate: int,
+    max_seconds: float = VOICE_SAMPLE_MAX_SECONDS,
+    min_seconds: float = VOICE_SAMPLE_MIN_SECONDS,
+) -> Optional[VoiceSample]:
+    """
+    Cut a clone sample from a recording: the best-scoring speech segments up
+    to `max_seconds`, each normalized, joined in call order as a 16-bit WAV.
+    Returns None if there is less than `min_seconds` of usable speech.
+    """
+    vad = EnergyVAD(rate)
+    frame_length = vad.frame_length
+    levels = vad.levels(samples)
+    segments, noise_db = find_speech_segments(levels, frame_length, rate)
+
+    scored = []
+    for start, end in segments:
+        score = score_segment(samples[start * frame_length:end * frame_length], levels[start:end], noise_db)
+        if score is not None:
+            scored.append((score, start, end))
+
+    max_frames = int(max_seconds * rate / frame_length)
+    chosen, total = [], 0
+    for score, start, end in sorted(scored, reverse=True):
+        if total + (end - start) <= max_frames:
+            chosen.append((start, end))
+            total += end - start
+
+    duration = total * frame_length / rate
+    if duration < min_seconds:
+        return None
+
+    gap = np.zeros(int(_JOIN_SILENCE_SECONDS * rate), dtype=np.int16)
+    parts = []
+    for start, end in sorted(chosen):
+        if parts:
+            parts.append(gap)
+        parts.append(_normalize(samples[start * frame_length:end * frame_length], rate))
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(np.concatenate(parts).astype("<i2").tobytes())
+    return VoiceSample(buffer.getvalue(), duration, len(chosen))
+
+
+def build_session_sample(session_id: str) -> Optional[VoiceSample]:
+    recording = read_recording(session_id)
+    if recording is None:
+        return None
+    samples, rate = recording
+    if samples.ndim > 1:
+        samples = samples[:, 0]
+    return build_voice_sample(samples, rate)
+
+
+async def clone_session_voice(session_id: str, user_id: str) -> Optional[str]:
+    """
+    Cut a sample from a finished session, clone it and record the voice_id
+    on the saved conversation. Returns None if the call had too little speech
+    or the provider rejected the sample; raises on errors worth retrying.
+
+    A session whose conversation already has a voice_id is not cloned again,
+    so a job retried after the upload went through doesn't create a second voice.
+    """
+    saved = await load_conversation(session_id)
+    if saved is not None and saved.voice_clone_id:
+        logger.info("🗣️ %s already has voice clone %s", session_id, saved.voice_clone_id)
+        return saved.voice_clone_id
+
+    sample = await asyncio.to_thread(build_session_sample, session_id)
+    if sample is None:
+        logger.info("🗣️ Not enough clean speech in %s for a voice clone", session_id)
+        return None
+
+    logger.info(
+        "🗣️ Voice sample for %s: %.1fs from %d segments (%d bytes)",
+        session_id, sample.duration, sample.segments, len(sample.wav),
+    )
+    result = await create_voice_clone(user_id, sample.wav)
+    if not result.get("success"):
+        status_code = result.get("status_code", 0)
+        if status_code == 429 or status_code >= 500:
+            raise RuntimeError(f"voice clone upload failed with {status_code}")
+        return None
+
+    voice_id = result["voice_id"]
+    try:
+        await update_conversation(session_id, voice_clone_id=voice_id)
+    except Exception as e:
+        # Raising would retry the job and clone again; the voice_id still lands in the job result
+        logger.error("❌ Could not record voice clone %s on %s: %s", voice_id, session_id, e)
+    return voice_id
@@ -0,0 +1,65 @@
+"""
+Micro-benchmark for the audio relay hot path
+Compares the original per-frame encode/decode with app.relay, frames per second on one core
+
+Run from src/backend: `python benchmarks/bench_relay.py`
+"""
+import base64
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app import relay  # noqa: E402
+
+# 4096 samples of 16-bit mono, the frontend's ScriptProcessor buffer size
+MIC_FRAME = os.urandom(8192)
+# Roughly what Eleven Labs sends per audio event at 16 kHz
+AGENT_MESSAGE = json.dumps({
+    "audio_event": {"audio_base_64": base64.b64encode(os.urandom(8000)).decode(), "event_id": 7},
+    "type": "audio",
+})
+DURATION = 1.0
+
+
+def legacy_encode(chunk: bytes) -> str:
+    audio_base64 = base64.b64encode(chunk).decode('utf-8')
+    return json.dumps({"user_audio_chunk": audio_base64})
+
+
+def legacy_decode(message: str) -> bytes:
+    msg_data = json.loads(message)
+    msg_data.get("type")
+    if "audio_event" in msg_data:
+        return base64.b64decode(msg_data["audio_event"].get("audio_base_64"))
+    return None
+
+
+def frames_per_second(fn, arg) -> float:
+    count = 0
+    deadline = time.perf_counter() + DURATION
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            fn(arg)
+        count += 100
+    return count / DURATION
+
+
+def main():
+    assert relay.extract_agent_audio(AGENT_MESSAGE) == legacy_decode(AGENT_MESSAGE)
+    assert json.loads(relay.encode_user_audio(MIC_FRAME)) == json.loads(legacy_encode(MIC_FRAME))
+
+    print(f"JSON library: {'orjson' if relay.orjson else 'json'}")
+    for label, before, after, arg in (
+        ("mic -> upstream", legacy_encode, relay.encode_user_audio, MIC_FRAME),
+        ("agent -> client", legacy_decode, relay.extract_agent_audio, AGENT_MESSAGE),
+    ):
+        old = frames_per_second(before, arg)
+        new = frames_per_second(after, arg)
+        print(f"{label:16} before: {old:10,.0f} frames/s   after: {new:10,.0f} frames/s   ({new / old:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Micro-benchmark for per-session audio conversion
+Cost of app.audio_convert per 100 ms chunk for the rate pairs browsers ask for, and a check that chunking doesn't change the output
+
+Run from src/backend: `python benchmarks/bench_resample.py`
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.audio_convert import AudioConverter, StreamFormat, StreamingResampler  # noqa: E402
+
+SECONDS = 10
+CHUNK_MS = 100
+# (from, to): agent audio to the playback format a browser asked for
+PAIRS = [
+    (StreamFormat(16000, "pcm_s16le"), StreamFormat(48000, "f32le")),
+    (StreamFormat(16000, "pcm_s16le"), StreamFormat(44100, "f32le")),
+    (StreamFormat(44100, "pcm_s16le"), StreamFormat(48000, "f32le")),
+    (StreamFormat(44100, "pcm_s16le"), StreamFormat(16000, "pcm_s16le")),
+]
+
+
+def tone(rate: int, encoding: str) -> bytes:
+    t = np.arange(rate * SECONDS) / rate
+    samples = 0.5 * np.sin(2 * np.pi * 440 * t)
+    if encoding == "pcm_s16le":
+        return (samples * 32767).astype("<i2").tobytes()
+    return samples.astype("<f4").tobytes()
+
+
+def main():
+    print(f"{SECONDS}s of audio in {CHUNK_MS} ms chunks")
+    print(f"{'':36}{'us/chunk':>10}{'x realtime':>12}")
+    for source, target in PAIRS:
+        audio = tone(source.sample_rate, source.encoding)
+        width = 2 if source.encoding == "pcm_s16le" else 4
+        step = source.sample_rate * CHUNK_MS // 1000 * width
+        chunks = [audio[i:i + step] for i in range(0, len(audio), step)]
+
+        converter = AudioConverter(source, target)
+        started = time.perf_counter()
+        for chunk in chunks:
+            converter.convert(chunk)
+        elapsed = time.perf_counter() - started
+
+        label = f"{source.sample_rate} {source.encoding} -> {target.sample_rate} {target.encoding}"
+        print(f"{label:36}{elapsed / len(chunks) * 1e6:10.0f}{SECONDS / elapsed:12.0f}")
+
+    # Filter state carried between chunks: odd chunk sizes give the same samples as one pass
+    x = np.random.default_rng(0).standard_normal(48000).astype(np.float32)
+    whole = StreamingResampler(16000, 44100).process(x)
+    resampler = StreamingResampler(16000, 44100)
+    cuts = [0, 1, 17, 1000, 1001, 30000, 48000]
+    chunked = np.concatenate([resampler.process(x[a:b]) for a, b in zip(cuts, cuts[1:])])
+    assert np.allclose(whole, chunked, atol=1e-5)
+
+
+if __name__ == "__main__":
+    main()
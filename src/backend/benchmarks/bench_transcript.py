@@ -0,0 +1,102 @@
+"""
+Micro-benchmark for live transcript storage
+Compares a Pydantic ConversationMessage per turn with app.transcript.LiveTranscript: memory, append, and the JSON written when a call is saved
+
+Run from src/backend: `python benchmarks/bench_transcript.py`
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.models import ConversationMessage, ConversationSession, MessageRole  # noqa: E402
+from app.transcript import LiveTranscript  # noqa: E402
+
+SESSIONS = 100
+TURNS = 200  # a long call: 100 exchanges
+SHORT_REPLIES = ("Yes", "Okay", "Mhm", "Sure", "I guess so", "Not really")
+
+
+def utterance(i: int) -> str:
+    # Transcripts arrive as fresh strings off the socket, so build new ones each time
+    if i % 4 == 3:
+        return SHORT_REPLIES[i % len(SHORT_REPLIES)].encode().decode()
+    return f"Turn {i}: I like hiking on weekends and trying new places to eat around the city."
+
+
+def role(i: int) -> MessageRole:
+    return MessageRole.USER if i % 2 else MessageRole.AGENT
+
+
+def legacy_session(session_id: str) -> ConversationSession:
+    session = ConversationSession(session_id=session_id, started_at=datetime.utcnow())
+    for i in range(TURNS):
+        session.messages.append(ConversationMessage(
+            role=role(i), content=utterance(i), timestamp=datetime.utcnow()
+        ))
+    return session
+
+
+def live_transcript(session_id: str) -> LiveTranscript:
+    transcript = LiveTranscript(datetime.utcnow())
+    for i in range(TURNS):
+        transcript.append(role(i), utterance(i))
+    return transcript
+
+
+def saved_json(session: ConversationSession, transcript: LiveTranscript) -> str:
+    """What ConversationManager.to_session() and save_conversation produce at the end of a call"""
+    return session.model_copy(update={"messages": transcript.to_messages()}).model_dump_json()
+
+
+def measure(build) -> tuple[list, float, int]:
+    """Objects for every session, seconds to build them, bytes they hold"""
+    # Timed and traced separately, since tracing slows every allocation
+    gc.collect()
+    started = time.perf_counter()
+    built = [build(f"s{i}") for i in range(SESSIONS)]
+    elapsed = time.perf_counter() - started
+    del built
+    gc.collect()
+    tracemalloc.start()
+    built = [build(f"s{i}") for i in range(SESSIONS)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return built, elapsed, size
+
+
+def timed(fn, items) -> float:
+    started = time.perf_counter()
+    for item in items:
+        fn(item)
+    return time.perf_counter() - started
+
+
+def main():
+    legacy, legacy_build, legacy_bytes = measure(legacy_session)
+    live, live_build, live_bytes = measure(live_transcript)
+
+    # Same JSON either way, timestamps aside
+    shell = ConversationSession(session_id="s", started_at=datetime.utcnow())
+    sample = ConversationSession.model_validate_json(legacy[0].model_dump_json())
+    saved = ConversationSession.model_validate_json(saved_json(shell, live[0]))
+    assert [(m.role, m.content) for m in sample.messages] == [(m.role, m.content) for m in saved.messages]
+
+    turns = SESSIONS * TURNS
+    print(f"{SESSIONS} sessions x {TURNS} turns")
+    print(f"{'':28}{'pydantic':>12}{'live':>12}")
+    print(f"{'memory per turn (bytes)':28}{legacy_bytes / turns:12.0f}{live_bytes / turns:12.0f}")
+    print(f"{'append per turn (us)':28}{legacy_build / turns * 1e6:12.2f}{live_build / turns * 1e6:12.2f}")
+
+    # The save path: models are built from the live transcript only here
+    dump_legacy = timed(lambda s: s.model_dump_json(), legacy)
+    dump_live = timed(lambda t: saved_json(shell, t), live)
+    print(f"{'save as JSON (ms)':28}{dump_legacy / SESSIONS * 1e3:12.2f}{dump_live / SESSIONS * 1e3:12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Local stand-in for the Eleven Labs REST and ConvAI WebSocket APIs
+Speaks enough of the protocol to drive the bridge without paying for upstream minutes
+
+Run from src/backend: `python benchmarks/fake_convai.py --port 9101`, then start
+the backend with ELEVENLABS_API_URL=http://127.0.0.1:9101/v1
+"""
+import argparse
+import asyncio
+import base64
+import json
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+
+app = FastAPI()
+
+# Replaced from the command line in main()
+settings = argparse.Namespace(
+    init_delay=0.05,
+    ping_interval=2.0,
+    turn_interval=5.0,
+    echo=True,
+)
+stats = {
+    "signed_urls": 0,
+    "conversations": 0,
+    "active": 0,
+    "audio_chunks_in": 0,
+    "audio_bytes_in": 0,
+    "audio_events_out": 0,
+    "pongs": 0,
+    "tool_results": 0,
+    "contextual_updates": 0,
+    "voices_added": 0,
+}
+
+
+@app.get("/v1/convai/conversation/get_signed_url")
+async def get_signed_url(request: Request, agent_id: str):
+    stats["signed_urls"] += 1
+    host = request.headers.get("host", "127.0.0.1")
+    return {
+        "signed_url": f"ws://{host}/v1/convai/conversation?agent_id={agent_id}"
+                      f"&conversation_signature={uuid.uuid4().hex}"
+    }
+
+
+@app.post("/v1/voices/add")
+async def add_voice():
+    stats["voices_added"] += 1
+    return {"voice_id": f"fake-{uuid.uuid4().hex[:12]}", "requires_verification": False}
+
+
+@app.get("/v1/voices/{voice_id}")
+async def get_voice(voice_id: str):
+    return {"voice_id": voice_id, "name": voice_id}
+
+
+@app.delete("/v1/voices/{voice_id}")
+async def delete_voice(voice_id: str):
+    return {"status": "ok"}
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+async def _script(ws: WebSocket, conversation_id: str):
+    """Pings and a scripted turn (transcripts plus a profile tool call) on a timer"""
+    started = time.monotonic()
+    next_turn = settings.turn_interval
+    ping_id = 0
+    turn = 0
+    while True:
+        await asyncio.sleep(settings.ping_interval)
+        ping_id += 1
+        await ws.send_text(json.dumps({"type": "ping", "ping_event": {"event_id": ping_id, "ping_ms": 20}}))
+
+        if settings.turn_interval and time.monotonic() - started >= next_turn:
+            next_turn += settings.turn_interval
+            turn += 1
+            await ws.send_text(json.dumps({
+                "type": "user_transcript",
+                "user_transcription_event": {"user_transcript": f"Synthetic caller turn {turn}"},
+            }))
+            await ws.send_text(json.dumps({
+                "type": "agent_response",
+                "agent_response_event": {"agent_response": f"Thanks, noted turn {turn}."},
+            }))
+            await ws.send_text(json.dumps({
+                "type": "client_tool_call",
+                "client_tool_call": {
+                    "tool_name": "update_dating_profile",
+                    "tool_call_id": f"{conversation_id}-{turn}",
+                    "parameters": {"age": 20 + turn % 40, "about_me": f"Benchmark caller, turn {turn}"},
+                },
+            }))
+
+
+@app.websocket("/v1/convai/conversation")
+async def conversation(ws: WebSocket):
+    await ws.accept()
+    stats["conversations"] += 1
+    stats["active"] += 1
+    conversation_id = uuid.uuid4().hex
+    script = None
+    try:
+        await asyncio.sleep(settings.init_delay)
+        await ws.send_text(json.dumps({
+            "type": "conversation_initiation_metadata",
+            "conversation_initiation_metadata_event": {
+                "conversation_id": conversation_id,
+                "agent_output_audio_format": "pcm_16000",
+                "user_input_audio_format": "pcm_16000",
+            },
+        }))
+        script = asyncio.create_task(_script(ws, conversation_id))
+
+        event_id = 0
+        while True:
+            message = json.loads(await ws.receive_text())
+            chunk = message.get("user_audio_chunk")
+            if chunk is not None:
+                stats["audio_chunks_in"] += 1
+                stats["audio_bytes_in"] += len(chunk) * 3 // 4
+                if settings.echo:
+                    # Echo the caller's audio back as agent speech, so the load
+                    # generator can time the full trip through the bridge
+                    event_id += 1
+                    stats["audio_events_out"] += 1
+                    await ws.send_text(json.dumps({
+                        "type": "audio",
+                        "audio_event": {"audio_base_64": chunk, "event_id": event_id},
+                    }))
+                continue
+
+            kind = message.get("type")
+            if kind == "pong":
+                stats["pongs"] += 1
+            elif kind == "client_tool_result":
+                stats["tool_results"] += 1
+            elif kind == "contextual_update":
+                stats["contextual_updates"] += 1
+    except WebSocketDisconnect:
+        pass
+    finally:
+        stats["active"] -= 1
+        if script:
+            script.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9101)
+    parser.add_argument("--init-delay", type=float, default=settings.init_delay,
+                        help="seconds before conversation_initiation_metadata")
+    parser.add_argument("--ping-interval", type=float, default=settings.ping_interval)
+    parser.add_argument("--turn-interval", type=float, default=settings.turn_interval,
+                        help="seconds between scripted turns (0 disables them)")
+    parser.add_argument("--no-echo", dest="echo", action="store_false",
+                        help="don't send the caller's audio back as agent audio")
+    args = parser.parse_args()
+    for name in ("init_delay", "ping_interval", "turn_interval", "echo"):
+        setattr(settings, name, getattr(args, name))
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
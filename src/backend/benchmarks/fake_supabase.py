@@ -0,0 +1,62 @@
+"""
+Local stand-in for the Supabase PostgREST profiles table
+Accepts the backend's upserts and reads, with optional added latency
+
+Run from src/backend: `python benchmarks/fake_supabase.py --port 9102`, then start
+the backend with SUPABASE_URL=http://127.0.0.1:9102 and PERSISTENCE_BACKEND=rest
+"""
+import argparse
+import asyncio
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+app = FastAPI()
+
+settings = argparse.Namespace(latency=0.02)
+profiles: dict[str, dict] = {}
+stats = {"upserts": 0, "rows": 0, "reads": 0}
+
+
+@app.post("/rest/v1/profiles")
+async def upsert_profiles(request: Request):
+    await asyncio.sleep(settings.latency)
+    rows = await request.json()
+    if isinstance(rows, dict):
+        rows = [rows]
+    saved = []
+    for row in rows:
+        profile = profiles.setdefault(row["user_id"], {})
+        profile.update(row)
+        saved.append(dict(profile))
+    stats["upserts"] += 1
+    stats["rows"] += len(rows)
+    return saved
+
+
+@app.get("/rest/v1/profiles")
+async def get_profiles(user_id: str = ""):
+    await asyncio.sleep(settings.latency)
+    stats["reads"] += 1
+    profile = profiles.get(user_id.removeprefix("eq."))
+    return [profile] if profile else []
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9102)
+    parser.add_argument("--latency", type=float, default=settings.latency,
+                        help="seconds added to every request")
+    args = parser.parse_args()
+    settings.latency = args.latency
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
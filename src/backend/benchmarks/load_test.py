@@ -0,0 +1,296 @@
+"""
+Load generator for the conversation bridge
+Drives N concurrent synthetic callers through one backend worker wired to local fakes
+
+Run from src/backend: `python benchmarks/load_test.py --sessions 50 --duration 30`
+
+Starts benchmarks/fake_convai.py, benchmarks/fake_supabase.py and one uvicorn
+worker of app.main, then has every caller start a session, wait for ready and
+stream 16 kHz PCM in real time. The fake agent echoes the audio back, and
+each frame carries its send time, so the round trip through the bridge in
+both directions can be timed. Reports p50/p99 time-to-ready and relay round
+trip, plus the worker's CPU and memory per session (Linux, read from /proc).
+Pass --backend-url to drive an already running backend instead; CPU and
+memory are then only reported with --backend-pid.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import signal
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+import websockets
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+SAMPLE_RATE = 16000
+_STAMP = struct.Struct("<d")
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(int(q / 100 * len(ordered)), len(ordered) - 1)]
+
+
+def pcm_frame(chunk_ms: int, phase: int) -> bytearray:
+    """A 220 Hz tone at about -12 dBFS; the first 8 bytes are overwritten with the send time"""
+    samples = SAMPLE_RATE * chunk_ms // 1000
+    frame = bytearray(samples * 2)
+    for i in range(samples):
+        value = int(8000 * math.sin(2 * math.pi * 220 * (phase + i) / SAMPLE_RATE))
+        struct.pack_into("<h", frame, i * 2, value)
+    return frame
+
+
+class ProcessStats:
+    """CPU seconds and resident memory of one process, from /proc"""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+
+    def cpu_seconds(self) -> float:
+        with open(f"/proc/{self.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        # utime and stime are fields 14 and 15; the split starts at field 3
+        return (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+
+    def rss_bytes(self) -> int:
+        with open(f"/proc/{self.pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+        return 0
+
+
+class Caller:
+    """One synthetic caller: start a session, wait for ready, stream and time the echo"""
+
+    def __init__(self, index: int, args: argparse.Namespace):
+        self.index = index
+        self.args = args
+        self.time_to_ready = None
+        self.round_trips: list[float] = []
+        self.frames_sent = 0
+        self.frames_received = 0
+        self.messages: dict[str, int] = {}
+        self.error = None
+
+    async def run(self, client: httpx.AsyncClient):
+        try:
+            started = time.perf_counter()
+            response = await client.post(
+                "/api/conversation/start", json={"user_id": f"bench-{self.index}"}
+            )
+            response.raise_for_status()
+            ws_path = response.json()["websocket_url"]
+            ws_url = self.args.backend_url.replace("http", "ws", 1) + ws_path
+
+            async with websockets.connect(ws_url, compression=None, max_size=None) as ws:
+                while True:
+                    message = json.loads(await asyncio.wait_for(ws.recv(), self.args.ready_timeout))
+                    if message.get("type") == "ready":
+                        break
+                    if message.get("type") == "error":
+                        raise RuntimeError(message.get("message"))
+                self.time_to_ready = time.perf_counter() - started
+
+                receiver = asyncio.create_task(self._receive(ws))
+                await self._stream(ws)
+                await ws.send(json.dumps({"type": "end_conversation"}))
+                try:
+                    await asyncio.wait_for(receiver, self.args.end_timeout)
+                except asyncio.TimeoutError:
+                    receiver.cancel()
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+
+    async def _stream(self, ws):
+        chunk_ms = self.args.chunk_ms
+        interval = chunk_ms / 1000
+        frame = pcm_frame(chunk_ms, 0)
+        deadline = time.perf_counter() + self.args.duration
+        next_send = time.perf_counter()
+        while next_send < deadline:
+            _STAMP.pack_into(frame, 0, time.perf_counter())
+            await ws.send(bytes(frame))
+            self.frames_sent += 1
+            next_send += interval
+            await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+
+    async def _receive(self, ws):
+        async for message in ws:
+            if isinstance(message, bytes):
+                self.frames_received += 1
+                if len(message) >= _STAMP.size:
+                    sent_at = _STAMP.unpack_from(message)[0]
+                    trip = time.perf_counter() - sent_at
+                    # Anything else isn't one of our stamps (e.g. merged audio mid-frame)
+                    if 0 <= trip < 60:
+                        self.round_trips.append(trip)
+                continue
+            kind = json.loads(message).get("type", "?")
+            self.messages[kind] = self.messages.get(kind, 0) + 1
+            if kind == "session_ended":
+                return
+
+
+def _spawn(args: list[str], env: dict) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, *args], cwd=BACKEND_DIR, env=env)
+
+
+async def _wait_for(url: str, timeout: float = 20.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.TransportError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{url} did not come up")
+            await asyncio.sleep(0.2)
+
+
+def start_stack(args: argparse.Namespace, data_dir: str) -> list[subprocess.Popen]:
+    """Fake Eleven Labs, fake Supabase and one backend worker pointed at them"""
+    convai = f"http://127.0.0.1:{args.convai_port}"
+    supabase = f"http://127.0.0.1:{args.supabase_port}"
+    env = dict(os.environ)
+    env.update({
+        "ELEVENLABS_API_URL": f"{convai}/v1",
+        "ELEVEN_LABS_API_KEY": "bench",
+        "SUPABASE_URL": supabase,
+        "SUPABASE_SERVICE_KEY": "bench",
+        "PERSISTENCE_BACKEND": "rest",
+        # Recordings, journals and databases go to a scratch directory, not the real data/
+        "DATA_DIR": data_dir,
+    })
+    # Room for every caller, and no post-call audio work competing with the bridges
+    env.setdefault("MAX_BRIDGES_PER_WORKER", str(max(args.sessions, 100)))
+    env.setdefault("SIGNED_URL_POOL_SIZE", str(min(args.sessions, 20)))
+    env.setdefault("VOICE_CLONE_ENABLED", "false")
+    env.setdefault("AUDIO_ARCHIVE_FORMAT", "none")
+    env.setdefault("LOG_LEVEL", "WARNING")
+
+    processes = [
+        _spawn(["benchmarks/fake_convai.py", "--port", str(args.convai_port),
+                "--init-delay", str(args.init_delay)], env),
+        _spawn(["benchmarks/fake_supabase.py", "--port", str(args.supabase_port)], env),
+        _spawn(["-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+                "--port", str(args.backend_port), "--log-level", "warning"], env),
+    ]
+    args.backend_url = f"http://127.0.0.1:{args.backend_port}"
+    args.backend_pid = processes[-1].pid
+    return processes
+
+
+def stop_stack(processes: list[subprocess.Popen]):
+    # Backend first, so its shutdown can still reach the fakes
+    for process in reversed(processes):
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def run(args: argparse.Namespace):
+    await _wait_for(f"{args.backend_url}/health")
+    backend = ProcessStats(args.backend_pid) if args.backend_pid else None
+    baseline_rss = backend.rss_bytes() if backend else 0
+    peak_rss = baseline_rss
+
+    callers = [Caller(i, args) for i in range(args.sessions)]
+    limits = httpx.Limits(max_connections=args.sessions, max_keepalive_connections=args.sessions)
+    async with httpx.AsyncClient(base_url=args.backend_url, limits=limits, timeout=30.0) as client:
+        tasks = []
+        for caller in callers:
+            tasks.append(asyncio.create_task(caller.run(client)))
+            await asyncio.sleep(args.ramp / max(args.sessions, 1))
+
+        # Steady state is from the last caller connecting to the first one hanging up
+        await asyncio.sleep(min(2.0, args.duration / 4))
+        window_start = time.perf_counter()
+        cpu_start = backend.cpu_seconds() if backend else 0.0
+        window_end = window_start + max(args.duration - args.ramp - 2.0, 1.0)
+        while time.perf_counter() < window_end and not all(task.done() for task in tasks):
+            if backend:
+                peak_rss = max(peak_rss, backend.rss_bytes())
+            await asyncio.sleep(0.5)
+        window = time.perf_counter() - window_start
+        cpu = (backend.cpu_seconds() - cpu_start) if backend else 0.0
+
+        await asyncio.gather(*tasks)
+        metrics = (await client.get("/metrics")).text
+
+    report(args, callers, window, cpu, peak_rss - baseline_rss, metrics)
+
+
+def report(args, callers: list[Caller], window: float, cpu: float, rss_growth: int, metrics: str):
+    ok = [caller for caller in callers if caller.error is None]
+    failed = [caller for caller in callers if caller.error is not None]
+    ready = [caller.time_to_ready for caller in callers if caller.time_to_ready is not None]
+    trips = [trip for caller in ok for trip in caller.round_trips]
+    sent = sum(caller.frames_sent for caller in callers)
+    received = sum(caller.frames_received for caller in callers)
+
+    print(f"\nSessions: {len(ok)} ok, {len(failed)} failed ({args.sessions} callers, {args.duration:.0f}s each)")
+    for caller in failed[:5]:
+        print(f"  caller {caller.index}: {caller.error}")
+    print(f"Time to ready:    p50 {percentile(ready, 50) * 1000:7.1f} ms   p99 {percentile(ready, 99) * 1000:7.1f} ms")
+    print(f"Relay round trip: p50 {percentile(trips, 50) * 1000:7.1f} ms   p99 {percentile(trips, 99) * 1000:7.1f} ms"
+          f"   ({len(trips)} samples)")
+    print(f"Audio frames:     {sent} sent, {received} echoed back ({received / max(sent, 1):.0%})")
+    if args.backend_pid and ok:
+        print(f"Worker CPU:       {cpu / window * 100:.1f}% of a core, "
+              f"{cpu / window * 100 / len(ok):.2f}% per session")
+        print(f"Worker memory:    +{rss_growth / 2**20:.1f} MiB, "
+              f"{rss_growth / 2**20 / len(ok):.2f} MiB per session")
+    dropped = [line for line in metrics.splitlines() if line.startswith("centrum_relay_dropped_frames_total")]
+    if dropped:
+        print("Dropped frames:   " + ", ".join(
+            f"{line.split('{')[1].split('}')[0]}={line.split()[-1]}" for line in dropped
+        ))
+    if ok and statistics.mean(len(caller.round_trips) for caller in ok) == 0:
+        print("No echoed audio: is the fake agent running with --no-echo?")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent callers")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds each caller streams")
+    parser.add_argument("--ramp", type=float, default=2.0, help="seconds over which callers connect")
+    parser.add_argument("--chunk-ms", type=int, default=100, help="mic frame length")
+    parser.add_argument("--init-delay", type=float, default=0.05,
+                        help="fake agent's delay before conversation_initiation_metadata")
+    parser.add_argument("--ready-timeout", type=float, default=30.0)
+    parser.add_argument("--end-timeout", type=float, default=10.0)
+    parser.add_argument("--backend-url", help="use a running backend instead of starting one")
+    parser.add_argument("--backend-pid", type=int, help="pid of --backend-url's worker, for CPU and memory")
+    parser.add_argument("--backend-port", type=int, default=9100)
+    parser.add_argument("--convai-port", type=int, default=9101)
+    parser.add_argument("--supabase-port", type=int, default=9102)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="centrum-load-") as data_dir:
+        processes = [] if args.backend_url else start_stack(args, data_dir)
+        try:
+            asyncio.run(run(args))
+        finally:
+            stop_stack(processes)
+
+
+if __name__ == "__main__":
+    main()
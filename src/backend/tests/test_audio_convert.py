@@ -0,0 +1,34 @@
+import numpy as np
+
+from app.audio_convert import AudioConverter, StreamFormat, StreamingResampler
+
+
+def _chunked(resampler, x, cuts):
+    return np.concatenate([resampler.process(x[a:b]) for a, b in zip(cuts, cuts[1:])])
+
+
+def test_chunked_output_matches_one_pass():
+    x = np.random.default_rng(0).standard_normal(16000).astype(np.float32)
+    for in_rate, out_rate in [(16000, 48000), (16000, 44100), (48000, 16000), (44100, 16000)]:
+        whole = StreamingResampler(in_rate, out_rate).process(x)
+        cuts = [0, 1, 2, 17, 17, 1000, 1001, 9000, 16000]
+        chunked = _chunked(StreamingResampler(in_rate, out_rate), x, cuts)
+        assert np.allclose(whole, chunked, atol=1e-5)
+
+
+def test_resampler_empty_chunk():
+    resampler = StreamingResampler(16000, 48000)
+    assert len(resampler.process(np.zeros(0, dtype=np.float32))) == 0
+    assert len(resampler.process(np.ones(100, dtype=np.float32))) == 300
+
+
+def test_converter_empty_and_partial_chunks():
+    converter = AudioConverter(StreamFormat(16000, "pcm_s16le"), StreamFormat(48000, "f32le"))
+    assert converter.convert(b"") == b""
+    assert converter.convert(b"\x01") == b""
+    # The odd byte waits for the rest of its sample
+    assert len(converter.convert(b"\x00" + b"\x00" * 198)) == 100 * 3 * 4
+
+    f32 = AudioConverter(StreamFormat(48000, "f32le"), StreamFormat(16000, "pcm_s16le"))
+    assert f32.convert(b"\x00\x00\x80") == b""
+    assert len(f32.convert(b"\x3f" + b"\x00" * 1196)) == 100 * 2
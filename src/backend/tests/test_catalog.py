@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.catalog import ConversationCatalog
+
+START = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = ConversationCatalog(tmp_path / "catalog.db")
+    # Pairs share a start time, so the session_id tiebreak is exercised too
+    for i in range(9):
+        catalog.upsert({
+            "session_id": f"s{i}",
+            "user_id": "u1" if i % 3 else "u2",
+            "started_at": (START + timedelta(minutes=i // 2)).isoformat(),
+            "status": "completed" if i % 2 else "interrupted",
+            "messages": [{}] * i,
+            "profile": {"age": 20 + i},
+        })
+    yield catalog
+    catalog.close()
+
+
+def _all_pages(catalog, **filters) -> list[str]:
+    seen, cursor = [], None
+    while True:
+        items, cursor = catalog.list(limit=2, cursor=cursor, **filters)
+        assert len(items) <= 2
+        seen.extend(item["session_id"] for item in items)
+        if cursor is None:
+            return seen
+
+
+def test_pages_cover_everything_once(catalog):
+    expected = sorted(
+        (f"s{i}" for i in range(9)),
+        key=lambda sid: (START + timedelta(minutes=int(sid[1:]) // 2), sid),
+        reverse=True,
+    )
+    assert _all_pages(catalog) == expected
+    assert _all_pages(catalog, descending=False) == expected[::-1]
+
+
+def test_filters_apply_across_pages(catalog):
+    assert sorted(_all_pages(catalog, user_id="u2")) == ["s0", "s3", "s6"]
+    assert sorted(_all_pages(catalog, status="completed")) == ["s1", "s3", "s5", "s7"]
+    after = _all_pages(catalog, started_after=START + timedelta(minutes=3))
+    assert sorted(after) == ["s6", "s7", "s8"]
+
+
+def test_cursor_is_stable_under_inserts(catalog):
+    first, cursor = catalog.list(limit=3)
+    # A newer conversation arriving between pages doesn't shift the next one
+    catalog.upsert({"session_id": "new", "started_at": (START + timedelta(days=1)).isoformat()})
+    second, _ = catalog.list(limit=3, cursor=cursor)
+    assert [item["session_id"] for item in first + second] == ["s8", "s7", "s6", "s5", "s4", "s3"]
+
+
+def test_summary_fields(catalog):
+    items, _ = catalog.list(user_id="u1", limit=1)
+    assert items[0]["session_id"] == "s8"
+    assert items[0]["message_count"] == 8
+    assert items[0]["profile"] == {"age": 28}
+    assert catalog.count() == 9
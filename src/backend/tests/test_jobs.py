@@ -0,0 +1,153 @@
+import asyncio
+import time
+
+import pytest
+
+from app import jobs
+from app.jobs import JobQueue, MemoryJobStore, SQLiteJobStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    store = MemoryJobStore() if request.param == "memory" else SQLiteJobStore(tmp_path / "jobs.db")
+    yield store
+    asyncio.run(store.close())
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_RETRY_BACKOFF", 0.01)
+
+
+def _queue(store, lease: float = 5.0) -> JobQueue:
+    return JobQueue(store, workers=2, lease=lease, poll_interval=0.02)
+
+
+async def _wait_for(store, job_id: str, statuses=("succeeded", "failed"), timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = await store.get(job_id)
+        if job.status in statuses:
+            return job
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"job {job_id} still {job.status}")
+
+
+def test_enqueue_with_key_is_idempotent(store):
+    async def run():
+        queue = _queue(store)
+        first = await queue.enqueue("compact", {"session_id": "s1"}, key="compact:s1")
+        again = await queue.enqueue("compact", {"session_id": "s1"}, key="compact:s1")
+        other = await queue.enqueue("compact", {"session_id": "s2"}, key="compact:s2")
+        assert again.job_id == first.job_id
+        assert other.job_id != first.job_id
+        assert (await store.counts()).get("queued") == 2
+
+    asyncio.run(run())
+
+
+def test_failed_job_is_retried(store):
+    async def run():
+        queue = _queue(store)
+        calls = []
+
+        async def flaky(job):
+            calls.append(job.attempts)
+            if len(calls) < 3:
+                raise RuntimeError("not yet")
+            return {"ok": True}
+
+        queue.register("flaky", flaky)
+        await queue.start()
+        job = await queue.enqueue("flaky", {}, max_attempts=5)
+        done = await _wait_for(store, job.job_id)
+        await queue.stop()
+
+        assert done.status == "succeeded"
+        assert done.attempts == 3 and calls == [1, 2, 3]
+        assert done.result == {"ok": True} and done.last_error is None
+
+    asyncio.run(run())
+
+
+def test_job_fails_after_max_attempts(store):
+    async def run():
+        queue = _queue(store)
+
+        async def broken(job):
+            raise ValueError("bad payload")
+
+        queue.register("broken", broken)
+        await queue.start()
+        job = await queue.enqueue("broken", {}, max_attempts=2)
+        done = await _wait_for(store, job.job_id)
+        await queue.stop()
+
+        assert done.status == "failed"
+        assert done.attempts == 2
+        assert done.last_error == "ValueError: bad payload"
+
+    asyncio.run(run())
+
+
+def test_lease_is_renewed_while_running(store):
+    async def run():
+        # The job outlives its lease several times over; the heartbeat keeps it ours
+        queue = _queue(store, lease=0.3)
+        runs = []
+
+        async def slow(job):
+            runs.append(job.job_id)
+            await asyncio.sleep(1.0)
+            return {}
+
+        queue.register("slow", slow)
+        await queue.start()
+        job = await queue.enqueue("slow", {})
+        done = await _wait_for(store, job.job_id)
+        await queue.stop()
+
+        assert done.status == "succeeded"
+        assert len(runs) == 1 and done.attempts == 1
+
+    asyncio.run(run())
+
+
+def test_lapsed_lease_is_requeued(store):
+    async def run():
+        queue = _queue(store)
+        job = await queue.enqueue("compact", {})
+        claimed = await store.claim(lease=0.05)
+        assert claimed.job_id == job.job_id and claimed.attempts == 1
+        assert await store.claim(lease=0.05) is None
+
+        await asyncio.sleep(0.1)
+        assert await store.requeue_expired() == 1
+        reclaimed = await store.claim(lease=5.0)
+        assert reclaimed.job_id == job.job_id and reclaimed.attempts == 2
+
+    asyncio.run(run())
+
+
+def test_stop_hands_running_job_back(store):
+    async def run():
+        queue = _queue(store)
+        started = asyncio.Event()
+
+        async def endless(job):
+            started.set()
+            await asyncio.sleep(60)
+
+        queue.register("endless", endless)
+        await queue.start()
+        job = await queue.enqueue("endless", {})
+        await asyncio.wait_for(started.wait(), 5)
+        await queue.stop(timeout=0.05)
+
+        # Requeued, and the interrupted run doesn't count as an attempt
+        stopped = await store.get(job.job_id)
+        assert stopped.status == "queued"
+        assert stopped.attempts == 0
+        assert stopped.last_error == "interrupted by shutdown"
+
+    asyncio.run(run())
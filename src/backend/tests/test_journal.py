@@ -0,0 +1,140 @@
+import asyncio
+import json
+import uuid
+from datetime import datetime
+
+from app.conversation_store import find_conversation, load_conversation
+from app.journal import (
+    SessionJournal,
+    compact_journal,
+    journal_path,
+    journal_writer,
+    read_live_session,
+    recover_journals,
+    replay_journal,
+)
+
+
+def _session_id() -> str:
+    return f"test-journal-{uuid.uuid4().hex}"
+
+
+def _write_call(session_id: str, end: bool = True) -> SessionJournal:
+    journal = SessionJournal(session_id)
+    journal.append({
+        "e": "start",
+        "session_id": session_id,
+        "user_id": "u1",
+        "started_at": datetime(2026, 1, 1).isoformat(),
+    })
+    journal.append({"e": "msg", "role": "agent", "content": "How old are you?", "timestamp": "2026-01-01T00:00:01"})
+    journal.append({"e": "msg", "role": "user", "content": "Thirty", "timestamp": "2026-01-01T00:00:03"})
+    journal.append({"e": "profile", "profile": {"age": 30}})
+    if end:
+        journal.append({"e": "end", "ended_at": "2026-01-01T00:05:00", "status": "completed"})
+    return journal
+
+
+def test_replay_rebuilds_session():
+    async def run():
+        session_id = _session_id()
+        await _write_call(session_id).close()
+
+        session = replay_journal(journal_path(session_id))
+        assert session.session_id == session_id and session.user_id == "u1"
+        assert [(m.role.value, m.content) for m in session.messages] == [
+            ("agent", "How old are you?"),
+            ("user", "Thirty"),
+        ]
+        assert session.profile.age == 30
+        assert session.status == "completed"
+
+    asyncio.run(run())
+
+
+def test_replay_ignores_torn_final_line():
+    async def run():
+        session_id = _session_id()
+        await _write_call(session_id, end=False).close()
+        with open(journal_path(session_id), "ab") as f:
+            f.write(b'{"e": "msg", "role": "user", "cont')
+
+        session = await read_live_session(session_id)
+        assert len(session.messages) == 2
+        assert session.status == "in_progress"
+
+    asyncio.run(run())
+
+
+def test_compaction_saves_and_removes_journal():
+    async def run():
+        session_id = _session_id()
+        await _write_call(session_id, end=False).close()
+
+        assert await compact_journal(session_id, status="interrupted")
+        assert not journal_path(session_id).exists()
+        saved = await load_conversation(session_id)
+        assert saved.status == "interrupted"
+        assert len(saved.messages) == 2 and saved.profile.age == 30
+
+        # A second run (a retried job) finds nothing to do
+        assert await compact_journal(session_id) is None
+        assert find_conversation(session_id)
+
+    asyncio.run(run())
+
+
+def test_compaction_keeps_journalled_status():
+    async def run():
+        session_id = _session_id()
+        await _write_call(session_id).close()
+        await compact_journal(session_id, status="interrupted")
+        assert (await load_conversation(session_id)).status == "completed"
+
+    asyncio.run(run())
+
+
+def test_recovery_skips_live_sessions():
+    async def run():
+        crashed, live = _session_id(), _session_id()
+        for session_id in (crashed, live):
+            await _write_call(session_id, end=False).close()
+
+        # Journals from other tests count as live, so only ours are touched
+        async def is_live(session_id: str) -> bool:
+            return session_id != crashed
+
+        recovered = await recover_journals(is_live)
+        assert recovered == 1
+        assert (await load_conversation(crashed)).status == "interrupted"
+        assert journal_path(live).exists()
+        assert await load_conversation(live) is None
+
+    asyncio.run(run())
+
+
+def test_failed_write_is_retried(monkeypatch):
+    async def run():
+        session_id = _session_id()
+        journal = _write_call(session_id, end=False)
+        write = journal._write
+        calls = []
+
+        def failing_once(lines):
+            calls.append(len(lines))
+            if len(calls) == 1:
+                raise OSError("disk full")
+            write(lines)
+
+        monkeypatch.setattr(journal, "_write", failing_once)
+        await journal_writer.flush()
+        assert not journal_path(session_id).exists() or journal_path(session_id).stat().st_size == 0
+
+        # The lines go back in front of anything appended since
+        journal.append({"e": "end", "ended_at": "2026-01-01T00:05:00", "status": "completed"})
+        await journal.close()
+        assert calls == [4, 5]
+        lines = [json.loads(line) for line in journal_path(session_id).read_bytes().splitlines()]
+        assert [line["e"] for line in lines] == ["start", "msg", "msg", "profile", "end"]
+
+    asyncio.run(run())
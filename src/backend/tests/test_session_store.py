@@ -0,0 +1,104 @@
+import asyncio
+import time
+
+import pytest
+
+from app.models import SessionRecord
+from app.session_store import MemorySessionStore, RedisSessionStore, SQLiteSessionStore
+
+
+def _redis_store(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # fakeredis runs the Lua scripts with it
+    monkeypatch.setattr("redis.asyncio.from_url", lambda url, **kwargs: fakeredis.FakeAsyncRedis(**kwargs))
+    return RedisSessionStore()
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def make_store(request, tmp_path, monkeypatch):
+    """Builds the store inside the test's event loop"""
+    if request.param == "memory":
+        return MemorySessionStore
+    if request.param == "sqlite":
+        return lambda: SQLiteSessionStore(tmp_path / "sessions.db")
+    return lambda: _redis_store(monkeypatch)
+
+
+def _record(session_id: str, user_id: str = "u1") -> SessionRecord:
+    return SessionRecord(session_id=session_id, user_id=user_id, created_at=time.time())
+
+
+def test_claim_once(make_store):
+    async def run():
+        store = make_store()
+        assert await store.create(_record("s1"))
+        assert (await store.get("s1")).claimed_at is None
+
+        claimed = await store.claim("s1")
+        assert claimed.session_id == "s1" and claimed.user_id == "u1"
+        assert claimed.claimed_at is not None and claimed.claimed_by
+        assert await store.claim("s1") is None
+        assert await store.claim("missing") is None
+
+        await store.release("s1")
+        assert await store.get("s1") is None
+        await store.close()
+
+    asyncio.run(run())
+
+
+def test_concurrent_claims_have_one_winner(make_store):
+    async def run():
+        store = make_store()
+        await store.create(_record("s1"))
+        results = await asyncio.gather(*(store.claim("s1") for _ in range(5)))
+        assert sum(result is not None for result in results) == 1
+        await store.close()
+
+    asyncio.run(run())
+
+
+def test_unclaimed_session_expires(make_store):
+    async def run():
+        store = make_store()
+        await store.create(_record("s1"), ttl=0.05)
+        await asyncio.sleep(0.1)
+        assert await store.get("s1") is None
+        assert await store.claim("s1") is None
+        assert await store.count_user_sessions("u1") == 0
+        await store.purge_expired()
+        await store.close()
+
+    asyncio.run(run())
+
+
+def test_per_user_limit_is_atomic(make_store):
+    async def run():
+        store = make_store()
+        created = await asyncio.gather(*(store.create(_record(f"s{i}"), max_per_user=2) for i in range(6)))
+        assert sum(created) == 2
+        assert await store.count_user_sessions("u1") == 2
+
+        # Other users and anonymous sessions aren't affected
+        assert await store.create(_record("other", "u2"), max_per_user=2)
+        assert await store.create(_record("anon", None), max_per_user=0)
+
+        # Releasing one frees a slot
+        await store.release(next(f"s{i}" for i, ok in enumerate(created) if ok))
+        assert await store.create(_record("s9"), max_per_user=2)
+        assert not await store.create(_record("s10"), max_per_user=2)
+        await store.close()
+
+    asyncio.run(run())
+
+
+def test_expired_sessions_free_the_user_limit(make_store):
+    async def run():
+        store = make_store()
+        assert await store.create(_record("s1"), ttl=0.05, max_per_user=1)
+        assert not await store.create(_record("s2"), max_per_user=1)
+        await asyncio.sleep(0.1)
+        assert await store.create(_record("s3"), max_per_user=1)
+        await store.close()
+
+    asyncio.run(run())
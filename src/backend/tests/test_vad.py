@@ -0,0 +1,58 @@
+import numpy as np
+
+from app.conversation_handler import ConversationManager
+from app.vad import SpeechGate
+
+
+def _speech(ms: int, rate: int = 16000) -> bytes:
+    t = np.arange(rate * ms // 1000) / rate
+    return (0.5 * np.sin(2 * np.pi * 300 * t) * 32767).astype("<i2").tobytes()
+
+
+def test_gate_empty_and_odd_byte_chunks():
+    gate = SpeechGate()
+    assert gate.feed(b"") == ([], [])
+    assert gate.feed(b"\x01") == ([], [])
+    assert gate.position == 0
+    # The gate still works afterwards
+    result = gate.feed(_speech(200))
+    assert result.forward and result.store
+
+
+def test_add_audio_chunk_skips_empty_chunks():
+    for vad in (True, False):
+        manager = ConversationManager(f"test-vad-{vad}")
+        if not vad:
+            manager.gate = None
+        elif manager.gate is None:
+            manager.gate = SpeechGate()
+        assert manager.add_audio_chunk(b"") == []
+        assert manager.audio_chunk_count == 0
+        assert manager.add_audio_chunk(_speech(200))
+        manager.recorder.close()
+
+
+def _silence(ms: int, rate: int = 16000) -> bytes:
+    return bytes(rate * ms // 1000 * 2)
+
+
+def test_gate_releases_preroll_and_hangover():
+    gate = SpeechGate(preroll_ms=200, hangover_ms=100, keepalive_ms=0)
+    for _ in range(5):
+        assert gate.feed(_silence(100)) == ([], [])
+
+    # The onset brings the last 200 ms of silence with it
+    result = gate.feed(_speech(100))
+    assert len(result.forward) == 3
+    assert [offset for offset, _ in result.store] == [4800, 6400, 8000]
+
+    # 100 ms of trailing audio passes, then silence is held back again
+    assert len(gate.feed(_silence(100)).forward) == 1
+    assert gate.feed(_silence(100)) == ([], [])
+
+
+def test_gate_keepalive_during_silence():
+    gate = SpeechGate(keepalive_ms=1000)
+    forwarded = sum(len(gate.feed(_silence(100)).forward) for _ in range(20))
+    assert forwarded == 2
+    assert gate.frames_stored == 0